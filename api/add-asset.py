@@ -8,11 +8,16 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utils'))
 
 try:
     from supabase_client import db
-    from yfinance_helper import get_current_value
+    from asset_refresh import price_in_base, profit_loss, purchase_rate
+    from serializer import dumps
+    from profiling import profiled
 except ImportError:
     from utils.supabase_client import db
-    from utils.yfinance_helper import get_current_value
+    from utils.asset_refresh import price_in_base, profit_loss, purchase_rate
+    from utils.serializer import dumps
+    from utils.profiling import profiled
 
+@profiled
 def handler(request):
     """
     Manejador para /api/add-asset - EQUIVALENTE a app.route('/add-asset') en Flask
@@ -28,7 +33,7 @@ def handler(request):
         return {
             "statusCode": 200,
             "headers": headers,
-            "body": json.dumps({})
+            "body": dumps({})
         }
     
     try:
@@ -46,7 +51,7 @@ def handler(request):
                 return {
                     "statusCode": 400,
                     "headers": headers,
-                    "body": json.dumps({
+                    "body": dumps({
                         "success": False,
                         "error": f"Campo requerido faltante: {field}"
                     })
@@ -59,11 +64,14 @@ def handler(request):
         
         print(f"➕ Añadiendo activo: {asset_name} ({isin})")
         
-        # Obtener precio actual
-        current_value = get_current_value(isin)
+        # Obtener precio actual en euros
+        current_value, currency, _ = price_in_base(isin)
         
-        # Calcular ganancia/pérdida (MISMO cálculo que Flask línea 96)
-        profit_loss_percentage = ((current_value - purchase_value) / purchase_value) * 100
+        # Tipo de cambio de la compra: el indicado o el de hoy
+        purchase_fx_rate = purchase_rate(currency, data.get("purchase_fx_rate"))
+        
+        # Calcular ganancia/pérdida (MISMO cálculo que Flask línea 96, compra convertida a euros)
+        profit_loss_percentage = profit_loss(current_value, purchase_value, currency, purchase_fx_rate)
         
         # Calcular dinero total (MISMO cálculo que Flask línea 97)
         total_money = amount + (amount * profit_loss_percentage / 100)
@@ -75,6 +83,8 @@ def handler(request):
             "purchase_value": purchase_value,
             "amount": amount,
             "current_value": current_value,
+            "currency": currency,
+            "purchase_fx_rate": purchase_fx_rate,
             "total_money": total_money,
             "profit_loss_percentage": profit_loss_percentage,
             "investment_type": data.get("investment_type", "Otros"),
@@ -95,13 +105,13 @@ def handler(request):
             return {
                 "statusCode": 201,
                 "headers": headers,
-                "body": json.dumps(response_data, default=str, ensure_ascii=False)
+                "body": dumps(response_data)
             }
         else:
             return {
                 "statusCode": 500,
                 "headers": headers,
-                "body": json.dumps({
+                "body": dumps({
                     "success": False,
                     "error": "Error al insertar en la base de datos"
                 })
@@ -111,7 +121,7 @@ def handler(request):
         return {
             "statusCode": 400,
             "headers": headers,
-            "body": json.dumps({
+            "body": dumps({
                 "success": False,
                 "error": "JSON inválido"
             })
@@ -122,7 +132,7 @@ def handler(request):
         return {
             "statusCode": 500,
             "headers": headers,
-            "body": json.dumps({
+            "body": dumps({
                 "success": False,
                 "error": str(e),
                 "message": "Error al añadir activo"
@@ -0,0 +1,127 @@
+# api/analytics.py
+import json
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utils'))
+
+try:
+    from supabase_client import db
+    from serializer import dumps
+    from risk_analytics import compute_analytics
+    from asset_refresh import should_refresh
+    from request_helper import get_query_param
+    from profiling import profiled
+except ImportError:
+    from utils.supabase_client import db
+    from utils.serializer import dumps
+    from utils.risk_analytics import compute_analytics
+    from utils.asset_refresh import should_refresh
+    from utils.request_helper import get_query_param
+    from utils.profiling import profiled
+
+VALID_PERIODS = ("1mo", "3mo", "6mo", "1y", "2y", "5y", "10y", "ytd", "max")
+
+@profiled
+def handler(request):
+    """
+    API para /api/analytics?period=1y&benchmark=^STOXX50E
+    Volatilidad, máxima caída y beta por activo y de la cartera, y matriz de correlaciones
+    """
+    headers = {
+        "Content-Type": "application/json",
+        "Access-Control-Allow-Origin": "*",
+        "Access-Control-Allow-Methods": "GET, OPTIONS",
+        "Access-Control-Allow-Headers": "Content-Type"
+    }
+    
+    if request.method == "OPTIONS":
+        return {
+            "statusCode": 200,
+            "headers": headers,
+            "body": dumps({})
+        }
+    
+    try:
+        period = get_query_param(request, "period", "1y")
+        benchmark = get_query_param(request, "benchmark")
+        
+        if period not in VALID_PERIODS:
+            return {
+                "statusCode": 400,
+                "headers": headers,
+                "body": dumps({
+                    "success": False,
+                    "error": f"Periodo inválido: {period}. Usa uno de {', '.join(VALID_PERIODS)}"
+                })
+            }
+        
+        print(f"📐 Calculando métricas de riesgo ({period})...")
+        
+        # Solo activos cotizados (MISMO filtro que update-assets)
+        holdings = [inv for inv in db.get_all_investments() if inv.get("isin") and should_refresh(inv)]
+        
+        if not holdings:
+            return {
+                "statusCode": 200,
+                "headers": headers,
+                "body": dumps({
+                    "success": True,
+                    "message": "No hay activos cotizados",
+                    "assets": []
+                })
+            }
+        
+        result = compute_analytics(holdings, period=period, benchmark=benchmark)
+        
+        print(f"✅ Métricas calculadas para {len(result['assets'])} activos")
+        
+        return {
+            "statusCode": 200,
+            "headers": headers,
+            "body": dumps({
+                "success": True,
+                **result
+            })
+        }
+        
+    except ValueError as e:
+        return {
+            "statusCode": 422,
+            "headers": headers,
+            "body": dumps({
+                "success": False,
+                "error": str(e)
+            })
+        }
+    except Exception as e:
+        import traceback
+        print(f"❌ Error en API analytics: {e}")
+        
+        return {
+            "statusCode": 500,
+            "headers": headers,
+            "body": dumps({
+                "success": False,
+                "error": str(e),
+                "details": traceback.format_exc()
+            })
+        }
+
+# Test local
+if __name__ == "__main__":
+    print("🧪 Testeando API /api/analytics...")
+    
+    class MockRequest:
+        method = "GET"
+        path = "/api/analytics?period=6mo"
+    
+    result = handler(MockRequest())
+    print(f"Status: {result['statusCode']}")
+    
+    if result['statusCode'] == 200:
+        data = json.loads(result['body'])
+        print(f"✅ Success: {data['success']}")
+        print(f"📐 Cartera: {data.get('portfolio')}")
+    else:
+        print(f"❌ Error: {result['body'][:200]}...")
@@ -5,6 +5,16 @@ import os
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utils'))
 
+try:
+    from serializer import dumps
+    from bank_data import get_bank_data
+    from profiling import profiled
+except ImportError:
+    from utils.serializer import dumps
+    from utils.bank_data import get_bank_data
+    from utils.profiling import profiled
+
+@profiled
 def handler(request):
     """
     API para /api/bank - EQUIVALENTE a app.route('/bank') en Flask
@@ -21,44 +31,25 @@ def handler(request):
         return {
             "statusCode": 200,
             "headers": headers,
-            "body": json.dumps({})
+            "body": dumps({})
         }
     
     try:
         print("🏦 Obteniendo datos bancarios...")
         
-        # MISMO array de bancos que en tu Flask original (líneas 159-167)
-        banks = [
-            ("Kutxabank Nomina", 6295.94, 0, ""),
-            ("Kutxabank Conjunta", 391.74, 0, ""),
-            ("Trade Republic", 2050, 1.71, ""),
-            ("Revolut", 300, 1.51, ""),
-            ("Bit2Me", 800, 0, ""),
-            ("My Investor", 900, 0, "")
-        ]
-        
-        # MISMOS cálculos que Flask (líneas 169-170)
-        total_inversion = sum(bank[1] for bank in banks)
-        total_resultado = sum(bank[1] + (bank[1] * bank[2] / 100) for bank in banks if bank[3] == "")
-        
-        # Añadir fila de totales (MISMO que Flask línea 172)
-        banks.append(("TOTALES", total_inversion, "", total_resultado))
+        banks, totals = get_bank_data()
         
         # MISMA estructura de respuesta
         response_data = {
             "success": True,
             "banks": banks,
-            "totals": {
-                "investment": total_inversion,
-                "result": total_resultado,
-                "accounts": len(banks) - 1  # Excluir fila TOTALES
-            }
+            "totals": totals
         }
         
         return {
             "statusCode": 200,
             "headers": headers,
-            "body": json.dumps(response_data, default=str)
+            "body": dumps(response_data)
         }
         
     except Exception as e:
@@ -67,7 +58,7 @@ def handler(request):
         return {
             "statusCode": 500,
             "headers": headers,
-            "body": json.dumps({
+            "body": dumps({
                 "success": False,
                 "error": str(e),
                 "message": "Error al obtener datos bancarios"
@@ -3,16 +3,51 @@ import json
 import sys
 import os
 import plotly.graph_objects as go
-import plotly
 import seaborn as sns
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utils'))
 
 try:
     from supabase_client import db
+    from serializer import dumps
+    from figure_cache import figure_cache
+    from profiling import profiled
 except ImportError:
     from utils.supabase_client import db
+    from utils.serializer import dumps
+    from utils.figure_cache import figure_cache
+    from utils.profiling import profiled
 
+def build_figure(labels, percentages, color_hex):
+    """Gráfico de barras por activo (MISMA lógica que Flask líneas 154-186)"""
+    fig = go.Figure()
+    
+    for label, percentage, color in zip(labels, percentages, color_hex):
+        fig.add_trace(go.Bar(
+            x=[label],
+            y=[percentage],
+            text=f"{percentage:.1f}%",
+            textposition='outside',
+            textfont=dict(
+                size=16,
+                color='#00FF00'  # Mismo color verde que Flask
+            ),
+            marker=dict(color=color, line=dict(width=2, color="white")),
+            hoverinfo='text',
+            hovertext=f"<b>{label}</b>: {percentage:.2f}%",
+        ))
+    
+    fig.update_layout(
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        xaxis=dict(showticklabels=False),
+        yaxis=dict(tickfont=dict(color="#00FF00")),
+        hovermode='x',
+        margin=dict(l=40, r=40, t=20, b=20),
+    )
+    return fig
+
+@profiled
 def handler(request):
     """
     API para /api/categories - EQUIVALENTE a app.route('/investment-categories') en Flask
@@ -29,7 +64,7 @@ def handler(request):
         return {
             "statusCode": 200,
             "headers": headers,
-            "body": json.dumps({})
+            "body": dumps({})
         }
     
     try:
@@ -42,7 +77,7 @@ def handler(request):
             return {
                 "statusCode": 200,
                 "headers": headers,
-                "body": json.dumps({
+                "body": dumps({
                     "success": True,
                     "message": "No hay inversiones",
                     "graph_data": None,
@@ -51,11 +86,11 @@ def handler(request):
             }
         
         # Ordenar por total_money descendente (MISMO que Flask línea 145)
-        investments_sorted = sorted(investments, key=lambda x: float(x.get("total_money", 0)), reverse=True)
+        investments_sorted = sorted(investments, key=lambda x: x.total_money, reverse=True)
         
         # Preparar datos para el gráfico (MISMO que Flask líneas 146-149)
-        labels = [row["asset_name"] for row in investments_sorted]
-        sizes = [float(row["total_money"]) for row in investments_sorted]
+        labels = [row.asset_name for row in investments_sorted]
+        sizes = [row.total_money for row in investments_sorted]
         total_money_sum = sum(sizes)
         percentages = [(size / total_money_sum) * 100 for size in sizes]
         
@@ -63,34 +98,6 @@ def handler(request):
         colors = sns.color_palette("husl", len(labels))
         color_hex = [f'#{int(c[0]*255):02x}{int(c[1]*255):02x}{int(c[2]*255):02x}' for c in colors]
         
-        # Crear gráfico de barras (MISMA lógica que Flask líneas 154-176)
-        fig = go.Figure()
-        
-        for label, percentage, color in zip(labels, percentages, color_hex):
-            fig.add_trace(go.Bar(
-                x=[label],
-                y=[percentage],
-                text=f"{percentage:.1f}%",
-                textposition='outside',
-                textfont=dict(
-                    size=16,
-                    color='#00FF00'  # Mismo color verde que Flask
-                ),
-                marker=dict(color=color, line=dict(width=2, color="white")),
-                hoverinfo='text',
-                hovertext=f"<b>{label}</b>: {percentage:.2f}%",
-            ))
-        
-        # MISMA configuración de layout que Flask (líneas 178-186)
-        fig.update_layout(
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            xaxis=dict(showticklabels=False),
-            yaxis=dict(tickfont=dict(color="#00FF00")),
-            hovermode='x',
-            margin=dict(l=40, r=40, t=20, b=20),
-        )
-        
         # Preparar datos para la tabla (MISMO que Flask línea 188)
         color_data = []
         for color, label, size, percentage in zip(color_hex, labels, sizes, percentages):
@@ -101,8 +108,12 @@ def handler(request):
                 "percentage": percentage
             })
         
-        # Convertir gráfico a JSON (MISMO que Flask línea 189)
-        graph_json = json.loads(json.dumps(fig.to_dict(), cls=plotly.utils.PlotlyJSONEncoder))
+        # Gráfico ya codificado: solo se construye si cambian los datos (MISMO JSON que Flask línea 189)
+        graph_json = figure_cache.get_or_build(
+            "categories",
+            {"labels": labels, "percentages": percentages, "colors": color_hex},
+            lambda: build_figure(labels, percentages, color_hex)
+        )
         
         response_data = {
             "success": True,
@@ -117,7 +128,7 @@ def handler(request):
         return {
             "statusCode": 200,
             "headers": headers,
-            "body": json.dumps(response_data, default=str, ensure_ascii=False)
+            "body": dumps(response_data)
         }
         
     except Exception as e:
@@ -127,7 +138,7 @@ def handler(request):
         return {
             "statusCode": 500,
             "headers": headers,
-            "body": json.dumps({
+            "body": dumps({
                 "success": False,
                 "error": str(e),
                 "message": "Error al generar gráfico por activo"
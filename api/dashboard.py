@@ -0,0 +1,105 @@
+# api/dashboard.py
+import json
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utils'))
+
+try:
+    from supabase_client import db
+    from serializer import dumps
+    from dashboard_bundle import build_dashboard
+    from request_helper import get_header
+    from profiling import profiled
+except ImportError:
+    from utils.supabase_client import db
+    from utils.serializer import dumps
+    from utils.dashboard_bundle import build_dashboard
+    from utils.request_helper import get_header
+    from utils.profiling import profiled
+
+@profiled
+def handler(request):
+    """
+    API para /api/dashboard
+    Un solo snapshot versionado con cartera, totales, categorías, reparto por activo y bancos.
+    Una lectura de la base de datos y un viaje de ida y vuelta para todas las vistas.
+    """
+    headers = {
+        "Content-Type": "application/json",
+        "Access-Control-Allow-Origin": "*",
+        "Access-Control-Allow-Methods": "GET, OPTIONS",
+        "Access-Control-Allow-Headers": "Content-Type, If-None-Match",
+        "Access-Control-Expose-Headers": "ETag"
+    }
+    
+    if request.method == "OPTIONS":
+        return {
+            "statusCode": 200,
+            "headers": headers,
+            "body": dumps({})
+        }
+    
+    try:
+        print("🧭 Generando bundle del dashboard...")
+        
+        # Una sola lectura de la base de datos para todas las vistas
+        investments = db.get_all_investments()
+        bundle = build_dashboard(investments)
+        
+        etag = f'"{bundle["version"]}"'
+        headers["ETag"] = etag
+        headers["Cache-Control"] = "no-cache"
+        
+        # El cliente ya tiene esta versión
+        if get_header(request, "If-None-Match") == etag:
+            return {
+                "statusCode": 304,
+                "headers": headers,
+                "body": ""
+            }
+        
+        print(f"✅ Bundle {bundle['version']} con {len(investments)} inversiones")
+        
+        return {
+            "statusCode": 200,
+            "headers": headers,
+            "body": dumps({
+                "success": True,
+                **bundle
+            })
+        }
+        
+    except Exception as e:
+        import traceback
+        print(f"❌ Error en API dashboard: {e}")
+        
+        return {
+            "statusCode": 500,
+            "headers": headers,
+            "body": dumps({
+                "success": False,
+                "error": str(e),
+                "details": traceback.format_exc()
+            })
+        }
+
+# Test local
+if __name__ == "__main__":
+    print("🧪 Testeando API /api/dashboard...")
+    
+    class MockRequest:
+        method = "GET"
+    
+    result = handler(MockRequest())
+    print(f"Status: {result['statusCode']}")
+    
+    if result['statusCode'] == 200:
+        data = json.loads(result['body'])
+        print(f"✅ Success: {data['success']}")
+        print(f"🔖 Versión: {data['version']}")
+        print(f"📊 Inversiones: {len(data['investments'])}")
+        print(f"💰 Total: {data['totals']['money']}€")
+        print(f"🏦 Bancos: {data['bank']['totals']['result']}€")
+    else:
+        print(f"❌ Error: {result['body'][:200]}...")
@@ -8,11 +8,16 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utils'))
 
 try:
     from supabase_client import db
-    from yfinance_helper import get_current_value
+    from asset_refresh import price_in_base, profit_loss, purchase_rate, seed_last_good
+    from serializer import dumps
+    from profiling import profiled
 except ImportError:
     from utils.supabase_client import db
-    from utils.yfinance_helper import get_current_value
+    from utils.asset_refresh import price_in_base, profit_loss, purchase_rate, seed_last_good
+    from utils.serializer import dumps
+    from utils.profiling import profiled
 
+@profiled
 def handler(request):
     """
     Manejador para /api/edit-asset - EQUIVALENTE a app.route('/edit-asset') en Flask
@@ -28,7 +33,7 @@ def handler(request):
         return {
             "statusCode": 200,
             "headers": headers,
-            "body": json.dumps({})
+            "body": dumps({})
         }
     
     try:
@@ -43,7 +48,7 @@ def handler(request):
             return {
                 "statusCode": 400,
                 "headers": headers,
-                "body": json.dumps({
+                "body": dumps({
                     "success": False,
                     "error": "Campo 'isin' requerido"
                 })
@@ -68,7 +73,7 @@ def handler(request):
             return {
                 "statusCode": 404,
                 "headers": headers,
-                "body": json.dumps({
+                "body": dumps({
                     "success": False,
                     "error": f"Activo {isin} no encontrado"
                 })
@@ -76,41 +81,62 @@ def handler(request):
         
         investment_id = current_investment["id"]
         
+        # Precio en euros; si Yahoo falla se usa el precio ya guardado en vez de escribir 0
+        seed_last_good(current_investment)
+        current_value, currency, _ = price_in_base(
+            isin,
+            fallback=current_investment.current_value,
+            currency=current_investment.get("currency")
+        )
+        
         # Si se proporcionan nuevos valores, recalcular
         if purchase_value > 0 or amount > 0:
-            new_purchase = purchase_value if purchase_value > 0 else float(current_investment["purchase_value"])
-            new_amount = amount if amount > 0 else float(current_investment["amount"])
+            new_purchase = purchase_value if purchase_value > 0 else current_investment.purchase_value
+            new_amount = amount if amount > 0 else current_investment.amount
+            # Un nuevo valor de compra sin tipo de cambio indicado se toma como comprado hoy
+            if purchase_value > 0 or data.get("purchase_fx_rate"):
+                purchase_fx_rate = purchase_rate(currency, data.get("purchase_fx_rate"))
+            else:
+                purchase_fx_rate = current_investment.purchase_fx_rate
             
-            current_value = get_current_value(isin)
-            profit_loss = ((current_value - new_purchase) / new_purchase) * 100 if new_purchase != 0 else 0
-            total_money = new_amount + (new_amount * profit_loss / 100)
+            profit_loss_percentage = profit_loss(current_value, new_purchase, currency, purchase_fx_rate)
+            total_money = new_amount + (new_amount * profit_loss_percentage / 100)
             
             update_data = {
                 "purchase_value": new_purchase,
                 "amount": new_amount,
                 "current_value": current_value,
-                "profit_loss_percentage": profit_loss,
+                "currency": currency,
+                "purchase_fx_rate": purchase_fx_rate or None,
+                "profit_loss_percentage": profit_loss_percentage,
                 "total_money": total_money,
                 "updated_at": datetime.now().isoformat()
             }
         else:
             # Solo actualizar precio
-            current_value = get_current_value(isin)
-            current_purchase = float(current_investment["purchase_value"])
-            current_amount = float(current_investment["amount"])
+            current_purchase = current_investment.purchase_value
+            current_amount = current_investment.amount
             
-            profit_loss = ((current_value - current_purchase) / current_purchase) * 100 if current_purchase != 0 else 0
-            total_money = current_amount + (current_amount * profit_loss / 100)
+            profit_loss_percentage = profit_loss(
+                current_value, current_purchase, currency, current_investment.purchase_fx_rate
+            )
+            total_money = current_amount + (current_amount * profit_loss_percentage / 100)
             
             update_data = {
                 "current_value": current_value,
-                "profit_loss_percentage": profit_loss,
+                "currency": currency,
+                "profit_loss_percentage": profit_loss_percentage,
                 "total_money": total_money,
                 "updated_at": datetime.now().isoformat()
             }
         
         # Actualizar en Supabase
-        result = db.update_investment(investment_id, update_data)
+        result = db.update_investment(investment_id, update_data, previous=current_investment)
+        # Si hay cola de escritura diferida, guardar antes de responder
+        write_error = db.flush_writes().get(investment_id)
+        if write_error:
+            print(f"❌ No se pudo guardar el activo {isin}: {write_error}")
+            result = None
         
         if result:
             response_data = {
@@ -122,13 +148,13 @@ def handler(request):
             return {
                 "statusCode": 200,
                 "headers": headers,
-                "body": json.dumps(response_data, default=str, ensure_ascii=False)
+                "body": dumps(response_data)
             }
         else:
             return {
                 "statusCode": 500,
                 "headers": headers,
-                "body": json.dumps({
+                "body": dumps({
                     "success": False,
                     "error": "Error al actualizar"
                 })
@@ -140,7 +166,7 @@ def handler(request):
         return {
             "statusCode": 500,
             "headers": headers,
-            "body": json.dumps({
+            "body": dumps({
                 "success": False,
                 "error": str(e),
                 "message": "Error al editar activo"
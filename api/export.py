@@ -0,0 +1,144 @@
+# api/export.py
+import json
+import sys
+import os
+import base64
+from datetime import datetime
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utils'))
+
+try:
+    from supabase_client import db
+    from serializer import dumps
+    from request_helper import get_query_param
+    from exporter import EXPORT_FORMATS, is_available, parse_date, select_columns, build_table, encode
+    from profiling import profiled
+except ImportError:
+    from utils.supabase_client import db
+    from utils.serializer import dumps
+    from utils.request_helper import get_query_param
+    from utils.exporter import EXPORT_FORMATS, is_available, parse_date, select_columns, build_table, encode
+    from utils.profiling import profiled
+
+@profiled
+def handler(request):
+    """
+    API para /api/export?format=arrow|parquet&columns=isin,total_money&from=2024-01-01&to=2024-12-31
+    Exporta las posiciones como Apache Arrow (IPC stream) o Parquet con esquema tipado.
+    Las columnas y el rango de fechas (updated_at) se aplican en la consulta a Supabase.
+    """
+    headers = {
+        "Content-Type": "application/json",
+        "Access-Control-Allow-Origin": "*",
+        "Access-Control-Allow-Methods": "GET, OPTIONS",
+        "Access-Control-Allow-Headers": "Content-Type"
+    }
+    
+    if request.method == "OPTIONS":
+        return {
+            "statusCode": 200,
+            "headers": headers,
+            "body": dumps({})
+        }
+    
+    try:
+        fmt = get_query_param(request, "format", "arrow")
+        dataset = get_query_param(request, "dataset", "holdings")
+        
+        if fmt not in EXPORT_FORMATS:
+            return {
+                "statusCode": 400,
+                "headers": headers,
+                "body": dumps({
+                    "success": False,
+                    "error": f"Formato inválido: {fmt}. Usa uno de {', '.join(EXPORT_FORMATS)}"
+                })
+            }
+        
+        # Todavía no se guarda histórico de valoraciones: solo hay posiciones
+        if dataset != "holdings":
+            return {
+                "statusCode": 404,
+                "headers": headers,
+                "body": dumps({
+                    "success": False,
+                    "error": f"Dataset no disponible: {dataset}. Usa holdings"
+                })
+            }
+        
+        if not is_available():
+            return {
+                "statusCode": 501,
+                "headers": headers,
+                "body": dumps({
+                    "success": False,
+                    "error": "Exportación no disponible: falta el paquete pyarrow"
+                })
+            }
+        
+        try:
+            columns = select_columns(get_query_param(request, "columns"))
+            updated_from = parse_date(get_query_param(request, "from"))
+            updated_before = parse_date(get_query_param(request, "to"), end=True)
+        except ValueError as e:
+            return {
+                "statusCode": 400,
+                "headers": headers,
+                "body": dumps({"success": False, "error": str(e)})
+            }
+        
+        rows = db.query_investments(
+            columns,
+            updated_from.isoformat() if updated_from else None,
+            updated_before.isoformat() if updated_before else None
+        )
+        if rows is None:
+            raise RuntimeError("No se pudieron leer las inversiones")
+        
+        table = build_table(rows, columns)
+        content = encode(table, fmt)
+        content_type, extension = EXPORT_FORMATS[fmt]
+        filename = f"holdings-{datetime.now().strftime('%Y%m%d')}.{extension}"
+        
+        print(f"📦 Exportadas {table.num_rows} filas x {table.num_columns} columnas ({fmt}, {len(content)} bytes)")
+        
+        return {
+            "statusCode": 200,
+            "headers": {
+                **headers,
+                "Content-Type": content_type,
+                "Content-Disposition": f'attachment; filename="{filename}"'
+            },
+            "body": base64.b64encode(content).decode("ascii"),
+            "isBase64Encoded": True
+        }
+        
+    except Exception as e:
+        import traceback
+        print(f"❌ Error en API export: {e}")
+        
+        return {
+            "statusCode": 500,
+            "headers": headers,
+            "body": dumps({
+                "success": False,
+                "error": str(e),
+                "details": traceback.format_exc()
+            })
+        }
+
+# Test local
+if __name__ == "__main__":
+    print("🧪 Testeando API /api/export...")
+    
+    class MockRequest:
+        method = "GET"
+        path = "/api/export?format=parquet&columns=isin,asset_name,total_money"
+    
+    result = handler(MockRequest())
+    print(f"Status: {result['statusCode']}")
+    
+    if result['statusCode'] == 200:
+        print(f"✅ {len(base64.b64decode(result['body']))} bytes ({result['headers']['Content-Type']})")
+    else:
+        print(f"❌ Error: {json.loads(result['body'])['error']}")
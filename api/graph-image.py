@@ -0,0 +1,118 @@
+# api/graph-image.py
+import sys
+import os
+import base64
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utils'))
+
+try:
+    from serializer import dumps
+    from request_helper import get_query_param
+    from risk_analytics import download_closes
+    from sparklines import IMAGE_MIME_TYPES, DEFAULT_IMAGE_OPTIONS, parse_image_options, render_sparkline
+    from profiling import profiled
+except ImportError:
+    from utils.serializer import dumps
+    from utils.request_helper import get_query_param
+    from utils.risk_analytics import download_closes
+    from utils.sparklines import IMAGE_MIME_TYPES, DEFAULT_IMAGE_OPTIONS, parse_image_options, render_sparkline
+    from utils.profiling import profiled
+
+# Las gráficas son del último mes: basta con regenerarlas unas pocas veces al día
+GRAPH_CACHE_SECONDS = int(os.environ.get("GRAPH_CACHE_SECONDS", 3600))
+
+@profiled
+def handler(request):
+    """
+    API para /api/graph-image?ticker=AAPL&format=webp&width=300&height=200&dpi=100
+    Devuelve la gráfica de un ticker como imagen binaria (no JSON), cacheable por el navegador y la CDN.
+    Las URLs las genera /api/graphs?delivery=url.
+    """
+    headers = {
+        "Content-Type": "application/json",
+        "Access-Control-Allow-Origin": "*",
+        "Access-Control-Allow-Methods": "GET, OPTIONS",
+        "Access-Control-Allow-Headers": "Content-Type"
+    }
+    
+    if request.method == "OPTIONS":
+        return {
+            "statusCode": 200,
+            "headers": headers,
+            "body": dumps({})
+        }
+    
+    try:
+        ticker = get_query_param(request, "ticker")
+        if not ticker:
+            return {
+                "statusCode": 400,
+                "headers": headers,
+                "body": dumps({"success": False, "error": "Falta el parámetro ticker"})
+            }
+        
+        try:
+            options = parse_image_options(request) or dict(DEFAULT_IMAGE_OPTIONS)
+        except ValueError as e:
+            return {
+                "statusCode": 400,
+                "headers": headers,
+                "body": dumps({"success": False, "error": str(e)})
+            }
+        
+        columns, closes = download_closes([ticker], "1mo")
+        if not columns:
+            return {
+                "statusCode": 404,
+                "headers": headers,
+                "body": dumps({"success": False, "error": f"Sin datos para {ticker}"})
+            }
+        
+        content = render_sparkline(
+            closes[:, 0], options["format"], options["width"], options["height"], options["dpi"]
+        )
+        image_headers = {
+            **headers,
+            "Content-Type": IMAGE_MIME_TYPES[options["format"]],
+            "Cache-Control": f"public, max-age={GRAPH_CACHE_SECONDS}, s-maxage={GRAPH_CACHE_SECONDS}"
+        }
+        
+        if options["format"] == "svg":
+            return {
+                "statusCode": 200,
+                "headers": image_headers,
+                "body": content.decode("utf-8")
+            }
+        
+        return {
+            "statusCode": 200,
+            "headers": image_headers,
+            "body": base64.b64encode(content).decode("ascii"),
+            "isBase64Encoded": True
+        }
+        
+    except Exception as e:
+        import traceback
+        print(f"❌ Error en API graph-image: {e}")
+        
+        return {
+            "statusCode": 500,
+            "headers": headers,
+            "body": dumps({
+                "success": False,
+                "error": str(e),
+                "details": traceback.format_exc()
+            })
+        }
+
+# Test local
+if __name__ == "__main__":
+    print("🧪 Testeando API /api/graph-image...")
+    
+    class MockRequest:
+        method = "GET"
+        path = "/api/graph-image?ticker=AAPL&format=svg&width=300&height=200"
+    
+    result = handler(MockRequest())
+    print(f"Status: {result['statusCode']} ({result['headers']['Content-Type']})")
+    print(result['body'][:200])
@@ -5,22 +5,46 @@ import os
 import base64
 import io
 from datetime import datetime
+from urllib.parse import urlencode
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utils'))
 
 try:
     from supabase_client import db
+    from serializer import dumps
+    from request_helper import get_query_param
+    from market_data import yf
+    from risk_analytics import download_closes
+    from sparklines import (
+        IMAGE_MIME_TYPES, RASTER_MIME_TYPES, CELL_WIDTH_PX, CELL_HEIGHT_PX, SPRITE_DPI,
+        DEFAULT_IMAGE_OPTIONS, parse_image_options, render_sparkline, render_sprite, sprite_layout
+    )
+    from profiling import profiled
 except ImportError:
     from utils.supabase_client import db
+    from utils.serializer import dumps
+    from utils.request_helper import get_query_param
+    from utils.market_data import yf
+    from utils.risk_analytics import download_closes
+    from utils.sparklines import (
+        IMAGE_MIME_TYPES, RASTER_MIME_TYPES, CELL_WIDTH_PX, CELL_HEIGHT_PX, SPRITE_DPI,
+        DEFAULT_IMAGE_OPTIONS, parse_image_options, render_sparkline, render_sprite, sprite_layout
+    )
+    from utils.profiling import profiled
 
-import yfinance as yf
 import matplotlib
 matplotlib.use('Agg')
 import matplotlib.pyplot as plt
 import seaborn as sns
 
-def create_graph(ticker):
-    """EXACTAMENTE la misma función que en tu app.py Flask (líneas 20-36)"""
+def create_graph(ticker, options=None):
+    """
+    EXACTAMENTE la misma función que en tu app.py Flask (líneas 20-36)
+    Con options ({format, width, height, dpi}, ver parse_image_options) se genera
+    la imagen con ese formato y tamaño exacto en píxeles.
+    """
+    if options:
+        return create_image(ticker, options)
     try:
         # Descargar datos
         data = yf.download(ticker, period="1mo")
@@ -61,9 +85,75 @@ def create_graph(ticker):
         print(f"❌ Error creando gráfico para {ticker}: {e}")
         return None
 
+def create_image(ticker, options):
+    """Gráfica en base64 con el formato, tamaño y dpi de options"""
+    try:
+        columns, closes = download_closes([ticker], "1mo")
+        if not columns:
+            return None
+        content = render_sparkline(
+            closes[:, 0], options["format"], options["width"], options["height"], options["dpi"]
+        )
+        return base64.b64encode(content).decode()
+    except Exception as e:
+        print(f"❌ Error creando gráfico para {ticker}: {e}")
+        return None
+
+def image_url(ticker, options):
+    """URL binaria y cacheable de la gráfica de un ticker (api/graph-image.py)"""
+    return f"/api/graph-image?{urlencode({'ticker': ticker, **options})}"
+
+def graphable(investments):
+    """Activos con gráfica: excluir crowfounding y capital riesgo (MISMO que Flask)"""
+    return [
+        inv for inv in investments
+        if inv.get("isin") and inv.get("isin") not in ["Crowfounding", "CAPITAL RIESGO"]
+    ]
+
+def create_sprite(investments, fmt="png", cell_width=CELL_WIDTH_PX, cell_height=CELL_HEIGHT_PX, dpi=SPRITE_DPI):
+    """
+    Todas las gráficas en una sola imagen (sprite sheet):
+    una descarga de cierres para todos los tickers, una figura y una codificación.
+    Devuelve (sprite, images) con las coordenadas de cada activo dentro del sprite.
+    """
+    assets = {}
+    for inv in investments:
+        assets.setdefault(inv.get("isin"), inv.get("asset_name", "Sin nombre"))
+    if not assets:
+        # Cartera vacía o sin activos cotizados: no hay nada que descargar ni dibujar
+        return None, []
+    
+    columns, closes = download_closes(list(assets), "1mo")
+    if not columns:
+        return None, []
+    
+    content, layout = render_sprite(
+        [closes[:, i] for i in range(len(columns))],
+        fmt=fmt, cell_width=cell_width, cell_height=cell_height, dpi=dpi
+    )
+    sprite = {
+        "format": fmt,
+        "mime": IMAGE_MIME_TYPES[fmt],
+        "width": layout["width"],
+        "height": layout["height"],
+        "columns": layout["columns"],
+        "rows": layout["rows"],
+        "data": base64.b64encode(content).decode()
+    }
+    images = [
+        {"name": assets[ticker], "isin": ticker, **cell}
+        for ticker, cell in zip(columns, layout["cells"])
+    ]
+    return sprite, images
+
+@profiled
 def handler(request):
     """
     API para /api/graphs - EQUIVALENTE a app.route('/graphs') en Flask
+    Opciones de imagen: format (png|webp|svg), width y height en píxeles y dpi.
+    Con ?delivery=url cada imagen es una URL binaria cacheable en lugar de base64.
+    Con ?mode=sprite devuelve una sola imagen con todas las gráficas (png|webp)
+    y la posición de cada activo en "images"
     """
     headers = {
         "Content-Type": "application/json",
@@ -76,7 +166,7 @@ def handler(request):
         return {
             "statusCode": 200,
             "headers": headers,
-            "body": json.dumps({})
+            "body": dumps({})
         }
     
     try:
@@ -89,7 +179,7 @@ def handler(request):
             return {
                 "statusCode": 200,
                 "headers": headers,
-                "body": json.dumps({
+                "body": dumps({
                     "success": True,
                     "images": [],
                     "count": 0,
@@ -98,8 +188,75 @@ def handler(request):
                 })
             }
         
+        mode = get_query_param(request, "mode")
+        try:
+            if mode == "sprite":
+                options = parse_image_options(
+                    request, width=CELL_WIDTH_PX, height=CELL_HEIGHT_PX, dpi=SPRITE_DPI
+                ) or {"format": "png", "width": CELL_WIDTH_PX, "height": CELL_HEIGHT_PX, "dpi": SPRITE_DPI}
+                if options["format"] not in RASTER_MIME_TYPES:
+                    raise ValueError(f"El sprite solo admite {', '.join(RASTER_MIME_TYPES)}")
+                # Tamaño total del sprite: se rechaza antes de descargar precios
+                sprite_layout(len(graphable(investments)), cell_width=options["width"], cell_height=options["height"])
+            else:
+                options = parse_image_options(request)
+        except ValueError as e:
+            return {
+                "statusCode": 400,
+                "headers": headers,
+                "body": dumps({"success": False, "error": str(e)})
+            }
+        
+        if mode == "sprite":
+            sprite, images = create_sprite(
+                graphable(investments), options["format"],
+                cell_width=options["width"], cell_height=options["height"], dpi=options["dpi"]
+            )
+            print(f"✅ Sprite con {len(images)} gráficas generado")
+            
+            return {
+                "statusCode": 200,
+                "headers": headers,
+                "body": dumps({
+                    "success": True,
+                    "mode": "sprite",
+                    "count": len(images),
+                    "total": len(investments),
+                    "sprite": sprite,
+                    "images": images,
+                    "timestamp": datetime.now().isoformat()
+                })
+            }
+        
+        # URLs binarias: no se dibuja nada aquí, cada imagen se pide (y cachea) por separado
+        if get_query_param(request, "delivery") == "url":
+            options = options or dict(DEFAULT_IMAGE_OPTIONS)
+            images = [
+                {
+                    "src": image_url(inv.get("isin"), options),
+                    "mime": IMAGE_MIME_TYPES[options["format"]],
+                    "name": inv.get("asset_name", "Sin nombre"),
+                    "isin": inv.get("isin")
+                }
+                for inv in graphable(investments)
+            ]
+            
+            return {
+                "statusCode": 200,
+                "headers": headers,
+                "body": dumps({
+                    "success": True,
+                    "delivery": "url",
+                    "count": len(images),
+                    "total": len(investments),
+                    "images": images,
+                    "timestamp": datetime.now().isoformat()
+                })
+            }
+        
         images = []
         generated = 0
+        mime = IMAGE_MIME_TYPES[options["format"]] if options else "image/png"
         
         # Generar gráfica para cada inversión (MISMA lógica que Flask)
         for inv in investments:
@@ -110,11 +267,12 @@ def handler(request):
             if ticker and ticker not in ["Crowfounding", "CAPITAL RIESGO"]:
                 print(f"  📊 Generando gráfica para: {asset_name[:30]}...")
                 
-                plot_url = create_graph(ticker)
+                plot_url = create_graph(ticker, options)
                 
                 if plot_url:
                     images.append({
                         "url": plot_url,
+                        "mime": mime,
                         "name": asset_name,
                         "isin": ticker
                     })
@@ -134,7 +292,7 @@ def handler(request):
         return {
             "statusCode": 200,
             "headers": headers,
-            "body": json.dumps(response_data, default=str)
+            "body": dumps(response_data)
         }
         
     except Exception as e:
@@ -144,7 +302,7 @@ def handler(request):
         return {
             "statusCode": 500,
             "headers": headers,
-            "body": json.dumps({
+            "body": dumps({
                 "success": False,
                 "error": str(e),
                 "details": traceback.format_exc()
@@ -0,0 +1,145 @@
+# api/import.py
+import json
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utils'))
+
+try:
+    from supabase_client import db
+    from serializer import dumps
+    from request_helper import get_query_param, get_header
+    from asset_import import MAX_IMPORT_ROWS, iter_rows, validate_row, build_investments
+    from profiling import profiled
+except ImportError:
+    from utils.supabase_client import db
+    from utils.serializer import dumps
+    from utils.request_helper import get_query_param, get_header
+    from utils.asset_import import MAX_IMPORT_ROWS, iter_rows, validate_row, build_investments
+    from utils.profiling import profiled
+
+IMPORT_CHUNK_SIZE = int(os.environ.get("IMPORT_CHUNK_SIZE", 100))
+
+@profiled
+def handler(request):
+    """
+    API para /api/import - alta masiva de activos (CSV con cabecera o lista JSON)
+    Columnas: isin, asset_name, purchase_value, amount y opcionalmente investment_type.
+    Valida todas las filas, cotiza todos los tickers en un lote e inserta por bloques.
+    Devuelve un informe por fila: imported, invalid, unpriced (sin precio, no se inserta),
+    unconfirmed (la base de datos no devolvió la fila) o failed.
+    """
+    headers = {
+        "Content-Type": "application/json",
+        "Access-Control-Allow-Origin": "*",
+        "Access-Control-Allow-Methods": "POST, OPTIONS",
+        "Access-Control-Allow-Headers": "Content-Type"
+    }
+    
+    if request.method == "OPTIONS":
+        return {
+            "statusCode": 200,
+            "headers": headers,
+            "body": dumps({})
+        }
+    
+    try:
+        body = getattr(request, "body", None) or ""
+        content_type = (get_header(request, "Content-Type", "") or "").lower()
+        fmt = get_query_param(request, "format") or ("csv" if "csv" in content_type else "json")
+        
+        # Pasada de validación: las filas inválidas se informan y no se insertan
+        report = []
+        valid = []
+        for number, row in iter_rows(body, fmt):
+            if number > MAX_IMPORT_ROWS:
+                return {
+                    "statusCode": 413,
+                    "headers": headers,
+                    "body": dumps({
+                        "success": False,
+                        "error": f"Demasiadas filas: máximo {MAX_IMPORT_ROWS} por importación"
+                    })
+                }
+            try:
+                asset = validate_row(row)
+                valid.append((number, asset))
+            except ValueError as e:
+                report.append({"row": number, "isin": row.get("isin"), "status": "invalid", "error": str(e)})
+        
+        print(f"📥 Importando {len(valid)} activos ({len(report)} filas inválidas)...")
+        
+        # Sin precio no se inserta: se informa como "unpriced"
+        priced = []
+        for (number, asset), (row, reason) in zip(valid, build_investments([asset for _, asset in valid])):
+            if row is None:
+                report.append({"row": number, "isin": asset["isin"], "status": "unpriced", "error": reason})
+            else:
+                priced.append((number, asset, row))
+        
+        results = db.add_investments([row for _, _, row in priced], chunk_size=IMPORT_CHUNK_SIZE)
+        
+        for (number, asset, _), (_, saved, error) in zip(priced, results):
+            entry = {"row": number, "isin": asset["isin"]}
+            if error:
+                entry.update(status="failed", error=error)
+            elif saved:
+                entry.update(status="imported", id=saved.get("id"))
+            else:
+                # La base de datos no devolvió la fila: puede haberse insertado o no
+                entry.update(status="unconfirmed", error="Inserción sin confirmar")
+            report.append(entry)
+        report.sort(key=lambda entry: entry["row"])
+        
+        summary = {
+            status: sum(1 for entry in report if entry["status"] == status)
+            for status in ("imported", "invalid", "unpriced", "unconfirmed", "failed")
+        }
+        print(f"✅ Importación: {summary}")
+        
+        return {
+            "statusCode": 200,
+            "headers": headers,
+            "body": dumps({
+                "success": summary["imported"] > 0 or not report,
+                "summary": {"total": len(report), **summary},
+                "rows": report
+            })
+        }
+        
+    except (json.JSONDecodeError, ValueError, UnicodeDecodeError) as e:
+        return {
+            "statusCode": 400,
+            "headers": headers,
+            "body": dumps({
+                "success": False,
+                "error": f"Cuerpo inválido: {e}"
+            })
+        }
+    except Exception as e:
+        import traceback
+        print(f"❌ Error en API import: {e}")
+        
+        return {
+            "statusCode": 500,
+            "headers": headers,
+            "body": dumps({
+                "success": False,
+                "error": str(e),
+                "details": traceback.format_exc()
+            })
+        }
+
+# Test local
+if __name__ == "__main__":
+    print("🧪 Testeando API /api/import...")
+    
+    class MockRequest:
+        method = "POST"
+        path = "/api/import?format=csv"
+        headers = {"Content-Type": "text/csv"}
+        body = "isin,asset_name,purchase_value,amount,investment_type\nTSLA,Tesla (Test),250.5,1000,Acciones\n"
+    
+    result = handler(MockRequest())
+    print(f"Status: {result['statusCode']}")
+    print(json.loads(result['body']))
@@ -0,0 +1,128 @@
+# api/live.py
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utils'))
+
+try:
+    from supabase_client import db
+    from serializer import dumps
+    from live_updates import hub
+    from request_helper import get_query_param, get_header
+    from profiling import profiled
+except ImportError:
+    from utils.supabase_client import db
+    from utils.serializer import dumps
+    from utils.live_updates import hub
+    from utils.request_helper import get_query_param, get_header
+    from utils.profiling import profiled
+
+# Duración máxima de cada conexión; EventSource reconecta solo con Last-Event-ID
+LIVE_MAX_WAIT = float(os.environ.get("LIVE_MAX_WAIT", 25))
+
+def sse_event(event, data, event_id=None):
+    """Formatea un evento Server-Sent Events"""
+    lines = []
+    if event_id:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {dumps(data)}")
+    return "\n".join(lines) + "\n\n"
+
+@profiled
+def handler(request):
+    """
+    API para /api/live - cambios de precios en vivo con formato Server-Sent Events
+    Envía solo las filas cambiadas desde la versión del cliente (Last-Event-ID o ?since=).
+    Es un long-poll: los handlers devuelven el cuerpo entero, así que la respuesta se envía
+    al llegar el primer cambio (o a los LIVE_MAX_WAIT segundos) y EventSource reconecta.
+    """
+    headers = {
+        "Content-Type": "text/event-stream",
+        "Cache-Control": "no-cache",
+        "Connection": "keep-alive",
+        "Access-Control-Allow-Origin": "*",
+        "Access-Control-Allow-Methods": "GET, OPTIONS",
+        "Access-Control-Allow-Headers": "Content-Type, Last-Event-ID"
+    }
+    
+    if request.method == "OPTIONS":
+        return {
+            "statusCode": 200,
+            "headers": headers,
+            "body": ""
+        }
+    
+    try:
+        since = get_header(request, "Last-Event-ID") or get_query_param(request, "since")
+        body = "retry: 1000\n\n"
+        
+        # Primera conexión: solo se envía la versión actual para empezar a escuchar desde ahí
+        if not since:
+            investments = db.get_all_investments()
+            version = max((str(inv.get("updated_at")) for inv in investments if inv.get("updated_at")), default=None)
+            hub.seed_version(version, from_db=True)
+            body += sse_event("hello", {"version": version}, version)
+            return {
+                "statusCode": 200,
+                "headers": headers,
+                "body": body
+            }
+        
+        # Cliente atrasado respecto a este proceso: ponerse al día con una consulta delta
+        if hub.version and since < hub.version:
+            changed = db.get_investments_since(since) or []
+            deleted = db.get_deleted_since(since) or []
+            changed = [inv for inv in changed if str(inv.get("updated_at")) > since]
+            deleted = [row for row in deleted if str(row.get("deleted_at")) > since]
+            if changed or deleted:
+                version = max(
+                    [str(inv.get("updated_at")) for inv in changed] +
+                    [str(row.get("deleted_at")) for row in deleted]
+                )
+                body += sse_event("investments", {
+                    "version": version,
+                    "investments": changed,
+                    "deleted": [row["id"] for row in deleted]
+                }, version)
+                return {
+                    "statusCode": 200,
+                    "headers": headers,
+                    "body": body
+                }
+        
+        # Esperar cambios junto con el resto de clientes (un solo sondeo compartido)
+        hub.seed_version(since)
+        hub.ensure_poller(db)
+        events = hub.wait_for(since, LIVE_MAX_WAIT)
+        
+        for event in events:
+            body += sse_event("investments", event, event["version"])
+        if not events:
+            body += ": keep-alive\n\n"
+        
+        return {
+            "statusCode": 200,
+            "headers": headers,
+            "body": body
+        }
+        
+    except Exception as e:
+        print(f"❌ Error en API live: {e}")
+        
+        return {
+            "statusCode": 500,
+            "headers": headers,
+            "body": sse_event("error", {"success": False, "error": str(e)})
+        }
+
+# Test local
+if __name__ == "__main__":
+    print("🧪 Testeando API /api/live...")
+    
+    class MockRequest:
+        method = "GET"
+    
+    result = handler(MockRequest())
+    print(f"Status: {result['statusCode']}")
+    print(result['body'])
@@ -3,15 +3,34 @@ import json
 import sys
 import os
 import plotly.graph_objects as go
-import plotly
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utils'))
 
 try:
     from supabase_client import db
+    from serializer import dumps
+    from calculations import rollup_categories
+    from figure_cache import figure_cache
+    from profiling import profiled
 except ImportError:
     from utils.supabase_client import db
+    from utils.serializer import dumps
+    from utils.calculations import rollup_categories
+    from utils.figure_cache import figure_cache
+    from utils.profiling import profiled
 
+def build_figure(labels, values, colors):
+    """Gráfico de pastel (similar a Flask líneas 228-240)"""
+    return go.Figure(data=[go.Pie(
+        labels=labels,
+        values=values,
+        marker=dict(colors=colors),
+        textinfo='label+percent',
+        insidetextorientation='radial',
+        textfont=dict(color="#00FF00")
+    )])
+
+@profiled
 def handler(request):
     """
     API para /api/pie-chart - EQUIVALENTE a app.route('/pie-chart') en Flask
@@ -28,20 +47,20 @@ def handler(request):
         return {
             "statusCode": 200,
             "headers": headers,
-            "body": json.dumps({})
+            "body": dumps({})
         }
     
     try:
         print("🥧 Calculando composición de cartera...")
         
-        # Obtener todas las inversiones
-        investments = db.get_all_investments()
+        # Agregados por investment_type calculados en la base de datos
+        type_totals = db.get_category_totals()
         
-        if not investments:
+        if not type_totals:
             return {
                 "statusCode": 200,
                 "headers": headers,
-                "body": json.dumps({
+                "body": dumps({
                     "success": True,
                     "message": "No hay inversiones",
                     "categories": {},
@@ -49,47 +68,17 @@ def handler(request):
                 })
             }
         
-        # Categorizar MISMO que en Flask (líneas 178-197)
-        # Pero adaptado para Supabase (no índices, sino campos)
-        renta_fija = []
-        renta_variable = []
-        cryptomonedas = []
-        acciones = []
-        crowfounding = []
-        epsv = []
-        capital_riesgo = []
-        
-        # Nota: En tu Flask original usabas índices fijos [3:6], [6:8], etc.
-        # Aquí necesito la lógica exacta basada en investment_type
-        for inv in investments:
-            inv_type = (inv.get("investment_type") or "").upper()
-            
-            if "RENTA FIJA" in inv_type:
-                renta_fija.append(inv)
-            elif "RENTA VARIABLE" in inv_type:
-                renta_variable.append(inv)
-            elif "CRYPTO" in inv_type:
-                cryptomonedas.append(inv)
-            elif "ACCIONES" in inv_type:
-                acciones.append(inv)
-            elif "CROWFOUNDING" in inv_type:
-                crowfounding.append(inv)
-            elif "EPSV" in inv_type:
-                epsv.append(inv)
-            elif "CAPITAL RIESGO" in inv_type:
-                capital_riesgo.append(inv)
-            else:
-                # Por defecto a renta variable
-                renta_variable.append(inv)
+        # Categorizar MISMO que en Flask (líneas 178-197), sobre los agregados
+        categories = rollup_categories(type_totals)
         
         # Calcular totales (MISMO cálculo que Flask líneas 199-208)
-        total_renta_fija = sum(float(inv.get("total_money", 0)) for inv in renta_fija)
-        total_renta_variable = sum(float(inv.get("total_money", 0)) for inv in renta_variable)
-        total_crypto = sum(float(inv.get("total_money", 0)) for inv in cryptomonedas)
-        total_acciones = sum(float(inv.get("total_money", 0)) for inv in acciones)
-        total_crowfounding = sum(float(inv.get("total_money", 0)) for inv in crowfounding)
-        total_epsv = sum(float(inv.get("total_money", 0)) for inv in epsv)
-        total_capital_riesgo = sum(float(inv.get("total_money", 0)) for inv in capital_riesgo)
+        total_renta_fija = categories["renta_fija"]["total_money"]
+        total_renta_variable = categories["renta_variable"]["total_money"]
+        total_crypto = categories["cryptomonedas"]["total_money"]
+        total_acciones = categories["acciones"]["total_money"]
+        total_crowfounding = categories["crowfounding"]["total_money"]
+        total_epsv = categories["epsv"]["total_money"]
+        total_capital_riesgo = categories["capital_riesgo"]["total_money"]
         
         overall_total = (
             total_renta_fija + total_renta_variable + total_crypto + 
@@ -115,31 +104,31 @@ def handler(request):
         custom_colors = ["#FF6B6B", "#48CAE4", "#F9C74F", "#6BCB77", 
                          "#4D96FF", "#BC6FF1", "#FFA500"]
         
-        # Crear gráfico de pastel (similar a Flask líneas 228-240)
-        fig_pie = go.Figure(data=[go.Pie(
-            labels=pie_labels,
-            values=pie_values,
-            marker=dict(colors=custom_colors),
-            textinfo='label+percent',
-            insidetextorientation='radial',
-            textfont=dict(color="#00FF00")
-        )])
+        # Gráfico de pastel ya codificado: solo se construye si cambian los porcentajes
+        pie_chart = figure_cache.get_or_build(
+            "pie-chart",
+            {"labels": pie_labels, "values": pie_values, "colors": custom_colors},
+            lambda: build_figure(pie_labels, pie_values, custom_colors)
+        )
         
         # Preparar datos para la tabla (similar a Flask línea 266)
         data_list = []
-        for label, total, percentage, color in zip(
+        for label, total, percentage, color, category in zip(
             pie_labels,
             [total_renta_fija, total_renta_variable, total_crypto, total_acciones, 
              total_crowfounding, total_epsv, total_capital_riesgo],
             [perc_renta_fija, perc_renta_variable, perc_crypto, perc_acciones, 
              perc_crowfounding, perc_epsv, perc_capital_riesgo],
-            custom_colors
+            custom_colors,
+            categories.values()
         ):
             data_list.append({
                 "color": color,
                 "label": label,
                 "total": total,
-                "percentage": percentage
+                "percentage": percentage,
+                "count": category["count"],
+                "profit_loss_percentage": category["profit_loss_percentage"]
             })
         
         response_data = {
@@ -160,7 +149,7 @@ def handler(request):
                 }
             },
             "table_data": data_list,
-            "pie_chart": json.loads(json.dumps(fig_pie.to_dict(), cls=plotly.utils.PlotlyJSONEncoder))
+            "pie_chart": pie_chart
         }
         
         print(f"✅ Composición calculada: {overall_total}€ total")
@@ -168,7 +157,7 @@ def handler(request):
         return {
             "statusCode": 200,
             "headers": headers,
-            "body": json.dumps(response_data, default=str, ensure_ascii=False)
+            "body": dumps(response_data)
         }
         
     except Exception as e:
@@ -178,7 +167,7 @@ def handler(request):
         return {
             "statusCode": 500,
             "headers": headers,
-            "body": json.dumps({
+            "body": dumps({
                 "success": False,
                 "error": str(e),
                 "details": traceback.format_exc()
@@ -2,14 +2,50 @@
 import json
 import sys
 import os
+from datetime import datetime, timezone
 
 # Añadir utils al path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utils'))
 
+try:
+    from serializer import dumps
+    from request_helper import get_query_param, is_truthy
+    from columnar import wants_columnar, to_columns
+    from profiling import profiled
+    from timestamps import parse_timestamp
+except ImportError:
+    from utils.serializer import dumps
+    from utils.request_helper import get_query_param, is_truthy
+    from utils.columnar import wants_columnar, to_columns
+    from utils.profiling import profiled
+    from utils.timestamps import parse_timestamp
+
+def parse_since(value):
+    """
+    Normaliza el parámetro since (token de versión ISO o epoch en segundos) a ISO 8601.
+    Devuelve None si no es válido.
+    """
+    value = str(value).strip()
+    try:
+        if value.replace(".", "", 1).isdigit():
+            return datetime.fromtimestamp(float(value), tz=timezone.utc).isoformat()
+        parse_timestamp(value)
+        return value
+    except (ValueError, OverflowError):
+        return None
+
+def sync_version(timestamps, default=None):
+    """Token de versión: el timestamp más reciente visto (mismo formato ISO que Supabase)"""
+    timestamps = [str(ts) for ts in timestamps if ts]
+    return max(timestamps) if timestamps else default
+
+@profiled
 def handler(request):
     """
     Manejador para la ruta /api/portfolio
     Devuelve todas las inversiones con totales calculados
+    Con ?since=<version> devuelve solo las filas cambiadas y los ids borrados desde esa versión
+    Con ?format=columnar las inversiones van como un array por campo (ver utils/columnar.py)
     """
     # Configurar headers CORS
     headers = {
@@ -24,7 +60,7 @@ def handler(request):
         return {
             "statusCode": 200,
             "headers": headers,
-            "body": json.dumps({})
+            "body": dumps({})
         }
     
     try:
@@ -36,6 +72,62 @@ def handler(request):
             from supabase_client import SupabaseManager
             supabase = SupabaseManager()
         
+        columnar = wants_columnar(get_query_param(request, "format"))
+        encode_rows = to_columns if columnar else list
+        
+        # Solo totales: agregados calculados en la base de datos, sin descargar filas
+        if is_truthy(get_query_param(request, "summary", "0")):
+            type_totals = supabase.get_category_totals()
+            
+            return {
+                "statusCode": 200,
+                "headers": headers,
+                "body": dumps({
+                    "success": True,
+                    "count": sum(int(row.get("count") or 0) for row in type_totals),
+                    "totals": {
+                        "quantity": sum(float(row.get("amount") or 0) for row in type_totals),
+                        "money": sum(float(row.get("total_money") or 0) for row in type_totals),
+                        "purchase_value": sum(float(row.get("purchase_value") or 0) for row in type_totals)
+                    },
+                    "by_type": type_totals
+                })
+            }
+        
+        # Sincronización incremental: solo cambios desde la versión del cliente
+        since_param = get_query_param(request, "since")
+        if since_param:
+            since = parse_since(since_param)
+            if not since:
+                return {
+                    "statusCode": 400,
+                    "headers": headers,
+                    "body": dumps({"success": False, "error": f"Parámetro since inválido: {since_param}"})
+                }
+            
+            changed = supabase.get_investments_since(since)
+            deleted = supabase.get_deleted_since(since)
+            
+            # Sin lápidas no se pueden detectar borrados: el cliente debe recargar todo
+            if changed is not None and deleted is not None:
+                return {
+                    "statusCode": 200,
+                    "headers": headers,
+                    "body": dumps({
+                        "success": True,
+                        "delta": True,
+                        "since": since,
+                        "version": sync_version(
+                            [inv.get("updated_at") for inv in changed] +
+                            [row.get("deleted_at") for row in deleted],
+                            default=since
+                        ),
+                        "format": "columnar" if columnar else "rows",
+                        "investments": encode_rows(changed),
+                        "deleted": [row["id"] for row in deleted]
+                    })
+                }
+        
         # Obtener todas las inversiones
         investments = supabase.get_all_investments()
         
@@ -43,18 +135,21 @@ def handler(request):
             return {
                 "statusCode": 404,
                 "headers": headers,
-                "body": json.dumps({"success": False, "error": "No se encontraron inversiones"})
+                "body": dumps({"success": False, "error": "No se encontraron inversiones"})
             }
         
         # Calcular totales
-        total_quantity = sum(float(inv.get("amount", 0)) for inv in investments)
-        total_money = sum(float(inv.get("total_money", 0)) for inv in investments)
-        total_purchase_value = sum(float(inv.get("purchase_value", 0)) for inv in investments)
+        total_quantity = sum(inv.amount for inv in investments)
+        total_money = sum(inv.total_money for inv in investments)
+        total_purchase_value = sum(inv.purchase_value for inv in investments)
         
         # Preparar respuesta
         response_data = {
             "success": True,
-            "investments": investments,
+            "delta": False,
+            "version": sync_version(inv.get("updated_at") for inv in investments),
+            "format": "columnar" if columnar else "rows",
+            "investments": encode_rows(investments),
             "totals": {
                 "quantity": total_quantity,
                 "money": total_money,
@@ -65,7 +160,7 @@ def handler(request):
         return {
             "statusCode": 200,
             "headers": headers,
-            "body": json.dumps(response_data, default=str, ensure_ascii=False)
+            "body": dumps(response_data)
         }
         
     except Exception as e:
@@ -73,7 +168,7 @@ def handler(request):
         return {
             "statusCode": 500,
             "headers": headers,
-            "body": json.dumps({
+            "body": dumps({
                 "success": False,
                 "error": str(e),
                 "details": traceback.format_exc()
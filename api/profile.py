@@ -0,0 +1,89 @@
+# api/profile.py
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utils'))
+
+try:
+    from serializer import dumps
+    from request_helper import get_query_param
+    from profiling import PROFILE_FORMATS, is_authorized, load_profile
+except ImportError:
+    from utils.serializer import dumps
+    from utils.request_helper import get_query_param
+    from utils.profiling import PROFILE_FORMATS, is_authorized, load_profile
+
+def handler(request):
+    """
+    API para /api/profile?id=<X-Profile-Id>&format=collapsed|speedscope&profile=<token>
+    Devuelve un perfil guardado por una petición perfilada (ver utils/profiling.py).
+    Solo para llamadas con PROFILE_TOKEN.
+    """
+    headers = {
+        "Content-Type": "application/json",
+        "Access-Control-Allow-Origin": "*",
+        "Access-Control-Allow-Methods": "GET, OPTIONS",
+        "Access-Control-Allow-Headers": "Content-Type, X-Profile"
+    }
+    
+    if request.method == "OPTIONS":
+        return {
+            "statusCode": 200,
+            "headers": headers,
+            "body": dumps({})
+        }
+    
+    if not is_authorized(request):
+        return {
+            "statusCode": 403,
+            "headers": headers,
+            "body": dumps({
+                "success": False,
+                "error": "Perfilado no autorizado"
+            })
+        }
+    
+    profile_id = get_query_param(request, "id")
+    fmt = get_query_param(request, "format", "collapsed")
+    if not profile_id or fmt not in PROFILE_FORMATS:
+        return {
+            "statusCode": 400,
+            "headers": headers,
+            "body": dumps({
+                "success": False,
+                "error": f"Indica id y format ({', '.join(PROFILE_FORMATS)})"
+            })
+        }
+    
+    body = load_profile(profile_id, fmt)
+    if body is None:
+        return {
+            "statusCode": 404,
+            "headers": headers,
+            "body": dumps({
+                "success": False,
+                "error": f"Perfil {profile_id} no encontrado"
+            })
+        }
+    
+    return {
+        "statusCode": 200,
+        "headers": {
+            **headers,
+            "Content-Type": PROFILE_FORMATS[fmt],
+            "Content-Disposition": f'attachment; filename="{profile_id}.{"speedscope.json" if fmt == "speedscope" else "txt"}"'
+        },
+        "body": body
+    }
+
+# Test local
+if __name__ == "__main__":
+    print("🧪 Testeando API /api/profile...")
+    
+    class MockRequest:
+        method = "GET"
+        args = {"id": "inexistente", "profile": os.environ.get("PROFILE_TOKEN", "")}
+    
+    result = handler(MockRequest())
+    print(f"Status: {result['statusCode']}")
+    print(result['body'][:200])
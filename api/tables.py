@@ -7,13 +7,25 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utils'))
 
 try:
     from supabase_client import db
+    from serializer import dumps
+    from calculations import CATEGORY_KEYS, rollup_categories
+    from request_helper import get_query_param, is_truthy
+    from columnar import wants_columnar, to_columns, index_groups
+    from profiling import profiled
 except ImportError:
     from utils.supabase_client import db
+    from utils.serializer import dumps
+    from utils.calculations import CATEGORY_KEYS, rollup_categories
+    from utils.request_helper import get_query_param, is_truthy
+    from utils.columnar import wants_columnar, to_columns, index_groups
+    from utils.profiling import profiled
 
+@profiled
 def handler(request):
     """
     Manejador para /api/tables - EQUIVALENTE a app.route('/tables') en Flask
     Devuelve inversiones categorizadas por investment_type
+    Con ?format=columnar las filas van una vez, por columnas, y cada categoría es una lista de índices
     """
     headers = {
         "Content-Type": "application/json",
@@ -26,12 +38,28 @@ def handler(request):
         return {
             "statusCode": 200,
             "headers": headers,
-            "body": json.dumps({})
+            "body": dumps({})
         }
     
     try:
         print("📊 Obteniendo inversiones para /tables...")
         
+        # Solo conteos: agregados calculados en la base de datos, sin descargar filas
+        if is_truthy(get_query_param(request, "summary", "0")):
+            categories = rollup_categories(db.get_category_totals(), include_dca=True)
+            counts = {key: data["count"] for key, data in categories.items()}
+            counts = {"total": sum(counts.values()), **counts}
+            
+            return {
+                "statusCode": 200,
+                "headers": headers,
+                "body": dumps({
+                    "success": True,
+                    "counts": counts,
+                    "totals": categories
+                })
+            }
+        
         # Obtener todas las inversiones (MISMA lógica que Flask)
         investments = db.get_all_investments()
         
@@ -39,83 +67,59 @@ def handler(request):
             return {
                 "statusCode": 200,
                 "headers": headers,
-                "body": json.dumps({
+                "body": dumps({
                     "success": True,
                     "categories": {},
                     "counts": {"total": 0}
                 })
             }
         
+        # Formato columnar: filas una sola vez, categorías como índices
+        if wants_columnar(get_query_param(request, "format")):
+            categories = index_groups(
+                investments,
+                lambda inv: inv.category.value,
+                CATEGORY_KEYS
+            )
+            counts = {"total": len(investments)}
+            counts.update({key: len(indices) for key, indices in categories.items()})
+            
+            return {
+                "statusCode": 200,
+                "headers": headers,
+                "body": dumps({
+                    "success": True,
+                    "format": "columnar",
+                    "investments": to_columns(investments),
+                    "categories": categories,
+                    "counts": counts
+                })
+            }
+        
         # Categorizar EXACTAMENTE como en tu Flask original
         # Basado en investment_type (índice 8 en Flask, campo en Supabase)
-        dca = []
-        renta_fija = []
-        renta_variable = []
-        cryptomonedas = []
-        acciones = []
-        crowfounding = []
-        epsv = []
-        capital_riesgo = []
+        categories = {key: [] for key in CATEGORY_KEYS}
         
         for inv in investments:
-            inv_type = (inv.get("investment_type") or "").upper()
-            
-            # MISMA lógica de categorización que en tu app.py
-            if "DCA" in inv_type and ("RENTA FIJA" in inv_type or "RENTA VARIABLE" in inv_type):
-                dca.append(inv)
-            elif "RENTA FIJA" in inv_type:
-                renta_fija.append(inv)
-            elif "RENTA VARIABLE" in inv_type:
-                renta_variable.append(inv)
-            elif "CRYPTO" in inv_type:
-                cryptomonedas.append(inv)
-            elif "ACCIONES" in inv_type:
-                acciones.append(inv)
-            elif "CROWFOUNDING" in inv_type:
-                crowfounding.append(inv)
-            elif "EPSV" in inv_type:
-                epsv.append(inv)
-            elif "CAPITAL RIESGO" in inv_type:
-                capital_riesgo.append(inv)
-            else:
-                # Por defecto a renta variable (MISMO que Flask)
-                renta_variable.append(inv)
+            categories[inv.category.value].append(inv)
         
         # Contar totales
-        counts = {
-            "total": len(investments),
-            "dca": len(dca),
-            "renta_fija": len(renta_fija),
-            "renta_variable": len(renta_variable),
-            "cryptomonedas": len(cryptomonedas),
-            "acciones": len(acciones),
-            "crowfounding": len(crowfounding),
-            "epsv": len(epsv),
-            "capital_riesgo": len(capital_riesgo)
-        }
+        counts = {"total": len(investments)}
+        counts.update({key: len(rows) for key, rows in categories.items()})
         
         print(f"✅ Categorizadas {len(investments)} inversiones")
         
         # MISMA estructura de respuesta que Flask
         response_data = {
             "success": True,
-            "categories": {
-                "dca": dca,
-                "renta_fija": renta_fija,
-                "renta_variable": renta_variable,
-                "cryptomonedas": cryptomonedas,
-                "acciones": acciones,
-                "crowfounding": crowfounding,
-                "epsv": epsv,
-                "capital_riesgo": capital_riesgo
-            },
+            "categories": categories,
             "counts": counts
         }
         
         return {
             "statusCode": 200,
             "headers": headers,
-            "body": json.dumps(response_data, default=str, ensure_ascii=False)
+            "body": dumps(response_data)
         }
         
     except Exception as e:
@@ -125,7 +129,7 @@ def handler(request):
         return {
             "statusCode": 500,
             "headers": headers,
-            "body": json.dumps({
+            "body": dumps({
                 "success": False,
                 "error": str(e),
                 "message": "Error al obtener datos categorizados"
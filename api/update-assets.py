@@ -2,21 +2,51 @@
 import json
 import sys
 import os
-from datetime import datetime
+import time
+import math
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utils'))
 
 try:
     from supabase_client import db
-    from yfinance_helper import get_current_value
+    from serializer import dumps
+    from refresh_scheduler import scheduler, REFRESH_INLINE
+    from request_helper import get_query_param, is_truthy
+    from profiling import profiled
 except ImportError:
     from utils.supabase_client import db
-    from utils.yfinance_helper import get_current_value
+    from utils.serializer import dumps
+    from utils.refresh_scheduler import scheduler, REFRESH_INLINE
+    from utils.request_helper import get_query_param, is_truthy
+    from utils.profiling import profiled
 
+# Presupuesto por defecto de ?budget: por debajo del límite de 10s de una función de Vercel
+UPDATE_BUDGET_SECONDS = float(os.environ.get("UPDATE_BUDGET_SECONDS", 8))
+UPDATE_MAX_BUDGET_SECONDS = float(os.environ.get("UPDATE_MAX_BUDGET_SECONDS", 55))
+
+def parse_budget(request):
+    """Segundos de ?budget= (vacío: UPDATE_BUDGET_SECONDS), acotados a UPDATE_MAX_BUDGET_SECONDS"""
+    value = get_query_param(request, "budget")
+    budget = float(value) if value not in (None, "") else UPDATE_BUDGET_SECONDS
+    if not math.isfinite(budget) or budget <= 0:
+        raise ValueError("budget debe ser un número mayor que 0")
+    return min(budget, UPDATE_MAX_BUDGET_SECONDS)
+
+@profiled
 def handler(request):
     """
     Manejador para /api/update-assets - EQUIVALENTE a app.route('/update-assets') en Flask
+    Por defecto encola un job en segundo plano y devuelve su id (202);
+    con ?wait=1 espera a que termine como antes.
+    Las peticiones simultáneas comparten el mismo job.
+    Con ?budget=<segundos> actualiza dentro de la petición y se para antes del límite;
+    devuelve next_cursor y la siguiente llamada continúa donde se quedó
+    (?cursor=<id> para elegir el punto de partida, ?cursor=0 para empezar de cero).
+    Con REFRESH_INLINE (por defecto en Vercel) siempre se usa este modo: un job en segundo
+    plano no terminaría después de responder.
+    status es "failed" si ningún activo se pudo actualizar.
     """
+    started = time.monotonic()
     headers = {
         "Content-Type": "application/json",
         "Access-Control-Allow-Origin": "*",
@@ -28,10 +58,51 @@ def handler(request):
         return {
             "statusCode": 200,
             "headers": headers,
-            "body": json.dumps({})
+            "body": dumps({})
         }
     
     try:
+        inline = REFRESH_INLINE or get_query_param(request, "budget") is not None or get_query_param(request, "cursor") is not None
+        if inline:
+            try:
+                budget = parse_budget(request)
+                cursor = get_query_param(request, "cursor")
+                cursor = int(cursor) if cursor not in (None, "") else None
+            except ValueError as e:
+                return {
+                    "statusCode": 400,
+                    "headers": headers,
+                    "body": dumps({
+                        "success": False,
+                        "error": f"Parámetros no válidos: {e}"
+                    })
+                }
+            
+            print(f"🔄 Actualización con presupuesto de {budget:.1f}s (cursor: {cursor})")
+            job, next_cursor = scheduler.run_until(started + budget, cursor)
+            complete = next_cursor is None
+            return {
+                "statusCode": 200,
+                "headers": headers,
+                "body": dumps({
+                    "success": True,
+                    "message": (
+                        f"Actualización completada. {job.updated} activos actualizados."
+                        if complete else
+                        f"Tiempo agotado: {job.processed}/{job.total} activos procesados, quedan {job.total - job.processed}."
+                    ),
+                    "status": job.status,
+                    "updated_count": job.updated,
+                    "processed": job.processed,
+                    "remaining": job.total - job.processed,
+                    "errors": job.errors if job.errors else None,
+                    "complete": complete,
+                    "next_cursor": next_cursor,
+                    "resume_url": None if complete else f"/api/update-assets?budget={budget:g}&cursor={next_cursor}",
+                    "elapsed_seconds": round(time.monotonic() - started, 3)
+                })
+            }
+        
         print(f"🔄 Iniciando actualización de activos...")
         
         # Obtener todas las inversiones
@@ -41,79 +112,47 @@ def handler(request):
             return {
                 "statusCode": 200,
                 "headers": headers,
-                "body": json.dumps({
+                "body": dumps({
                     "success": True,
                     "message": "No hay inversiones para actualizar",
                     "updated_count": 0
                 })
             }
         
-        updated_count = 0
-        errors = []
+        # Job en segundo plano: el progreso se consulta en /api/update-status?job=...
+        job = scheduler.submit(investments)
         
-        # Actualizar cada inversión (MISMA lógica que Flask)
-        for inv in investments:
-            investment_id = inv["id"]
-            isin = inv["isin"]
-            asset_name = inv["asset_name"]
-            purchase_value = float(inv["purchase_value"])
-            amount = float(inv["amount"])
-            
-            # MISMO filtro que Flask (línea 64)
-            if "crowfounding" not in isin.lower() and "capital riesgo" not in isin.lower():
-                print(f"  📈 Actualizando: {asset_name[:30]}...")
-                
-                try:
-                    # Obtener precio actual
-                    current_value = get_current_value(isin)
-                    
-                    # Calcular ganancia/pérdida (MISMO cálculo que Flask)
-                    if purchase_value != 0:
-                        profit_loss_percentage = ((current_value - purchase_value) / purchase_value) * 100
-                    else:
-                        profit_loss_percentage = 0
-                    
-                    # Calcular dinero total (MISMO cálculo que Flask)
-                    total_money = amount + (amount * profit_loss_percentage / 100)
-                    
-                    # Preparar datos para actualizar
-                    update_data = {
-                        "current_value": current_value,
-                        "total_money": total_money,
-                        "profit_loss_percentage": profit_loss_percentage,
-                        "updated_at": datetime.now().isoformat()
-                    }
-                    
-                    # Actualizar en Supabase
-                    result = db.update_investment(investment_id, update_data)
-                    
-                    if result:
-                        updated_count += 1
-                        print(f"    ✅ Actualizado: {current_value}€ ({profit_loss_percentage:.2f}%)")
-                    else:
-                        errors.append(f"Error al actualizar {asset_name}")
-                        
-                except Exception as e:
-                    error_msg = f"Error con {asset_name}: {str(e)}"
-                    errors.append(error_msg)
-                    print(f"    ⚠️  {error_msg}")
-            else:
-                print(f"  ⏭️  Saltando (crowfounding/capital riesgo): {asset_name[:30]}...")
+        if not is_truthy(get_query_param(request, "wait", "0")):
+            return {
+                "statusCode": 202,
+                "headers": headers,
+                "body": dumps({
+                    "success": True,
+                    "message": f"Actualización encolada ({job.total} activos).",
+                    "job_id": job.id,
+                    "status_url": f"/api/update-status?job={job.id}",
+                    "job": job.to_dict()
+                })
+            }
+        
+        job = scheduler.wait(job.id)
         
         # Preparar respuesta (MISMA estructura que Flask)
         response_data = {
             "success": True,
-            "message": f"Actualización completada. {updated_count} activos actualizados.",
-            "updated_count": updated_count,
-            "errors": errors if errors else None
+            "message": f"Actualización completada. {job.updated} activos actualizados.",
+            "status": job.status,
+            "updated_count": job.updated,
+            "errors": job.errors if job.errors else None,
+            "job_id": job.id
         }
         
-        print(f"✅ {updated_count}/{len(investments)} activos actualizados")
+        print(f"✅ {job.updated}/{len(investments)} activos actualizados")
         
         return {
             "statusCode": 200,
             "headers": headers,
-            "body": json.dumps(response_data, default=str, ensure_ascii=False)
+            "body": dumps(response_data)
         }
         
     except Exception as e:
@@ -123,7 +162,7 @@ def handler(request):
         return {
             "statusCode": 500,
             "headers": headers,
-            "body": json.dumps({
+            "body": dumps({
                 "success": False,
                 "error": str(e),
                 "message": "Error al actualizar activos"
@@ -136,6 +175,7 @@ if __name__ == "__main__":
     
     class MockRequest:
         method = "POST"
+        path = "/api/update-assets?wait=1"
     
     result = handler(MockRequest())
     print(f"Status: {result['statusCode']}")
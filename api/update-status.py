@@ -0,0 +1,103 @@
+# api/update-status.py
+import json
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utils'))
+
+try:
+    from serializer import dumps
+    from refresh_scheduler import scheduler
+    from request_helper import get_query_param
+    from profiling import profiled
+except ImportError:
+    from utils.serializer import dumps
+    from utils.refresh_scheduler import scheduler
+    from utils.request_helper import get_query_param
+    from utils.profiling import profiled
+
+@profiled
+def handler(request):
+    """
+    API para /api/update-status?job=<id>
+    Devuelve el progreso de un job de actualización de precios
+    (sin parámetro job, lista los jobs recientes)
+    """
+    headers = {
+        "Content-Type": "application/json",
+        "Access-Control-Allow-Origin": "*",
+        "Access-Control-Allow-Methods": "GET, OPTIONS",
+        "Access-Control-Allow-Headers": "Content-Type"
+    }
+    
+    if request.method == "OPTIONS":
+        return {
+            "statusCode": 200,
+            "headers": headers,
+            "body": dumps({})
+        }
+    
+    try:
+        job_id = get_query_param(request, "job")
+        
+        if not job_id:
+            return {
+                "statusCode": 200,
+                "headers": headers,
+                "body": dumps({
+                    "success": True,
+                    "jobs": [job.to_dict() for job in scheduler.list_jobs()]
+                })
+            }
+        
+        job = scheduler.get_job(job_id)
+        
+        if not job:
+            return {
+                "statusCode": 404,
+                "headers": headers,
+                "body": dumps({
+                    "success": False,
+                    # Los jobs viven en memoria de la instancia que los creó
+                    "error": f"Job {job_id} no encontrado (puede haberse creado en otra instancia)"
+                })
+            }
+        
+        return {
+            "statusCode": 200,
+            "headers": headers,
+            "body": dumps({
+                "success": True,
+                **job.to_dict()
+            })
+        }
+    
+    except Exception as e:
+        print(f"❌ Error en API update-status: {e}")
+        
+        return {
+            "statusCode": 500,
+            "headers": headers,
+            "body": dumps({
+                "success": False,
+                "error": str(e),
+                "message": "Error al consultar el estado de la actualización"
+            })
+        }
+
+# Test local
+if __name__ == "__main__":
+    print("🧪 Testeando API /api/update-status...")
+    
+    class MockRequest:
+        method = "GET"
+    
+    result = handler(MockRequest())
+    print(f"Status: {result['statusCode']}")
+    
+    if result['statusCode'] == 200:
+        data = json.loads(result['body'])
+        print(f"✅ Success: {data['success']}")
+        print(f"🗓️  Jobs: {len(data['jobs'])}")
+    else:
+        print(f"❌ Error: {result['body']}")
@@ -0,0 +1,201 @@
+# loadtest.py
+"""
+Driver de carga: reproduce una mezcla realista de tráfico contra un servidor en marcha
+y mide rendimiento (peticiones/s), latencias (p50/p90/p95/p99) y tasa de errores por ruta.
+
+Uso:
+    python loadtest.py --url http://127.0.0.1:3000 --concurrency 20 --duration 30
+    python loadtest.py --offline --concurrency 50      # servidor local con datos y precios simulados
+    python loadtest.py --mix page=70,dashboard=10,graphs=10,update=5,add=5 --json results.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from collections import defaultdict
+import numpy as np
+import httpx
+
+# Escenarios: lista de peticiones (método, ruta, cuerpo) que hace un usuario en cada acción
+def scenario_page(rng):
+    """Carga del dashboard: cartera y composición"""
+    return [("GET", "/api/portfolio", None), ("GET", "/api/pie-chart", None)]
+
+def scenario_dashboard(rng):
+    return [("GET", "/api/dashboard", None)]
+
+def scenario_graphs(rng):
+    return [("GET", "/api/graphs?mode=sprite", None)]
+
+def scenario_update(rng):
+    return [("POST", "/api/update-assets", None)]
+
+def scenario_add(rng):
+    ticker = f"LOAD{rng.randint(1, 999):03d}"
+    return [("POST", "/api/add-asset", {
+        "isin": ticker,
+        "asset_name": f"Carga {ticker}",
+        "purchase_value": round(rng.uniform(5, 500), 2),
+        "amount": round(rng.uniform(100, 5000), 2),
+        "investment_type": rng.choice(["Renta Variable", "Renta Fija", "Acciones", "Crypto"])
+    })]
+
+SCENARIOS = {
+    "page": scenario_page,
+    "dashboard": scenario_dashboard,
+    "graphs": scenario_graphs,
+    "update": scenario_update,
+    "add": scenario_add,
+}
+DEFAULT_MIX = "page=70,dashboard=10,graphs=10,update=5,add=5"
+
+def parse_mix(text):
+    """'page=70,graphs=10' -> {"page": 70.0, "graphs": 10.0}"""
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError(f"Escenario desconocido: {name}. Usa {', '.join(SCENARIOS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+class Results:
+    """Latencias y errores por ruta (thread-safe)"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+    
+    def record(self, route, status, elapsed):
+        with self._lock:
+            self.latencies[route].append(elapsed)
+            self.statuses[route][status] += 1
+            if status == "error" or status >= 400:
+                self.errors[route] += 1
+    
+    def summary(self, wall_seconds):
+        rows = {}
+        with self._lock:
+            routes = sorted(self.latencies)
+            everything = [value for route in routes for value in self.latencies[route]]
+            for route in routes + ["TOTAL"]:
+                values = np.array(everything if route == "TOTAL" else self.latencies[route]) * 1000
+                errors = sum(self.errors.values()) if route == "TOTAL" else self.errors[route]
+                p50, p90, p95, p99 = np.percentile(values, [50, 90, 95, 99]) if len(values) else (0, 0, 0, 0)
+                rows[route] = {
+                    "requests": int(len(values)),
+                    "rps": len(values) / wall_seconds if wall_seconds else 0.0,
+                    "errors": int(errors),
+                    "error_rate": errors / len(values) if len(values) else 0.0,
+                    "p50_ms": float(p50),
+                    "p90_ms": float(p90),
+                    "p95_ms": float(p95),
+                    "p99_ms": float(p99),
+                    "max_ms": float(values.max()) if len(values) else 0.0,
+                    "statuses": {} if route == "TOTAL" else {str(k): v for k, v in self.statuses[route].items()}
+                }
+        return rows
+
+def worker(base_url, mix, deadline, results, think, seed, timeout):
+    rng = random.Random(seed)
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    with httpx.Client(base_url=base_url, timeout=timeout) as client:
+        while time.monotonic() < deadline:
+            scenario = SCENARIOS[rng.choices(names, weights)[0]]
+            for method, path, body in scenario(rng):
+                route = path.split("?")[0]
+                started = time.perf_counter()
+                try:
+                    response = client.request(method, path, json=body)
+                    status = response.status_code
+                except httpx.HTTPError:
+                    status = "error"
+                results.record(route, status, time.perf_counter() - started)
+            if think:
+                time.sleep(rng.expovariate(1 / think))
+
+def run(base_url, concurrency, duration, mix, think=0.0, timeout=60.0, seed=1):
+    results = Results()
+    deadline = time.monotonic() + duration
+    threads = [
+        threading.Thread(
+            target=worker,
+            args=(base_url, mix, deadline, results, think, seed + i, timeout),
+            name=f"load-{i}",
+            daemon=True
+        )
+        for i in range(concurrency)
+    ]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results.summary(time.monotonic() - started)
+
+def start_offline_server():
+    """
+    Arranca server.py en este proceso con los sustitutos locales:
+    almacenamiento en memoria (PORTFOLIO_BACKEND=local) y precios simulados (PRICE_SOURCE=fake).
+    """
+    os.environ.setdefault("PORTFOLIO_BACKEND", "local")
+    os.environ.setdefault("PRICE_SOURCE", "fake")
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from werkzeug.serving import make_server
+    import server
+    
+    app = server.create_app()
+    httpd = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=httpd.serve_forever, name="offline-server", daemon=True).start()
+    return f"http://127.0.0.1:{httpd.server_port}"
+
+def print_report(summary, concurrency, duration):
+    print(f"\n📊 Resultados ({concurrency} usuarios concurrentes, {duration:.0f}s)")
+    header = f"{'ruta':<22}{'peticiones':>11}{'req/s':>9}{'errores':>9}{'p50':>9}{'p90':>9}{'p95':>9}{'p99':>9}{'max':>9}"
+    print(header)
+    print("-" * len(header))
+    for route, row in summary.items():
+        print(
+            f"{route:<22}{row['requests']:>11}{row['rps']:>9.1f}{row['error_rate']:>8.1%} "
+            f"{row['p50_ms']:>8.0f}{row['p90_ms']:>9.0f}{row['p95_ms']:>9.0f}{row['p99_ms']:>9.0f}{row['max_ms']:>9.0f}"
+        )
+    print("(latencias en ms)")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prueba de carga de la API de la cartera")
+    parser.add_argument("--url", default="http://127.0.0.1:3000", help="servidor a probar")
+    parser.add_argument("--offline", action="store_true",
+                        help="arrancar un servidor local con almacenamiento y precios simulados")
+    parser.add_argument("--concurrency", type=int, default=10, help="usuarios simultáneos")
+    parser.add_argument("--duration", type=float, default=30, help="segundos de prueba")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"pesos por escenario (por defecto {DEFAULT_MIX})")
+    parser.add_argument("--think", type=float, default=0.0, help="pausa media entre acciones de un usuario (s)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="timeout por petición (s)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="guardar los resultados en este fichero")
+    args = parser.parse_args(argv)
+    
+    mix = parse_mix(args.mix)
+    base_url = start_offline_server() if args.offline else args.url.rstrip("/")
+    print(f"🚦 {args.concurrency} usuarios contra {base_url} durante {args.duration:.0f}s: {args.mix}")
+    
+    summary = run(base_url, args.concurrency, args.duration, mix, args.think, args.timeout, args.seed)
+    print_report(summary, args.concurrency, args.duration)
+    
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"url": base_url, "concurrency": args.concurrency, "duration": args.duration,
+                       "mix": mix, "routes": summary}, f, indent=2)
+        print(f"💾 Resultados guardados en {args.json}")
+    
+    return 1 if summary.get("TOTAL", {}).get("errors") else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,18 +2,119 @@
 const API_BASE = '/api';  // En local: 'http://localhost:3000/api'
 
 class InvestmentAPI {
-    // Obtener toda la cartera
+    // Obtener toda la cartera.
+    // Guarda las filas en localStorage y en las siguientes cargas pide solo los cambios (?since=version).
     static async getPortfolio() {
         try {
-            const response = await fetch(`${API_BASE}/portfolio`);
+            const cached = JSON.parse(localStorage.getItem('portfolio') || 'null');
+            const url = cached && cached.version
+                ? `${API_BASE}/portfolio?format=columnar&since=${encodeURIComponent(cached.version)}`
+                : `${API_BASE}/portfolio?format=columnar`;
+            const response = await fetch(url);
+            if (response.status === 400 && cached) {
+                // Versión guardada no válida: se descarta y se pide la cartera completa
+                localStorage.removeItem('portfolio');
+                return InvestmentAPI.getPortfolio();
+            }
             if (!response.ok) throw new Error(`Error ${response.status}`);
-            return await response.json();
+            const data = await response.json();
+            if (!data.success) return data;
+            if (data.format === 'columnar') data.investments = InvestmentAPI.fromColumns(data.investments);
+
+            let rows = {};
+            if (data.delta && cached) {
+                rows = cached.rows;
+                data.investments.forEach(inv => { rows[inv.id] = inv; });
+                (data.deleted || []).forEach(id => { delete rows[id]; });
+            } else {
+                data.investments.forEach(inv => { rows[inv.id] = inv; });
+            }
+            localStorage.setItem('portfolio', JSON.stringify({ version: data.version, rows }));
+
+            const investments = Object.values(rows).sort((a, b) => a.id - b.id);
+            return {
+                success: true,
+                investments,
+                totals: InvestmentAPI.computeTotals(investments)
+            };
         } catch (error) {
             console.error('Error al obtener cartera:', error);
             throw error;
         }
     }
 
+    // Rehidrata una respuesta ?format=columnar: {length, fields, columns} -> lista de objetos
+    static fromColumns(block) {
+        const { length, fields, columns } = block;
+        const rows = new Array(length);
+        for (let i = 0; i < length; i++) {
+            const row = {};
+            for (let f = 0; f < fields.length; f++) row[fields[f]] = columns[f][i];
+            rows[i] = row;
+        }
+        return rows;
+    }
+
+    // Inversiones por categoría en formato columnar: cada categoría es una lista de índices
+    // y se rehidrata apuntando a las mismas filas (sin copias)
+    static async getTables() {
+        try {
+            const response = await fetch(`${API_BASE}/tables?format=columnar`);
+            if (!response.ok) throw new Error(`HTTP ${response.status}`);
+            const data = await response.json();
+            if (!data.success || data.format !== 'columnar') return data;
+            const investments = InvestmentAPI.fromColumns(data.investments);
+            const categories = {};
+            Object.entries(data.categories).forEach(([key, indices]) => {
+                categories[key] = indices.map(i => investments[i]);
+            });
+            return { success: true, categories, counts: data.counts };
+        } catch (error) {
+            console.error('Error al obtener tablas:', error);
+            throw error;
+        }
+    }
+
+    // MISMOS totales que /api/portfolio
+    static computeTotals(investments) {
+        return investments.reduce((totals, inv) => {
+            totals.quantity += parseFloat(inv.amount || 0);
+            totals.money += parseFloat(inv.total_money || 0);
+            totals.purchase_value += parseFloat(inv.purchase_value || 0);
+            return totals;
+        }, { quantity: 0, money: 0, purchase_value: 0 });
+    }
+
+    // Obtener el bundle del dashboard (una sola petición para todas las vistas).
+    // Se guarda en sessionStorage y se revalida con ETag: si no ha cambiado, 304 sin cuerpo.
+    static async getDashboard() {
+        const cached = JSON.parse(sessionStorage.getItem('dashboard') || 'null');
+        try {
+            const response = await fetch(`${API_BASE}/dashboard`, {
+                headers: cached ? { 'If-None-Match': `"${cached.version}"` } : {}
+            });
+            if (response.status === 304 && cached) return cached;
+            if (!response.ok) throw new Error(`Error ${response.status}`);
+            const data = await response.json();
+            sessionStorage.setItem('dashboard', JSON.stringify(data));
+            return data;
+        } catch (error) {
+            console.error('Error al obtener dashboard:', error);
+            throw error;
+        }
+    }
+
+    // Métricas de riesgo: volatilidad, máxima caída, beta y correlaciones
+    static async getAnalytics(period = '1y') {
+        try {
+            const response = await fetch(`${API_BASE}/analytics?period=${encodeURIComponent(period)}`);
+            return await response.json();
+        } catch (error) {
+            console.error('Error al obtener analytics:', error);
+            throw error;
+        }
+    }
+
     // Actualizar precios de activos
     static async updateAssets() {
         try {
@@ -27,6 +128,43 @@ class InvestmentAPI {
         }
     }
 
+    // Actualizar precios en varias llamadas cortas (budget en segundos), reanudando con el cursor
+    static async updateAssetsInSteps(budget = 8, onStep = null) {
+        let cursor = 0;
+        let updated = 0;
+        try {
+            while (true) {
+                const response = await fetch(`${API_BASE}/update-assets?budget=${budget}&cursor=${cursor}`, {
+                    method: 'POST'
+                });
+                const data = await response.json();
+                if (!data.success) return data;
+                updated += data.updated_count;
+                if (onStep) onStep(data);
+                if (data.complete) return { ...data, updated_count: updated };
+                // Sin avance (o sin cursor) no se vuelve a llamar: evita un bucle infinito
+                if (!data.processed || data.next_cursor == null || data.next_cursor === cursor) {
+                    return { ...data, updated_count: updated };
+                }
+                cursor = data.next_cursor;
+            }
+        } catch (error) {
+            console.error('Error al actualizar activos por tramos:', error);
+            throw error;
+        }
+    }
+
+    // Consultar progreso de un job de actualización
+    static async getUpdateStatus(jobId) {
+        try {
+            const response = await fetch(`${API_BASE}/update-status?job=${encodeURIComponent(jobId)}`);
+            return await response.json();
+        } catch (error) {
+            console.error('Error al consultar actualización:', error);
+            throw error;
+        }
+    }
+
     // Añadir nuevo activo
     static async addAsset(assetData) {
         try {
@@ -44,6 +182,24 @@ class InvestmentAPI {
         }
     }
 
+    // Importar muchos activos de una vez (texto CSV con cabecera o lista de objetos)
+    static async importAssets(assets) {
+        try {
+            const isCsv = typeof assets === 'string';
+            const response = await fetch(`${API_BASE}/import`, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': isCsv ? 'text/csv' : 'application/json'
+                },
+                body: isCsv ? assets : JSON.stringify(assets)
+            });
+            return await response.json();
+        } catch (error) {
+            console.error('Error al importar activos:', error);
+            throw error;
+        }
+    }
+
     // Editar activo existente
     static async editAsset(assetId, updateData) {
         try {
@@ -61,6 +217,14 @@ class InvestmentAPI {
         }
     }
 
+    // Suscribirse a los cambios en vivo (Server-Sent Events).
+    // onChange recibe {version, investments, deleted} con solo las filas cambiadas.
+    static subscribeLive(onChange) {
+        const source = new EventSource(`${API_BASE}/live`);
+        source.addEventListener('investments', event => onChange(JSON.parse(event.data)));
+        return source;
+    }
+
     // Formatear números como moneda
     static formatCurrency(value, currency = '€') {
         return new Intl.NumberFormat('es-ES', {
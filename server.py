@@ -0,0 +1,177 @@
+# server.py
+"""
+Servidor local de un solo proceso: monta todos los handler de api/*.py bajo /api/*
+y sirve public/, compartiendo el mismo cliente de Supabase, cachés de precios y pools
+de hilos entre todas las rutas (en Vercel cada función arranca su propia copia).
+
+Cada conexión a /api/live ocupa un hilo hasta LIVE_MAX_WAIT segundos (25 por defecto).
+Para que no dejen sin hilos al resto de rutas, tienen su propio cupo (--live-connections):
+waitress arranca con --threads + --live-connections hilos y, con el cupo lleno, /api/live
+responde al momento con un "retry:" y el navegador vuelve a conectar pasados unos segundos.
+
+Uso:
+    python server.py                    # http://127.0.0.1:3000
+    python server.py --port 8000 --host 0.0.0.0
+    python server.py --threads 16 --live-connections 64
+"""
+import os
+import sys
+import time
+import threading
+import base64
+import argparse
+import importlib.util
+from pathlib import Path
+
+from flask import Flask, Response, request, send_from_directory, abort
+
+ROOT = Path(__file__).resolve().parent
+API_DIR = ROOT / "api"
+PUBLIC_DIR = ROOT / "public"
+
+# Mismo orden de búsqueda que los handlers: utils/ como paquete plano
+sys.path.append(str(ROOT / "utils"))
+
+# Rutas cuyo nombre no coincide con el fichero
+ROUTE_ALIASES = {
+    "graphs": "grapsh",
+}
+
+# Rutas de larga duración (long-poll / SSE) con cupo propio de hilos
+LONG_POLL_ROUTES = ("live",)
+LIVE_RETRY_MS = 5000
+
+class HandlerRequest:
+    """Request con la interfaz que esperan los handlers (method, path, args, headers, body)"""
+    
+    def __init__(self, flask_request):
+        self.method = flask_request.method
+        self.path = flask_request.full_path.rstrip("?")
+        self.url = flask_request.url
+        self.args = flask_request.args
+        self.headers = flask_request.headers
+        self.body = flask_request.get_data(as_text=True)
+        self._flask_request = flask_request
+    
+    def get_json(self):
+        return self._flask_request.get_json(silent=True) or {}
+
+def load_handlers():
+    """Importa cada api/*.py una sola vez; devuelve {nombre de ruta: handler}"""
+    handlers = {}
+    for path in sorted(API_DIR.glob("*.py")):
+        module_name = "api_" + path.stem.replace("-", "_")
+        spec = importlib.util.spec_from_file_location(module_name, path)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[module_name] = module
+        try:
+            spec.loader.exec_module(module)
+        except Exception as e:
+            print(f"⚠️ No se pudo cargar api/{path.name}: {e}")
+            continue
+        if hasattr(module, "handler"):
+            handlers[path.stem] = module.handler
+    for alias, name in ROUTE_ALIASES.items():
+        if name in handlers:
+            handlers.setdefault(alias, handlers[name])
+    return handlers
+
+def to_response(result):
+    """Respuesta estilo Vercel ({statusCode, headers, body}) -> Response de Flask"""
+    body = result.get("body", "")
+    if result.get("isBase64Encoded"):
+        body = base64.b64decode(body)
+    return Response(body, status=result.get("statusCode", 200), headers=result.get("headers") or {})
+
+def create_app(handlers=None, live_connections=None):
+    app = Flask(__name__, static_folder=None)
+    handlers = handlers if handlers is not None else load_handlers()
+    app.config["HANDLERS"] = handlers
+    if live_connections is None:
+        live_connections = int(os.environ.get("SERVER_LIVE_CONNECTIONS", 32))
+    live_slots = threading.BoundedSemaphore(live_connections)
+    
+    @app.before_request
+    def start_timer():
+        request.environ["portfolio.start"] = time.perf_counter()
+    
+    @app.after_request
+    def add_timing(response):
+        started = request.environ.get("portfolio.start")
+        if started is not None:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            response.headers["Server-Timing"] = f"app;dur={elapsed_ms:.1f}"
+        return response
+    
+    @app.route("/api/<name>", methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"])
+    def api(name):
+        handler = handlers.get(name)
+        if handler is None:
+            abort(404)
+        if name not in LONG_POLL_ROUTES:
+            return to_response(handler(HandlerRequest(request)))
+        
+        # Cupo de conexiones en vivo lleno: el navegador reintenta en LIVE_RETRY_MS
+        if not live_slots.acquire(blocking=False):
+            return Response(
+                f"retry: {LIVE_RETRY_MS}\n\n",
+                headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"}
+            )
+        try:
+            return to_response(handler(HandlerRequest(request)))
+        finally:
+            live_slots.release()
+    
+    @app.route("/", defaults={"path": "index.html"})
+    @app.route("/<path:path>")
+    def static_files(path):
+        # Las páginas se enlazan sin extensión (/graphs -> graphs.html)
+        if not (PUBLIC_DIR / path).is_file() and (PUBLIC_DIR / f"{path}.html").is_file():
+            path = f"{path}.html"
+        return send_from_directory(PUBLIC_DIR, path)
+    
+    return app
+
+def warm_up():
+    """Abre la conexión con la base de datos y carga las librerías pesadas antes de la primera petición"""
+    try:
+        from supabase_client import db
+        db.warm_up()
+    except Exception as e:
+        print(f"⚠️ Warm-up del almacenamiento falló: {e}")
+    for module in ("matplotlib.pyplot", "plotly.graph_objects"):
+        try:
+            importlib.import_module(module)
+        except ImportError:
+            pass
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servidor local de la cartera (api/ + public/)")
+    parser.add_argument("--host", default=os.environ.get("HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", 3000)))
+    parser.add_argument("--threads", type=int, default=int(os.environ.get("SERVER_THREADS", 16)),
+                        help="hilos de trabajo para las rutas normales (solo con waitress)")
+    parser.add_argument("--live-connections", type=int,
+                        default=int(os.environ.get("SERVER_LIVE_CONNECTIONS", 32)),
+                        help="conexiones /api/live simultáneas; cada una ocupa un hilo hasta LIVE_MAX_WAIT")
+    parser.add_argument("--no-warmup", action="store_true", help="no precalentar conexiones ni librerías")
+    args = parser.parse_args(argv)
+    
+    app = create_app(live_connections=args.live_connections)
+    print(f"🧩 {len(app.config['HANDLERS'])} rutas montadas: {', '.join(sorted(app.config['HANDLERS']))}")
+    if not args.no_warmup:
+        warm_up()
+    
+    print(f"🚀 Servidor en http://{args.host}:{args.port}")
+    try:
+        from waitress import serve
+    except ImportError:
+        print("⚠️  waitress no instalado (pip install -r requirements.txt): se usa el servidor de desarrollo")
+        print("⚠️  de Flask, un hilo por conexión sin límite; --threads y --live-connections no se aplican")
+        app.run(host=args.host, port=args.port, threaded=True, use_reloader=False)
+        return
+    # Los hilos de /api/live se suman a los de las demás rutas
+    serve(app, host=args.host, port=args.port, threads=args.threads + args.live_connections)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+-- sql/category_aggregates.sql
+-- Totales por investment_type materializados y mantenidos en O(1) por triggers.
+-- Sustituye a la versión de portfolio_category_totals() de sql/category_totals.sql:
+-- la lectura pasa a ser una consulta a una tabla pequeña, sin recorrer investments.
+-- Equivalente local: utils/category_aggregates.py::CategoryAggregates
+
+create table if not exists public.investment_category_totals (
+    investment_type text primary key,
+    count bigint not null default 0,
+    purchase_value double precision not null default 0,
+    amount double precision not null default 0,
+    total_money double precision not null default 0,
+    updated_at timestamptz not null default now()
+);
+
+-- Suma (sign = 1) o resta (sign = -1) una fila a los totales de su categoría
+create or replace function public.apply_category_delta(
+    p_type text, p_sign integer, p_purchase_value double precision,
+    p_amount double precision, p_total_money double precision
+)
+returns void
+language sql
+as $$
+    insert into public.investment_category_totals as t
+        (investment_type, count, purchase_value, amount, total_money, updated_at)
+    values (
+        coalesce(p_type, ''), p_sign, p_sign * coalesce(p_purchase_value, 0),
+        p_sign * coalesce(p_amount, 0), p_sign * coalesce(p_total_money, 0), now()
+    )
+    on conflict (investment_type) do update set
+        count = t.count + excluded.count,
+        purchase_value = t.purchase_value + excluded.purchase_value,
+        amount = t.amount + excluded.amount,
+        total_money = t.total_money + excluded.total_money,
+        updated_at = now();
+$$;
+
+create or replace function public.maintain_category_totals()
+returns trigger
+language plpgsql
+as $$
+begin
+    if tg_op in ('UPDATE', 'DELETE') then
+        perform public.apply_category_delta(
+            old.investment_type, -1, old.purchase_value, old.amount, old.total_money);
+    end if;
+    if tg_op in ('INSERT', 'UPDATE') then
+        perform public.apply_category_delta(
+            new.investment_type, 1, new.purchase_value, new.amount, new.total_money);
+    end if;
+    delete from public.investment_category_totals where count <= 0;
+    return null;
+end;
+$$;
+
+drop trigger if exists investments_maintain_category_totals on public.investments;
+create trigger investments_maintain_category_totals
+    after insert or update of investment_type, purchase_value, amount, total_money or delete
+    on public.investments
+    for each row execute function public.maintain_category_totals();
+
+-- Reconciliación completa (la lanza periódicamente el scheduler de actualización)
+create or replace function public.reconcile_category_totals()
+returns void
+language sql
+as $$
+    delete from public.investment_category_totals where true;
+    insert into public.investment_category_totals
+        (investment_type, count, purchase_value, amount, total_money, updated_at)
+    select
+        coalesce(investment_type, ''), count(*),
+        coalesce(sum(purchase_value), 0), coalesce(sum(amount), 0),
+        coalesce(sum(total_money), 0), now()
+    from public.investments
+    group by coalesce(investment_type, '');
+$$;
+
+select public.reconcile_category_totals();
+
+-- Lectura en tiempo constante (misma firma que en sql/category_totals.sql)
+create or replace function public.portfolio_category_totals()
+returns table (
+    investment_type text,
+    count bigint,
+    purchase_value double precision,
+    amount double precision,
+    total_money double precision,
+    profit_loss_percentage double precision
+)
+language sql
+stable
+as $$
+    select
+        nullif(t.investment_type, ''),
+        t.count,
+        t.purchase_value,
+        t.amount,
+        t.total_money,
+        case when t.amount = 0 then 0
+             else (t.total_money - t.amount) / t.amount * 100 end
+    from public.investment_category_totals t;
+$$;
+
+grant execute on function public.portfolio_category_totals() to anon, authenticated;
+grant execute on function public.reconcile_category_totals() to anon, authenticated;
@@ -0,0 +1,32 @@
+-- sql/category_totals.sql
+-- Agregados por investment_type calculados en Postgres.
+-- Se invoca vía RPC: db.client.rpc("portfolio_category_totals").
+-- Equivalente local: utils/calculations.py::aggregate_by_type
+
+create or replace function public.portfolio_category_totals()
+returns table (
+    investment_type text,
+    count bigint,
+    purchase_value double precision,
+    amount double precision,
+    total_money double precision,
+    profit_loss_percentage double precision
+)
+language sql
+stable
+as $$
+    select
+        i.investment_type::text,
+        count(*) as count,
+        coalesce(sum(i.purchase_value), 0)::double precision as purchase_value,
+        coalesce(sum(i.amount), 0)::double precision as amount,
+        coalesce(sum(i.total_money), 0)::double precision as total_money,
+        case
+            when coalesce(sum(i.amount), 0) = 0 then 0
+            else ((sum(i.total_money) - sum(i.amount)) / sum(i.amount) * 100)::double precision
+        end as profit_loss_percentage
+    from public.investments i
+    group by i.investment_type;
+$$;
+
+grant execute on function public.portfolio_category_totals() to anon, authenticated;
@@ -0,0 +1,16 @@
+-- sql/currency.sql
+-- Divisa de cotización de cada activo (USD, GBp, ...).
+-- current_value y total_money se guardan siempre convertidos a euros.
+-- purchase_value se guarda tal como lo introduce el usuario, en la divisa de cotización
+-- (el precio que muestra Yahoo). purchase_fx_rate guarda los euros por unidad de esa divisa
+-- en la compra (el tipo del día del alta, o el que indique el usuario), y profit_loss_percentage
+-- compara current_value con purchase_value * purchase_fx_rate: incluye el efecto divisa
+-- (utils/asset_refresh.py profit_loss).
+-- Las filas con purchase_fx_rate null son anteriores a esa columna: se usa el tipo de hoy.
+-- Las filas con currency null son anteriores a esta columna: su current_value no está convertido.
+
+alter table public.investments
+    add column if not exists currency text;
+
+alter table public.investments
+    add column if not exists purchase_fx_rate numeric;
@@ -0,0 +1,70 @@
+-- sql/delta_sync.sql
+-- Soporte para /api/portfolio?since=<version>
+-- updated_at fiable e indexado, y lápidas (tombstones) para los borrados.
+
+-- updated_at lo fija siempre el servidor en cada INSERT/UPDATE
+create or replace function public.set_investment_updated_at()
+returns trigger
+language plpgsql
+as $$
+begin
+    new.updated_at := now();
+    return new;
+end;
+$$;
+
+drop trigger if exists investments_set_updated_at on public.investments;
+create trigger investments_set_updated_at
+    before insert or update on public.investments
+    for each row execute function public.set_investment_updated_at();
+
+create index if not exists investments_updated_at_idx
+    on public.investments (updated_at);
+
+-- Lápidas: una fila por inversión borrada
+create table if not exists public.investment_tombstones (
+    id bigint primary key,
+    isin text,
+    deleted_at timestamptz not null default now()
+);
+
+create index if not exists investment_tombstones_deleted_at_idx
+    on public.investment_tombstones (deleted_at);
+
+create or replace function public.record_investment_tombstone()
+returns trigger
+language plpgsql
+as $$
+begin
+    insert into public.investment_tombstones (id, isin, deleted_at)
+    values (old.id, old.isin, now())
+    on conflict (id) do update set deleted_at = excluded.deleted_at;
+    return old;
+end;
+$$;
+
+drop trigger if exists investments_record_tombstone on public.investments;
+create trigger investments_record_tombstone
+    after delete on public.investments
+    for each row execute function public.record_investment_tombstone();
+
+-- Si un id borrado vuelve a insertarse, su lápida deja de aplicar
+create or replace function public.clear_investment_tombstone()
+returns trigger
+language plpgsql
+as $$
+begin
+    delete from public.investment_tombstones where id = new.id;
+    return new;
+end;
+$$;
+
+drop trigger if exists investments_clear_tombstone on public.investments;
+create trigger investments_clear_tombstone
+    after insert on public.investments
+    for each row execute function public.clear_investment_tombstone();
+
+alter table public.investment_tombstones enable row level security;
+drop policy if exists "tombstones readable" on public.investment_tombstones;
+create policy "tombstones readable" on public.investment_tombstones
+    for select using (true);
@@ -0,0 +1,15 @@
+-- sql/refresh_cursor.sql
+-- Cursor de reanudación de /api/update-assets?budget=... (ver utils/refresh_scheduler.py):
+-- id de la última inversión procesada en una ejecución que se cortó antes de terminar.
+-- Sin cursor (o cursor null) la siguiente ejecución empieza desde la primera inversión.
+
+create table if not exists public.refresh_cursors (
+    name text primary key,
+    cursor bigint,
+    updated_at timestamptz not null default now()
+);
+
+alter table public.refresh_cursors enable row level security;
+drop policy if exists "refresh cursors writable" on public.refresh_cursors;
+create policy "refresh cursors writable" on public.refresh_cursors
+    for all using (true) with check (true);
@@ -0,0 +1,36 @@
+-- sql/write_behind.sql
+-- Aplica en una sola llamada un lote de actualizaciones de inversiones
+-- (cola de escritura diferida, ver utils/write_behind.py).
+-- updates: [{"id": 1, "data": {"current_value": 10.5, ...}}, ...]
+-- Solo se modifican los campos presentes en data; updated_at lo fija el trigger de sql/delta_sync.sql.
+-- Requiere la columna currency (sql/currency.sql).
+
+create or replace function public.apply_investment_updates(updates jsonb)
+returns setof public.investments
+language plpgsql
+as $$
+declare
+    item jsonb;
+    d jsonb;
+begin
+    for item in select value from jsonb_array_elements(updates) loop
+        d := item->'data';
+        return query
+        update public.investments i set
+            isin = case when d ? 'isin' then d->>'isin' else i.isin end,
+            asset_name = case when d ? 'asset_name' then d->>'asset_name' else i.asset_name end,
+            investment_type = case when d ? 'investment_type' then d->>'investment_type' else i.investment_type end,
+            purchase_value = case when d ? 'purchase_value' then (d->>'purchase_value')::double precision else i.purchase_value end,
+            amount = case when d ? 'amount' then (d->>'amount')::double precision else i.amount end,
+            current_value = case when d ? 'current_value' then (d->>'current_value')::double precision else i.current_value end,
+            currency = case when d ? 'currency' then d->>'currency' else i.currency end,
+            total_money = case when d ? 'total_money' then (d->>'total_money')::double precision else i.total_money end,
+            profit_loss_percentage = case when d ? 'profit_loss_percentage'
+                then (d->>'profit_loss_percentage')::double precision else i.profit_loss_percentage end
+        where i.id = (item->>'id')::bigint
+        returning i.*;
+    end loop;
+end;
+$$;
+
+grant execute on function public.apply_investment_updates(jsonb) to anon, authenticated;
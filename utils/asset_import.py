@@ -0,0 +1,121 @@
+# utils/asset_import.py
+import io
+import os
+import csv
+import json
+import math
+from datetime import datetime
+
+try:
+    from asset_refresh import prices_in_base, profit_loss, purchase_rate
+    from yfinance_helper import PRICE_SOFT_TIMEOUT, PRICE_WORKERS
+except ImportError:
+    from utils.asset_refresh import prices_in_base, profit_loss, purchase_rate
+    from utils.yfinance_helper import PRICE_SOFT_TIMEOUT, PRICE_WORKERS
+
+# MISMOS campos obligatorios que /api/add-asset
+REQUIRED_FIELDS = ("isin", "asset_name", "purchase_value", "amount")
+MAX_IMPORT_ROWS = 5000
+# Segundos de margen por ticker para descargar precios en una importación
+IMPORT_PRICE_SECONDS = float(os.environ.get("IMPORT_PRICE_SECONDS", 5))
+
+def import_price_timeout(count):
+    """
+    Plazo para los precios de una importación: crece con el número de tickers distintos
+    (se descargan de PRICE_WORKERS en PRICE_WORKERS), así el tamaño del lote no decide
+    qué filas se quedan sin precio.
+    """
+    return PRICE_SOFT_TIMEOUT + IMPORT_PRICE_SECONDS * math.ceil(count / PRICE_WORKERS)
+
+def _number(value, field):
+    """Número de un CSV/JSON; acepta coma decimal ("1234,5")"""
+    if isinstance(value, (int, float)):
+        number = float(value)
+    else:
+        text = str(value).strip().replace(" ", "")
+        if "," in text and "." not in text:
+            text = text.replace(",", ".")
+        try:
+            number = float(text)
+        except ValueError:
+            raise ValueError(f"{field} no es un número: {value}")
+    if number <= 0:
+        raise ValueError(f"{field} debe ser mayor que 0")
+    return number
+
+def iter_rows(body, fmt):
+    """
+    Recorre el cuerpo (CSV con cabecera o lista JSON) fila a fila.
+    Devuelve (número de fila, dict) sin construir listas intermedias del CSV.
+    """
+    if isinstance(body, bytes):
+        body = body.decode("utf-8-sig")
+    if fmt == "csv":
+        sample = body[:2048]
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+        except csv.Error:
+            dialect = csv.excel
+        reader = csv.DictReader(io.StringIO(body), dialect=dialect)
+        for number, row in enumerate(reader, start=1):
+            yield number, {key.strip(): value for key, value in row.items() if key}
+    else:
+        data = json.loads(body)
+        if isinstance(data, dict):
+            data = data.get("assets", [])
+        if not isinstance(data, list):
+            raise ValueError("Se esperaba una lista de activos")
+        for number, row in enumerate(data, start=1):
+            yield number, row if isinstance(row, dict) else {}
+
+def validate_row(row):
+    """Fila de entrada -> activo normalizado; ValueError con el motivo si no es válida"""
+    for field in REQUIRED_FIELDS:
+        if field not in row or row[field] in (None, ""):
+            raise ValueError(f"Campo requerido faltante: {field}")
+    # purchase_fx_rate es opcional: euros por unidad de la divisa de cotización en la compra
+    rate = row.get("purchase_fx_rate")
+    return {
+        "isin": str(row["isin"]).strip(),
+        "asset_name": str(row["asset_name"]).strip(),
+        "purchase_value": _number(row["purchase_value"], "purchase_value"),
+        "amount": _number(row["amount"], "amount"),
+        "purchase_fx_rate": _number(rate, "purchase_fx_rate") if rate not in (None, "") else None,
+        "investment_type": (str(row.get("investment_type") or "").strip() or "Otros")
+    }
+
+def build_investments(assets):
+    """
+    Activos validados -> [(fila de investments, None) o (None, motivo)] en el mismo orden.
+    Todos los precios se obtienen en un único lote (MISMO cálculo que /api/add-asset)
+    con el plazo de import_price_timeout, no el de una petición normal.
+    Los activos sin precio o sin divisa conocida no se insertan: con current_value 0
+    quedarían con una pérdida del -100% (el mismo problema que evita asset_refresh).
+    """
+    isins = [asset["isin"] for asset in assets]
+    quotes = prices_in_base(isins, timeout=import_price_timeout(len(set(isins))))
+    now = datetime.now().isoformat()
+    results = []
+    for asset, (current_value, currency, _) in zip(assets, quotes):
+        if currency is None:
+            results.append((None, f"divisa de cotización desconocida para {asset['isin']}"))
+            continue
+        if current_value <= 0:
+            results.append((None, f"sin precio para {asset['isin']}"))
+            continue
+        purchase_value = asset["purchase_value"]
+        amount = asset["amount"]
+        purchase_fx_rate = purchase_rate(currency, asset.get("purchase_fx_rate"))
+        profit_loss_percentage = profit_loss(current_value, purchase_value, currency, purchase_fx_rate)
+        total_money = amount + (amount * profit_loss_percentage / 100)
+        results.append(({
+            **asset,
+            "current_value": current_value,
+            "currency": currency,
+            "purchase_fx_rate": purchase_fx_rate,
+            "total_money": total_money,
+            "profit_loss_percentage": profit_loss_percentage,
+            "created_at": now,
+            "updated_at": now
+        }, None))
+    return results
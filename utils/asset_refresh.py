@@ -0,0 +1,165 @@
+# utils/asset_refresh.py
+from datetime import datetime
+
+try:
+    from supabase_client import db
+    from yfinance_helper import get_price_quote, get_price_quotes, remember_price
+    from fx import BASE_CURRENCY, get_quote_currency, get_quote_currencies, remember_currency, convert_to_base, to_base
+    from investment import to_records
+except ImportError:
+    from utils.supabase_client import db
+    from utils.yfinance_helper import get_price_quote, get_price_quotes, remember_price
+    from utils.fx import BASE_CURRENCY, get_quote_currency, get_quote_currencies, remember_currency, convert_to_base, to_base
+    from utils.investment import to_records
+
+def should_refresh(inv):
+    """MISMO filtro que Flask (línea 64): no se cotizan crowfounding ni capital riesgo"""
+    isin = (inv.get("isin") or "").lower()
+    return "crowfounding" not in isin and "capital riesgo" not in isin
+
+def currency_of(inv):
+    """Divisa de cotización de la fila (columna currency o consultada a Yahoo)"""
+    remember_currency(inv.get("isin"), inv.get("currency"))
+    return get_quote_currency(inv["isin"])
+
+def seed_last_good(inv):
+    """
+    El current_value guardado en la fila sirve de último precio conocido si Yahoo falla o tarda.
+    last_good va en divisa de cotización: solo vale si la fila cotiza en euros
+    o es anterior a la columna currency (entonces se guardaba el precio sin convertir).
+    """
+    if inv.get("currency") in (None, BASE_CURRENCY):
+        remember_price(inv.get("isin"), inv.get("current_value"), inv.get("updated_at"), overwrite=False)
+
+def purchase_rate(currency, given=None):
+    """
+    Euros por unidad de la divisa de cotización en la compra (columna purchase_fx_rate).
+    given: el tipo indicado por el usuario, si es válido; si no, el de hoy
+    (al dar de alta un activo se asume comprado hoy). None si la divisa es desconocida.
+    """
+    try:
+        given = float(given or 0)
+    except (TypeError, ValueError):
+        given = 0.0
+    if given > 0:
+        return given
+    if currency is None:
+        return None
+    return to_base(1.0, currency)
+
+def profit_loss(current_value, purchase_value, currency, purchase_fx_rate=None):
+    """
+    Ganancia/pérdida en % (MISMO cálculo que Flask) con el precio actual ya en euros.
+    purchase_value está en la divisa de cotización (ver sql/currency.sql) y se pasa a euros
+    con el tipo de cambio de la compra, así el % incluye el efecto divisa.
+    Filas sin purchase_fx_rate (anteriores a la columna): tipo de hoy, sin efecto divisa.
+    Sin divisa (filas anteriores a la columna currency, que guardan el precio sin convertir)
+    se comparan tal cual.
+    """
+    purchase_value = purchase_value or 0.0
+    if currency is None:
+        purchase = purchase_value
+    elif purchase_fx_rate:
+        purchase = purchase_value * purchase_fx_rate
+    else:
+        purchase = to_base(purchase_value, currency)
+    if not purchase:
+        return 0.0
+    return ((current_value - purchase) / purchase) * 100
+
+def price_in_base(isin, fallback=None, currency=None):
+    """
+    Precio actual de un ticker convertido a euros (currency: divisa ya conocida, si la hay).
+    Devuelve (precio en euros, divisa de cotización, stale).
+    Si no hay precio nuevo, la divisa es desconocida (None) o falta el tipo de cambio,
+    devuelve fallback (ya en euros) con stale=True.
+    """
+    remember_currency(isin, currency)
+    currency = get_quote_currency(isin)
+    quote = get_price_quote(isin)
+    if quote.value > 0 and currency is not None:
+        value = to_base(quote.value, currency)
+        if value is not None:
+            return value, currency, quote.stale
+    return fallback or 0.0, currency, True
+
+def prices_in_base(isins, timeout=None):
+    """
+    price_in_base para un lote: precios descargados a la vez, divisas consultadas
+    en paralelo y conversión a euros en un solo paso vectorizado.
+    timeout: plazo del lote entero (por defecto PRICE_SOFT_TIMEOUT, el de las peticiones).
+    Devuelve [(precio en euros, divisa de cotización, stale)]; 0 con stale=True si no hay precio
+    y divisa None si no se conoce (convert_to_base no la convierte).
+    """
+    if not isins:
+        return []
+    quotes = get_price_quotes(isins, timeout)
+    currencies = get_quote_currencies(isins)
+    prices, converted = convert_to_base([quote.value for quote in quotes], currencies)
+    return [
+        (float(price), currency, quote.stale) if ok and quote.value > 0 else (0.0, currency, True)
+        for quote, currency, price, ok in zip(quotes, currencies, prices, converted)
+    ]
+
+def refresh_investments(investments):
+    """
+    Actualiza un lote de inversiones: descarga todos los precios a la vez,
+    los convierte a euros en un solo paso vectorizado y guarda cada fila en Supabase.
+    Devuelve [(inv, datos actualizados o None, excepción o None)].
+    Si no hay precio nuevo o no se conoce la divisa no escribe nada: la fila conserva su último precio.
+    Las filas se convierten a Investment (campos numéricos ya en float) si no lo son.
+    """
+    investments = to_records(investments)
+    for inv in investments:
+        seed_last_good(inv)
+    isins = [inv["isin"] for inv in investments]
+    quotes = get_price_quotes(isins)
+    currencies = [currency_of(inv) for inv in investments]
+    prices, converted = convert_to_base([quote.value for quote in quotes], currencies)
+    
+    results = []
+    for inv, quote, currency, current_value, ok in zip(investments, quotes, currencies, prices, converted):
+        try:
+            if quote.stale:
+                raise ValueError(f"sin precio nuevo para {inv['isin']}, se mantiene el último conocido")
+            if currency is None:
+                raise ValueError(f"divisa de cotización desconocida para {inv['isin']}, no se guarda el precio")
+            if not ok:
+                raise ValueError(f"sin tipo de cambio {currency}/{BASE_CURRENCY} para {inv['isin']}")
+            results.append((inv, _save_price(inv, float(current_value), currency), None))
+        except Exception as e:
+            results.append((inv, None, e))
+    return results
+
+def refresh_investment(inv):
+    """
+    Obtiene el precio actual de una inversión y lo guarda en Supabase.
+    Devuelve los datos actualizados, o None si la escritura falla.
+    """
+    _, result, error = refresh_investments([inv])[0]
+    if error:
+        raise error
+    return result
+
+def _save_price(inv, current_value, currency):
+    purchase_value = inv.purchase_value
+    amount = inv.amount
+    
+    # Calcular ganancia/pérdida (MISMO cálculo que Flask, compra en euros al tipo de la compra)
+    profit_loss_percentage = profit_loss(current_value, purchase_value, currency, inv.purchase_fx_rate)
+    
+    # Calcular dinero total (MISMO cálculo que Flask)
+    total_money = amount + (amount * profit_loss_percentage / 100)
+    
+    # Preparar datos para actualizar
+    update_data = {
+        "current_value": current_value,
+        "currency": currency,
+        "total_money": total_money,
+        "profit_loss_percentage": profit_loss_percentage,
+        "updated_at": datetime.now().isoformat()
+    }
+    
+    # Actualizar en Supabase
+    result = db.update_investment(inv["id"], update_data, previous=inv)
+    return update_data if result else None
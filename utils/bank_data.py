@@ -0,0 +1,32 @@
+# utils/bank_data.py
+
+# MISMO array de bancos que en tu Flask original (líneas 159-167)
+# (nombre, inversión, interés %, resultado)
+BANKS = [
+    ("Kutxabank Nomina", 6295.94, 0, ""),
+    ("Kutxabank Conjunta", 391.74, 0, ""),
+    ("Trade Republic", 2050, 1.71, ""),
+    ("Revolut", 300, 1.51, ""),
+    ("Bit2Me", 800, 0, ""),
+    ("My Investor", 900, 0, "")
+]
+
+def get_bank_data():
+    """
+    Devuelve (bancos con fila TOTALES, totales).
+    MISMOS cálculos que Flask (líneas 169-172)
+    """
+    banks = list(BANKS)
+    
+    total_inversion = sum(bank[1] for bank in banks)
+    total_resultado = sum(bank[1] + (bank[1] * bank[2] / 100) for bank in banks if bank[3] == "")
+    
+    # Añadir fila de totales (MISMO que Flask línea 172)
+    banks.append(("TOTALES", total_inversion, "", total_resultado))
+    
+    totals = {
+        "investment": total_inversion,
+        "result": total_resultado,
+        "accounts": len(banks) - 1  # Excluir fila TOTALES
+    }
+    return banks, totals
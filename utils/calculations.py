@@ -31,4 +31,92 @@ def calculate_category_totals(investments, category_field="investment_type"):
                 (data["total_money"] - data["total_value"]) / data["total_value"]
             ) * 100
     
-    return categories
\ No newline at end of file
+    return categories
+
+# Orden de las categorías de la cartera (MISMO orden que tables/pie-chart)
+CATEGORY_KEYS = [
+    "dca", "renta_fija", "renta_variable", "cryptomonedas",
+    "acciones", "crowfounding", "epsv", "capital_riesgo"
+]
+
+def categorize(investment_type, include_dca=False):
+    """
+    Devuelve la clave de categoría para un investment_type.
+    MISMA lógica que tables/pie-chart: por defecto a renta variable.
+    """
+    inv_type = (investment_type or "").upper()
+    
+    if include_dca and "DCA" in inv_type and ("RENTA FIJA" in inv_type or "RENTA VARIABLE" in inv_type):
+        return "dca"
+    if "RENTA FIJA" in inv_type:
+        return "renta_fija"
+    if "RENTA VARIABLE" in inv_type:
+        return "renta_variable"
+    if "CRYPTO" in inv_type:
+        return "cryptomonedas"
+    if "ACCIONES" in inv_type:
+        return "acciones"
+    if "CROWFOUNDING" in inv_type:
+        return "crowfounding"
+    if "EPSV" in inv_type:
+        return "epsv"
+    if "CAPITAL RIESGO" in inv_type:
+        return "capital_riesgo"
+    return "renta_variable"
+
+def aggregate_by_type(investments):
+    """
+    Agrega filas por investment_type.
+    Equivalente local de la función SQL portfolio_category_totals() (sql/category_totals.sql).
+    """
+    groups = {}
+    for inv in investments:
+        inv_type = inv.get("investment_type")
+        if inv_type not in groups:
+            groups[inv_type] = {
+                "investment_type": inv_type,
+                "count": 0,
+                "purchase_value": 0.0,
+                "amount": 0.0,
+                "total_money": 0.0,
+                "profit_loss_percentage": 0.0
+            }
+        group = groups[inv_type]
+        group["count"] += 1
+        group["purchase_value"] += float(inv.get("purchase_value") or 0)
+        group["amount"] += float(inv.get("amount") or 0)
+        group["total_money"] += float(inv.get("total_money") or 0)
+    
+    for group in groups.values():
+        group["profit_loss_percentage"] = weighted_profit_loss(group["amount"], group["total_money"])
+    
+    return list(groups.values())
+
+def weighted_profit_loss(amount, total_money):
+    """Ganancia/pérdida ponderada por importe invertido"""
+    if not amount:
+        return 0.0
+    return ((total_money - amount) / amount) * 100
+
+def rollup_categories(type_totals, include_dca=False):
+    """
+    Combina los agregados por investment_type en las categorías de la cartera.
+    Devuelve {clave: {count, purchase_value, amount, total_money, profit_loss_percentage}}
+    """
+    keys = CATEGORY_KEYS if include_dca else CATEGORY_KEYS[1:]
+    categories = {
+        key: {"count": 0, "purchase_value": 0.0, "amount": 0.0, "total_money": 0.0, "profit_loss_percentage": 0.0}
+        for key in keys
+    }
+    
+    for row in type_totals:
+        data = categories[categorize(row.get("investment_type"), include_dca)]
+        data["count"] += int(row.get("count") or 0)
+        data["purchase_value"] += float(row.get("purchase_value") or 0)
+        data["amount"] += float(row.get("amount") or 0)
+        data["total_money"] += float(row.get("total_money") or 0)
+    
+    for data in categories.values():
+        data["profit_loss_percentage"] = weighted_profit_loss(data["amount"], data["total_money"])
+    
+    return categories
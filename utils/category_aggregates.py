@@ -0,0 +1,77 @@
+# utils/category_aggregates.py
+import threading
+import time
+
+try:
+    from calculations import weighted_profit_loss
+except ImportError:
+    from utils.calculations import weighted_profit_loss
+
+FIELDS = ("purchase_value", "amount", "total_money")
+
+class CategoryAggregates:
+    """
+    Totales por investment_type mantenidos en memoria.
+    Cada escritura los ajusta en O(1) con los valores antiguo y nuevo de la fila;
+    reconcile() los recalcula desde cero con todas las filas.
+    Equivalente local de la tabla investment_category_totals (sql/category_aggregates.sql).
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._groups = {}
+        self.last_reconciled = None
+        self.dirty = True
+    
+    def _add(self, row, sign):
+        inv_type = row.get("investment_type")
+        group = self._groups.setdefault(inv_type, {"count": 0, "purchase_value": 0.0, "amount": 0.0, "total_money": 0.0})
+        group["count"] += sign
+        for field in FIELDS:
+            group[field] += sign * float(row.get(field) or 0)
+        if group["count"] <= 0:
+            del self._groups[inv_type]
+    
+    def reconcile(self, investments):
+        """Recalcula todos los totales (reconciliación completa)"""
+        with self._lock:
+            self._groups = {}
+            for inv in investments:
+                self._add(inv, 1)
+            self.last_reconciled = time.monotonic()
+            self.dirty = False
+    
+    def apply(self, old, new):
+        """
+        Ajusta los totales con una escritura: resta la fila antigua y suma la nueva.
+        Sin fila antigua en una actualización no se puede ajustar: se marca para reconciliar.
+        """
+        with self._lock:
+            if self.dirty:
+                return
+            if old is not None:
+                self._add(old, -1)
+            if new is not None:
+                self._add(new, 1)
+    
+    def invalidate(self):
+        with self._lock:
+            self.dirty = True
+    
+    def is_stale(self, max_age):
+        return self.dirty or self.last_reconciled is None or time.monotonic() - self.last_reconciled > max_age
+    
+    def snapshot(self):
+        """Totales con la MISMA forma que portfolio_category_totals()"""
+        with self._lock:
+            return [
+                {
+                    "investment_type": inv_type,
+                    "count": group["count"],
+                    "purchase_value": group["purchase_value"],
+                    "amount": group["amount"],
+                    "total_money": group["total_money"],
+                    "profit_loss_percentage": weighted_profit_loss(group["amount"], group["total_money"])
+                }
+                for inv_type, group in self._groups.items()
+            ]
@@ -0,0 +1,75 @@
+# utils/circuit_breaker.py
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+class CircuitBreaker:
+    """
+    Circuit breaker con backoff exponencial.
+    Tras failure_threshold errores seguidos se abre y rechaza llamadas durante
+    el backoff; pasado ese tiempo deja pasar una llamada de prueba (semiabierto).
+    Cada nueva apertura duplica el backoff hasta max_backoff.
+    """
+    
+    def __init__(self, name, failure_threshold=5, base_backoff=5.0, max_backoff=300.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opens = 0
+        self._open_until = 0.0
+        self._trial_in_flight = False
+    
+    @property
+    def state(self):
+        with self._lock:
+            if self._open_until == 0.0:
+                return "closed"
+            if time.monotonic() < self._open_until:
+                return "open"
+            return "half-open"
+    
+    def allow(self):
+        """True si se puede llamar al proveedor"""
+        with self._lock:
+            if self._open_until == 0.0:
+                return True
+            if time.monotonic() < self._open_until or self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+    
+    def record_success(self):
+        with self._lock:
+            if self._open_until:
+                logger.info(f"✅ Circuito '{self.name}' cerrado de nuevo")
+            self._failures = 0
+            self._opens = 0
+            self._open_until = 0.0
+            self._trial_in_flight = False
+    
+    def record_neutral(self):
+        """Llamada sin veredicto (p.ej. ticker sin datos): solo libera la llamada de prueba"""
+        with self._lock:
+            self._trial_in_flight = False
+    
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._open_until or self._failures >= self.failure_threshold:
+                backoff = min(self.base_backoff * (2 ** self._opens), self.max_backoff)
+                self._opens += 1
+                self._open_until = time.monotonic() + backoff
+                logger.warning(f"⚠️ Circuito '{self.name}' abierto durante {backoff:.0f}s")
+    
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "state": self.state,
+            "consecutive_failures": self._failures
+        }
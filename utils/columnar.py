@@ -0,0 +1,35 @@
+# utils/columnar.py
+"""
+Formato columnar para respuestas grandes (?format=columnar).
+En lugar de una lista de dicts que repite cada clave en cada fila,
+se envía un array por campo; public/js/api.js (InvestmentAPI.fromColumns) lo rehidrata.
+"""
+
+COLUMNAR_FORMAT = "columnar"
+
+def wants_columnar(value):
+    return str(value or "").strip().lower() == COLUMNAR_FORMAT
+
+def to_columns(rows):
+    """
+    [{"id": 1, "isin": "A"}, {"id": 2, "isin": "B"}]
+    -> {"length": 2, "fields": ["id", "isin"], "columns": [[1, 2], ["A", "B"]]}
+    Los campos que falten en una fila se envían como null.
+    """
+    rows = list(rows or [])
+    fields = list(dict.fromkeys(key for row in rows for key in row))
+    return {
+        "length": len(rows),
+        "fields": fields,
+        "columns": [[row.get(field) for row in rows] for field in fields]
+    }
+
+def index_groups(rows, key_of, keys):
+    """
+    Pertenencia de cada fila a un grupo como array de índices (sin copiar filas):
+    {grupo: [índices en rows]}
+    """
+    groups = {key: [] for key in keys}
+    for index, row in enumerate(rows):
+        groups[key_of(row)].append(index)
+    return groups
@@ -0,0 +1,102 @@
+# utils/dashboard_bundle.py
+import hashlib
+from datetime import datetime
+
+try:
+    from calculations import weighted_profit_loss, CATEGORY_KEYS
+    from bank_data import get_bank_data
+except ImportError:
+    from utils.calculations import weighted_profit_loss, CATEGORY_KEYS
+    from utils.bank_data import get_bank_data
+
+# Versión del formato del bundle (cambiarla si cambia la estructura)
+BUNDLE_SCHEMA = 1
+
+# MISMAS etiquetas y colores que /api/pie-chart
+CATEGORY_LABELS = {
+    "renta_fija": ("RENTA FIJA", "#FF6B6B"),
+    "renta_variable": ("RENTA VARIABLE", "#48CAE4"),
+    "cryptomonedas": ("CRYPTOMONEDAS", "#F9C74F"),
+    "acciones": ("ACCIONES", "#6BCB77"),
+    "crowfounding": ("CROWFOUNDING", "#4D96FF"),
+    "epsv": ("EPSV", "#BC6FF1"),
+    "capital_riesgo": ("CAPITAL RIESGO & STARTUPS", "#FFA500")
+}
+
+def snapshot_version(investments):
+    """Hash corto del snapshot: cambia si cambia cualquier fila"""
+    digest = hashlib.sha1(f"schema:{BUNDLE_SCHEMA}".encode())
+    for inv in investments:
+        digest.update(f"{inv.get('id')}|{inv.get('updated_at')}|{inv.get('total_money')}\n".encode())
+    return digest.hexdigest()[:16]
+
+def build_dashboard(investments):
+    """
+    Calcula en una sola pasada todo lo que necesitan las vistas del dashboard:
+    totales de la cartera, desglose por categoría, reparto por activo y bancos.
+    Incluye "investments" y "totals" con la MISMA forma que /api/portfolio.
+    investments: registros Investment (utils/investment.py).
+    """
+    total_quantity = 0.0
+    total_money = 0.0
+    total_purchase_value = 0.0
+    categories = {
+        key: {"count": 0, "amount": 0.0, "purchase_value": 0.0, "total_money": 0.0}
+        for key in CATEGORY_KEYS[1:]
+    }
+    allocation = []
+    
+    for inv in investments:
+        amount = inv.amount
+        money = inv.total_money
+        purchase_value = inv.purchase_value
+        
+        total_quantity += amount
+        total_money += money
+        total_purchase_value += purchase_value
+        
+        category = categories[inv.base_category.value]
+        category["count"] += 1
+        category["amount"] += amount
+        category["purchase_value"] += purchase_value
+        category["total_money"] += money
+        
+        allocation.append({
+            "id": inv.id,
+            "isin": inv.isin,
+            "label": inv.asset_name,
+            "size": money
+        })
+    
+    # Porcentajes (MISMO cálculo que pie-chart y categories)
+    for key, data in categories.items():
+        label, color = CATEGORY_LABELS[key]
+        data["label"] = label
+        data["color"] = color
+        data["percentage"] = (data["total_money"] / total_money) * 100 if total_money > 0 else 0
+        data["profit_loss_percentage"] = weighted_profit_loss(data["amount"], data["total_money"])
+    
+    allocation.sort(key=lambda item: item["size"], reverse=True)
+    for item in allocation:
+        item["percentage"] = (item["size"] / total_money) * 100 if total_money > 0 else 0
+    
+    banks, bank_totals = get_bank_data()
+    
+    return {
+        "version": snapshot_version(investments),
+        "schema": BUNDLE_SCHEMA,
+        "generated_at": datetime.now().isoformat(),
+        "investments": investments,
+        "totals": {
+            "quantity": total_quantity,
+            "money": total_money,
+            "purchase_value": total_purchase_value
+        },
+        "categories": categories,
+        "allocation": allocation,
+        "bank": {
+            "banks": banks,
+            "totals": bank_totals
+        },
+        "net_worth": total_money + bank_totals["result"]
+    }
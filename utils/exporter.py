@@ -0,0 +1,106 @@
+# utils/exporter.py
+import io
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    from timestamps import parse_timestamp, exclusive_end
+except ImportError:
+    from utils.timestamps import parse_timestamp, exclusive_end
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+# Formatos de /api/export: (Content-Type, extensión)
+EXPORT_FORMATS = {
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+# Esquema de las posiciones (columnas de la tabla investments)
+HOLDINGS_COLUMNS = {
+    "id": "int64",
+    "isin": "string",
+    "asset_name": "string",
+    "investment_type": "string",
+    "purchase_value": "float64",
+    "amount": "float64",
+    "current_value": "float64",
+    "currency": "string",
+    "total_money": "float64",
+    "profit_loss_percentage": "float64",
+    "created_at": "timestamp",
+    "updated_at": "timestamp",
+}
+
+# Filas por record batch del stream Arrow / row group de Parquet
+BATCH_ROWS = 1000
+
+def is_available():
+    return pa is not None
+
+def parse_date(value, end=False):
+    """
+    Fecha u hora ISO 8601 (o None); ValueError si no es válida.
+    end=True: límite exclusivo para ?to= (?to=2024-12-31 incluye todo ese día).
+    """
+    if value in (None, ""):
+        return None
+    return exclusive_end(value) if end else parse_timestamp(value)
+
+def select_columns(requested):
+    """Columnas pedidas (?columns=a,b) validadas contra el esquema; todas si no se piden"""
+    if not requested:
+        return list(HOLDINGS_COLUMNS)
+    columns = [col.strip() for col in str(requested).split(",") if col.strip()]
+    unknown = [col for col in columns if col not in HOLDINGS_COLUMNS]
+    if unknown:
+        raise ValueError(f"Columnas desconocidas: {', '.join(unknown)}")
+    return columns
+
+def _arrow_type(name):
+    return {
+        "int64": pa.int64(),
+        "float64": pa.float64(),
+        "string": pa.string(),
+        "timestamp": pa.timestamp("us", tz="UTC"),
+    }[name]
+
+def schema_for(columns):
+    return pa.schema([pa.field(col, _arrow_type(HOLDINGS_COLUMNS[col])) for col in columns])
+
+def _convert(value, kind):
+    if value is None:
+        return None
+    if kind == "timestamp":
+        return parse_timestamp(value)
+    if kind == "int64":
+        return int(value)
+    if kind == "float64":
+        return float(value)
+    return str(value)
+
+def build_table(rows, columns):
+    """Filas de Supabase -> tabla Arrow tipada (una columna por campo)"""
+    schema = schema_for(columns)
+    arrays = [
+        pa.array([_convert(row.get(col), HOLDINGS_COLUMNS[col]) for row in rows], type=field.type)
+        for col, field in zip(columns, schema)
+    ]
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+def encode(table, fmt):
+    """Tabla Arrow -> bytes en formato IPC stream o Parquet, por lotes de BATCH_ROWS"""
+    sink = io.BytesIO()
+    if fmt == "parquet":
+        pq.write_table(table, sink, row_group_size=BATCH_ROWS, compression="zstd")
+    else:
+        with pa_ipc.new_stream(sink, table.schema) as writer:
+            for batch in table.to_batches(max_chunksize=BATCH_ROWS):
+                writer.write_batch(batch)
+    return sink.getvalue()
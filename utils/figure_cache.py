@@ -0,0 +1,62 @@
+# utils/figure_cache.py
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+try:
+    from serializer import RawJSON
+except ImportError:
+    from utils.serializer import RawJSON
+
+# Cambiarla cuando cambie el estilo de cualquier figura (invalida la caché)
+FIGURE_STYLE_VERSION = 1
+FIGURE_CACHE_SIZE = int(os.environ.get("FIGURE_CACHE_SIZE", 64))
+
+class FigureCache:
+    """
+    Caché LRU de figuras Plotly ya codificadas (fig.to_json() como RawJSON).
+    La clave es un hash del tipo de figura, la versión de estilo y los datos de entrada,
+    así que si los números no cambian no se construye ni se serializa la figura.
+    """
+    
+    def __init__(self, max_entries=FIGURE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def key_for(kind, inputs):
+        payload = json.dumps([kind, FIGURE_STYLE_VERSION, inputs], sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+    
+    def get_or_build(self, kind, inputs, build):
+        """
+        Devuelve el RawJSON de la figura para inputs; build() crea la figura si no está en caché.
+        """
+        key = self.key_for(kind, inputs)
+        with self._lock:
+            fragment = self._entries.get(key)
+            if fragment is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return fragment
+            self.misses += 1
+        
+        fragment = RawJSON(build().to_json())
+        with self._lock:
+            self._entries[key] = fragment
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return fragment
+    
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+# Singleton para acceso global
+figure_cache = FigureCache()
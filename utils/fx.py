@@ -0,0 +1,136 @@
+# utils/fx.py
+import os
+import threading
+import time
+import logging
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from market_data import yf
+except ImportError:
+    from utils.market_data import yf
+
+logger = logging.getLogger(__name__)
+
+# Todos los importes de la cartera se guardan en euros
+BASE_CURRENCY = "EUR"
+FX_TTL_SECONDS = float(os.environ.get("FX_TTL_SECONDS", 900))
+
+# Divisas cotizadas en subunidades: (divisa real, factor)
+SUBUNITS = {
+    "GBp": ("GBP", 0.01),
+    "GBX": ("GBP", 0.01),
+    "ZAc": ("ZAR", 0.01),
+    "ILA": ("ILS", 0.01),
+}
+
+# Divisa de cotización por ticker
+_ticker_currency = {}
+_currency_lock = threading.Lock()
+
+# Matriz de tipos de cambio: divisa -> (euros por unidad, timestamp)
+_rates = {BASE_CURRENCY: (1.0, float("inf"))}
+_rates_lock = threading.Lock()
+
+def remember_currency(isin, currency):
+    """Guarda la divisa de cotización de un ticker (p.ej. la columna currency de la fila)"""
+    if isin and currency:
+        with _currency_lock:
+            _ticker_currency[isin] = currency
+
+def get_quote_currency(isin):
+    """
+    Divisa de cotización del ticker, o None si no se conoce.
+    Solo se guarda la divisa que Yahoo devuelve de verdad: si la consulta falla
+    o no trae divisa, se vuelve a consultar la próxima vez (nunca se asume euros).
+    """
+    with _currency_lock:
+        currency = _ticker_currency.get(isin)
+    if currency:
+        return currency
+
+    try:
+        fi = yf.Ticker(isin).fast_info
+        currency = fi.get("currency") if isinstance(fi, dict) else getattr(fi, "currency", None)
+    except Exception as e:
+        logger.warning(f"⚠️ No se pudo obtener la divisa de {isin}: {e}")
+        return None
+    if not currency:
+        logger.warning(f"⚠️ Yahoo no indica la divisa de {isin}")
+        return None
+
+    remember_currency(isin, currency)
+    return currency
+
+def get_quote_currencies(isins, max_workers=8):
+    """Divisas de cotización de un lote de tickers; las desconocidas se consultan en paralelo"""
+    unique = list(dict.fromkeys(isins))
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(unique)))) as pool:
+        currencies = dict(zip(unique, pool.map(get_quote_currency, unique)))
+    return [currencies[isin] for isin in isins]
+
+def _normalize(currency):
+    """(divisa ISO, factor de subunidad); (None, 1.0) si la divisa es desconocida"""
+    if not currency:
+        return None, 1.0
+    if currency in SUBUNITS:
+        return SUBUNITS[currency]
+    return currency.upper(), 1.0
+
+def get_rates(currencies):
+    """
+    Euros por unidad de cada divisa.
+    Las que faltan o han caducado se descargan juntas en una sola llamada a Yahoo.
+    """
+    wanted = {_normalize(currency)[0] for currency in currencies} - {None}
+    now = time.time()
+    with _rates_lock:
+        missing = sorted(
+            currency for currency in wanted
+            if currency not in _rates or now - _rates[currency][1] > FX_TTL_SECONDS
+        )
+
+    if missing:
+        pairs = {f"{currency}{BASE_CURRENCY}=X": currency for currency in missing}
+        try:
+            data = yf.download(list(pairs), period="5d", progress=False)["Close"]
+            # Con un solo par yfinance devuelve una Serie
+            if getattr(data, "ndim", 2) == 1:
+                data = data.to_frame(name=next(iter(pairs)))
+            fetched = {}
+            for pair, currency in pairs.items():
+                if pair in data:
+                    series = data[pair].dropna()
+                    if not series.empty:
+                        fetched[currency] = (float(series.iloc[-1]), now)
+            with _rates_lock:
+                _rates.update(fetched)
+            print(f"💱 {len(fetched)}/{len(missing)} tipos de cambio actualizados")
+        except Exception as e:
+            logger.warning(f"⚠️ Error al descargar tipos de cambio {missing}: {e}")
+
+    with _rates_lock:
+        # Si un tipo no se pudo descargar se sirve el último conocido aunque haya caducado
+        return {currency: _rates[currency][0] for currency in wanted if currency in _rates}
+
+def convert_to_base(values, currencies):
+    """
+    Convierte un lote de precios a euros en un solo paso vectorizado.
+    Devuelve (array de precios en euros, array de booleanos convertido_ok);
+    los de divisa desconocida (None) o sin tipo de cambio quedan con convertido_ok=False.
+    """
+    normalized = [_normalize(currency) for currency in currencies]
+    rates = get_rates(currencies)
+    factors = np.array(
+        [rates.get(code, np.nan) * subunit for code, subunit in normalized],
+        dtype=float
+    )
+    converted = np.asarray(values, dtype=float) * factors
+    ok = ~np.isnan(converted)
+    return np.where(ok, converted, 0.0), ok
+
+def to_base(value, currency):
+    """Convierte un solo precio a euros (None si falta el tipo de cambio)"""
+    converted, ok = convert_to_base([value], [currency])
+    return float(converted[0]) if ok[0] else None
@@ -0,0 +1,79 @@
+# utils/investment.py
+from collections.abc import Mapping
+from enum import Enum
+
+try:
+    from calculations import categorize
+except ImportError:
+    from utils.calculations import categorize
+
+class Category(str, Enum):
+    """Categorías de la cartera (MISMAS claves que CATEGORY_KEYS)"""
+    DCA = "dca"
+    RENTA_FIJA = "renta_fija"
+    RENTA_VARIABLE = "renta_variable"
+    CRYPTOMONEDAS = "cryptomonedas"
+    ACCIONES = "acciones"
+    CROWFOUNDING = "crowfounding"
+    EPSV = "epsv"
+    CAPITAL_RIESGO = "capital_riesgo"
+
+# Columnas numéricas: se convierten a float una sola vez al cargar la fila
+# (purchase_fx_rate 0.0 = sin tipo de cambio de compra guardado)
+NUMERIC_FIELDS = (
+    "purchase_value", "amount", "current_value", "total_money", "profit_loss_percentage", "purchase_fx_rate"
+)
+FIELDS = ("id", "isin", "asset_name", "investment_type") + NUMERIC_FIELDS + ("currency", "created_at", "updated_at")
+_FIELD_SET = frozenset(FIELDS)
+
+def _to_float(value):
+    try:
+        return float(value) if value is not None else 0.0
+    except (TypeError, ValueError):
+        return 0.0
+
+class Investment(Mapping):
+    """
+    Fila de la tabla investments con __slots__ (sin __dict__ por fila).
+    Los campos numéricos ya son float y la categoría se resuelve una vez:
+    category incluye DCA (como /api/tables) y base_category no (como pie-chart).
+    Sigue comportándose como un dict de solo lectura (inv["isin"], inv.get(...))
+    y el serializador lo convierte con to_dict().
+    """
+    __slots__ = FIELDS + ("category", "base_category", "extra")
+    
+    def __init__(self, row):
+        for field in FIELDS:
+            value = row.get(field)
+            setattr(self, field, _to_float(value) if field in NUMERIC_FIELDS else value)
+        self.category = Category(categorize(self.investment_type, include_dca=True))
+        self.base_category = (
+            Category(categorize(self.investment_type)) if self.category is Category.DCA else self.category
+        )
+        # Columnas que no están en el esquema conocido (migraciones futuras)
+        self.extra = {key: value for key, value in row.items() if key not in _FIELD_SET} or None
+    
+    def __getitem__(self, key):
+        if key in _FIELD_SET:
+            return getattr(self, key)
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+    
+    def __iter__(self):
+        yield from FIELDS
+        if self.extra:
+            yield from self.extra
+    
+    def __len__(self):
+        return len(FIELDS) + len(self.extra or ())
+    
+    def __repr__(self):
+        return f"Investment(id={self.id!r}, isin={self.isin!r}, total_money={self.total_money!r})"
+    
+    def to_dict(self):
+        return dict(self.items())
+
+def to_records(rows):
+    """Filas de Supabase (dicts) -> lista de Investment"""
+    return [row if isinstance(row, Investment) else Investment(row) for row in rows or []]
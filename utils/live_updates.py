@@ -0,0 +1,123 @@
+# utils/live_updates.py
+import os
+import threading
+import time
+import logging
+from collections import deque
+from collections.abc import Mapping
+
+logger = logging.getLogger(__name__)
+
+LIVE_POLL_SECONDS = float(os.environ.get("LIVE_POLL_SECONDS", 2))
+LIVE_IDLE_SECONDS = 60
+MAX_EVENTS = 500
+
+def _version_of(rows, deleted=()):
+    stamps = [str(row.get("updated_at")) for row in rows if row.get("updated_at")]
+    stamps += [str(row.get("deleted_at")) for row in deleted if row.get("deleted_at")]
+    return max(stamps) if stamps else None
+
+class LiveHub:
+    """
+    Reparto (fan-out) de cambios de inversiones a todos los clientes conectados.
+    Cada evento lleva como versión el updated_at más reciente, el mismo token
+    que usa /api/portfolio?since=, así un cliente puede reconectar en otra instancia.
+    Los cambios llegan de las escrituras de este proceso (publish) y de un único
+    sondeo compartido a Supabase mientras haya clientes escuchando.
+    version es la más reciente publicada (para los clientes); el sondeo lleva su propio
+    cursor, que solo avanza con lo que devuelve la base de datos, para no saltarse
+    cambios de otras instancias con un updated_at anterior a una escritura local.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        # (secuencia, evento): la secuencia ordena la llegada dentro del proceso
+        self._events = deque(maxlen=MAX_EVENTS)
+        self._seq = 0
+        self.version = None
+        self._poll_cursor = None
+        self._last_subscriber = 0.0
+        self._poller = None
+
+    def publish(self, rows, deleted=()):
+        """Publica filas cambiadas (y lápidas {id, deleted_at}) para los clientes en espera"""
+        rows = [row for row in (rows or []) if isinstance(row, Mapping)]
+        deleted = list(deleted or [])
+        if not rows and not deleted:
+            return
+        version = _version_of(rows, deleted)
+        with self._cond:
+            if version and (self.version is None or version > self.version):
+                self.version = version
+            self._seq += 1
+            self._events.append((self._seq, {
+                "version": version or self.version,
+                "investments": rows,
+                "deleted": [row["id"] for row in deleted]
+            }))
+            self._cond.notify_all()
+
+    def wait_for(self, since, timeout):
+        """
+        Espera hasta timeout segundos a que haya eventos más nuevos que since
+        o publicados durante la espera (un cambio de otra instancia puede traer
+        un updated_at anterior a since). Devuelve la lista de eventos (vacía si vence el timeout).
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._last_subscriber = time.monotonic()
+            start = self._seq
+            while True:
+                events = [
+                    event for seq, event in self._events
+                    if seq > start or since is None or (event["version"] or "") > since
+                ]
+                remaining = deadline - time.monotonic()
+                if events or remaining <= 0:
+                    return events
+                self._cond.wait(remaining)
+
+    def ensure_poller(self, db):
+        """Arranca (si no existe) el sondeo compartido de cambios en Supabase"""
+        with self._cond:
+            self._last_subscriber = time.monotonic()
+            if self._poll_cursor is None:
+                return
+            if self._poller and self._poller.is_alive():
+                return
+            self._poller = threading.Thread(target=self._poll, args=(db,), name="live-poller", daemon=True)
+            self._poller.start()
+
+    def _poll(self, db):
+        print("📡 Sondeo de cambios en vivo iniciado")
+        while time.monotonic() - self._last_subscriber < LIVE_IDLE_SECONDS:
+            time.sleep(LIVE_POLL_SECONDS)
+            try:
+                since = self._poll_cursor
+                changed = db.get_investments_since(since) or []
+                deleted = db.get_deleted_since(since) or []
+                # gte devuelve también las filas de la versión actual: solo las nuevas
+                changed = [row for row in changed if str(row.get("updated_at")) > since]
+                deleted = [row for row in deleted if str(row.get("deleted_at")) > since]
+                version = _version_of(changed, deleted)
+                with self._cond:
+                    if version and version > self._poll_cursor:
+                        self._poll_cursor = version
+                self.publish(changed, deleted)
+            except Exception as e:
+                logger.warning(f"⚠️ Error en sondeo en vivo: {e}")
+        print("📡 Sondeo de cambios en vivo detenido (sin clientes)")
+
+    def seed_version(self, version, from_db=False):
+        """
+        Versión de partida. from_db=True si viene de una lectura de la base de datos
+        (también fija el cursor del sondeo); la de un cliente solo lo inicializa si no hay ninguno.
+        """
+        with self._cond:
+            if version and (self.version is None or version > self.version):
+                self.version = version
+            if version and (self._poll_cursor is None or (from_db and version > self._poll_cursor)):
+                self._poll_cursor = version
+
+# Singleton para acceso global
+hub = LiveHub()
@@ -0,0 +1,166 @@
+# utils/local_store.py
+import os
+import json
+import threading
+from datetime import datetime, timezone
+
+try:
+    from live_updates import hub
+    from category_aggregates import CategoryAggregates
+    from investment import to_records
+except ImportError:
+    from utils.live_updates import hub
+    from utils.category_aggregates import CategoryAggregates
+    from utils.investment import to_records
+
+LOCAL_DATA_FILE = os.environ.get("LOCAL_DATA_FILE")
+LOCAL_SEED_ROWS = int(os.environ.get("LOCAL_SEED_ROWS", 40))
+CATEGORY_RECONCILE_SECONDS = float(os.environ.get("CATEGORY_RECONCILE_SECONDS", 300))
+
+# Tipos de inversión de los datos de ejemplo (cubren todas las categorías)
+SEED_TYPES = [
+    "Renta Variable", "Renta Fija", "DCA Renta Variable", "Crypto",
+    "Acciones", "EPSV", "Crowfounding", "Capital Riesgo",
+]
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+def seed_investments(count):
+    """Cartera de ejemplo determinista para pruebas offline"""
+    rows = []
+    for i in range(1, count + 1):
+        inv_type = SEED_TYPES[i % len(SEED_TYPES)]
+        if inv_type == "Crowfounding":
+            isin = "Crowfounding"
+        elif inv_type == "Capital Riesgo":
+            isin = "CAPITAL RIESGO"
+        else:
+            isin = f"FAKE{i:03d}"
+        purchase_value = 10 + (i * 37) % 490
+        amount = 500 + (i * 211) % 9500
+        rows.append({
+            "id": i,
+            "isin": isin,
+            "asset_name": f"Activo de prueba {i}",
+            "investment_type": inv_type,
+            "purchase_value": float(purchase_value),
+            "amount": float(amount),
+            "current_value": float(purchase_value),
+            "currency": "EUR",
+            "purchase_fx_rate": 1.0,
+            "total_money": float(amount),
+            "profit_loss_percentage": 0.0,
+            "created_at": _now(),
+            "updated_at": _now()
+        })
+    return rows
+
+class LocalStore:
+    """
+    Almacenamiento en memoria con la MISMA interfaz que SupabaseManager (PORTFOLIO_BACKEND=local).
+    Imita el trigger de sql/delta_sync.sql: updated_at lo fija siempre el almacenamiento.
+    Con LOCAL_DATA_FILE los datos se cargan de (y se guardan en) un fichero JSON.
+    """
+    
+    def __init__(self, path=LOCAL_DATA_FILE, seed_rows=LOCAL_SEED_ROWS):
+        self.path = path
+        self._lock = threading.Lock()
+        self._rows = {}
+        self._aggregates = CategoryAggregates()
+        self._cursors = {}
+        
+        rows = None
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                rows = json.load(f)
+        for row in rows if rows is not None else seed_investments(seed_rows):
+            self._rows[row["id"]] = dict(row)
+        self._next_id = max(self._rows, default=0) + 1
+        self._aggregates.reconcile(self._rows.values())
+        print(f"🗂️  Almacenamiento local: {len(self._rows)} inversiones")
+    
+    def _persist(self):
+        if not self.path:
+            return
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(list(self._rows.values()), f, ensure_ascii=False, default=str)
+    
+    def warm_up(self):
+        return True
+    
+    def get_all_investments(self):
+        with self._lock:
+            return to_records(sorted(self._rows.values(), key=lambda row: row["id"]))
+    
+    def get_investments_since(self, since):
+        with self._lock:
+            changed = [row for row in self._rows.values() if str(row.get("updated_at")) >= since]
+        return to_records(sorted(changed, key=lambda row: str(row.get("updated_at"))))
+    
+    def get_deleted_since(self, since):
+        # La app no borra inversiones: nunca hay lápidas
+        return []
+    
+    def get_category_totals(self):
+        # Igual que SupabaseManager: reconciliación por antigüedad, sin depender del scheduler
+        if self._aggregates.is_stale(CATEGORY_RECONCILE_SECONDS):
+            self.reconcile_category_totals()
+        return self._aggregates.snapshot()
+    
+    def reconcile_category_totals(self):
+        with self._lock:
+            rows = list(self._rows.values())
+        self._aggregates.reconcile(rows)
+    
+    def get_refresh_cursor(self, name):
+        return self._cursors.get(name)
+    
+    def set_refresh_cursor(self, name, cursor):
+        self._cursors[name] = cursor
+    
+    def query_investments(self, columns=None, updated_from=None, updated_before=None):
+        with self._lock:
+            rows = sorted(self._rows.values(), key=lambda row: row["id"])
+        if updated_from:
+            rows = [row for row in rows if str(row.get("updated_at")) >= updated_from]
+        if updated_before:
+            rows = [row for row in rows if str(row.get("updated_at")) < updated_before]
+        if columns and columns != ["*"]:
+            rows = [{col: row.get(col) for col in columns} for row in rows]
+        return rows
+    
+    def update_investment(self, investment_id, data, previous=None):
+        with self._lock:
+            row = self._rows.get(investment_id)
+            if row is None:
+                print(f"❌ Inversión {investment_id} no encontrada")
+                return None
+            old = dict(row)
+            row.update(data)
+            row["updated_at"] = _now()
+            saved = dict(row)
+            self._persist()
+        self._aggregates.apply(old, saved)
+        hub.publish([saved])
+        return [saved]
+    
+    def flush_writes(self):
+        return {}
+    
+    def write_failures(self, ids):
+        return {}
+    
+    def add_investment(self, data):
+        with self._lock:
+            row = {**data, "id": self._next_id, "updated_at": _now()}
+            self._next_id += 1
+            self._rows[row["id"]] = row
+            saved = dict(row)
+            self._persist()
+        self._aggregates.apply(None, saved)
+        hub.publish([saved])
+        return [saved]
+    
+    def add_investments(self, rows, chunk_size=100):
+        return [(row, self.add_investment(row)[0], None) for row in rows]
@@ -0,0 +1,105 @@
+# utils/market_data.py
+"""
+Punto único de acceso a yfinance.
+Con PRICE_SOURCE=fake se usa un mercado simulado, determinista y sin red
+(pruebas de carga y desarrollo offline); la interfaz es la parte de yfinance que usa la app:
+Ticker(...).history/fast_info/info y download(...)["Close"].
+"""
+import os
+import time
+import zlib
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+# yf es la interfaz que importan los demás módulos (yfinance o el mercado simulado)
+__all__ = ["PRICE_SOURCE", "PERIOD_DAYS", "fake_closes", "fake_last_price", "FakeTicker", "FakeMarket", "yf"]
+
+PRICE_SOURCE = os.environ.get("PRICE_SOURCE", "yahoo").strip().lower()
+# Latencia simulada por llamada (milisegundos), para parecerse a Yahoo
+FAKE_PRICE_LATENCY_MS = float(os.environ.get("FAKE_PRICE_LATENCY_MS", 0))
+
+# Días de cotización por periodo de yfinance
+PERIOD_DAYS = {
+    "1d": 1, "5d": 5, "1mo": 21, "3mo": 63, "6mo": 126, "ytd": 200,
+    "1y": 252, "2y": 504, "5y": 1260, "10y": 2520, "max": 2520,
+}
+
+def _seed(ticker):
+    return zlib.crc32(str(ticker).encode("utf-8"))
+
+def _sleep():
+    if FAKE_PRICE_LATENCY_MS > 0:
+        time.sleep(FAKE_PRICE_LATENCY_MS / 1000)
+
+def fake_closes(ticker, days):
+    """
+    Cierres diarios simulados: paseo aleatorio con semilla por ticker (siempre la misma serie).
+    Los pares de divisas (XXXEUR=X) se mueven alrededor de 1.
+    """
+    rng = np.random.default_rng(_seed(ticker))
+    is_fx = str(ticker).endswith("=X")
+    start = 1.0 if is_fx else 10 + (_seed(ticker) % 490)
+    volatility = 0.004 if is_fx else 0.005 + rng.random() * 0.03
+    returns = rng.normal(0.0003, volatility, days)
+    return start * np.cumprod(1 + returns)
+
+def fake_last_price(ticker):
+    """Último precio: el último cierre más un ruido que cambia cada minuto"""
+    last = fake_closes(ticker, PERIOD_DAYS["1y"])[-1]
+    minute = int(time.time() // 60)
+    noise = np.random.default_rng(_seed(ticker) ^ minute).normal(0, 0.002)
+    return float(last * (1 + noise))
+
+def _dates(days):
+    end = pd.Timestamp(datetime.now().date())
+    return pd.bdate_range(end=end, periods=days)
+
+class FakeTicker:
+    def __init__(self, ticker):
+        self.ticker = ticker
+    
+    def history(self, period="1mo", interval="1d", **kwargs):
+        _sleep()
+        if interval == "1m":
+            price = fake_last_price(self.ticker)
+            index = pd.date_range(end=datetime.now(), periods=5, freq="min")
+            return pd.DataFrame({"Close": [price] * 5}, index=index)
+        days = PERIOD_DAYS.get(period, 21)
+        return pd.DataFrame({"Close": fake_closes(self.ticker, days)}, index=_dates(days))
+    
+    @property
+    def fast_info(self):
+        _sleep()
+        return {"last_price": fake_last_price(self.ticker), "currency": "EUR"}
+    
+    @property
+    def info(self):
+        _sleep()
+        return {"regularMarketPrice": fake_last_price(self.ticker), "currency": "EUR"}
+
+class FakeMarket:
+    """Sustituto offline del módulo yfinance"""
+    
+    Ticker = FakeTicker
+    
+    @staticmethod
+    def download(tickers, period="1mo", interval="1d", progress=False, **kwargs):
+        _sleep()
+        tickers = [tickers] if isinstance(tickers, str) else list(tickers)
+        days = PERIOD_DAYS.get(period, 21)
+        index = _dates(days)
+        closes = {ticker: fake_closes(ticker, days) for ticker in tickers}
+        # MISMA forma que yfinance: columnas planas con un ticker, (campo, ticker) con varios
+        if len(tickers) == 1:
+            close = closes[tickers[0]]
+            return pd.DataFrame({"Open": close, "High": close, "Low": close, "Close": close}, index=index)
+        frame = pd.DataFrame(closes, index=index)
+        frame.columns = pd.MultiIndex.from_product([["Close"], frame.columns])
+        return frame
+
+if PRICE_SOURCE == "fake":
+    yf = FakeMarket()
+    print("🧪 Precios simulados (PRICE_SOURCE=fake)")
+else:
+    import yfinance as yf
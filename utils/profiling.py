@@ -0,0 +1,195 @@
+# utils/profiling.py
+"""
+Perfilado bajo demanda de una sola petición.
+Se activa con la cabecera X-Profile o el parámetro ?profile= con el valor de PROFILE_TOKEN
+(sin PROFILE_TOKEN configurado nunca se perfila). Un hilo muestrea la pila del handler
+cada PROFILE_INTERVAL_MS y el perfil se guarda por id de petición en formato
+collapsed (flamegraph.pl / speedscope) o speedscope JSON; se consulta en /api/profile.
+"""
+import os
+import sys
+import hmac
+import json
+import time
+import uuid
+import threading
+import functools
+from collections import Counter, OrderedDict
+
+try:
+    from request_helper import get_query_param, get_header, is_truthy
+except ImportError:
+    from utils.request_helper import get_query_param, get_header, is_truthy
+
+PROFILE_TOKEN = os.environ.get("PROFILE_TOKEN", "")
+PROFILE_INTERVAL_MS = float(os.environ.get("PROFILE_INTERVAL_MS", 2))
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "/tmp/portfolio-profiles")
+MAX_PROFILES = 20
+
+PROFILE_FORMATS = {
+    "collapsed": "text/plain; charset=utf-8",
+    "speedscope": "application/json",
+}
+
+# Perfiles recientes en memoria: id -> Profile
+_profiles = OrderedDict()
+_profiles_lock = threading.Lock()
+
+def is_authorized(request, token=None):
+    """True si la petición trae el token de perfilado correcto"""
+    if not PROFILE_TOKEN:
+        return False
+    token = token or get_header(request, "X-Profile") or get_query_param(request, "profile")
+    return bool(token) and hmac.compare_digest(str(token), PROFILE_TOKEN)
+
+def _frame_name(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class StackSampler:
+    """Muestrea la pila de un hilo a intervalos fijos desde un hilo aparte"""
+
+    def __init__(self, thread_id, interval_ms=PROFILE_INTERVAL_MS):
+        self.thread_id = thread_id
+        self.interval = interval_ms / 1000
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self.started = None
+        self.elapsed = 0.0
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                # El propio decorador no aporta nada al flamegraph
+                if frame.f_code.co_filename != __file__:
+                    stack.append(_frame_name(frame))
+                frame = frame.f_back
+            if stack:
+                self.stacks[tuple(reversed(stack))] += 1
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.elapsed = time.perf_counter() - self.started
+
+class Profile:
+    def __init__(self, profile_id, name, stacks, elapsed):
+        self.id = profile_id
+        self.name = name
+        self.stacks = stacks
+        self.elapsed_ms = elapsed * 1000
+        # El muestreo real es más lento que el intervalo pedido (GIL): se reparte el tiempo medido
+        self.sample_ms = self.elapsed_ms / max(sum(stacks.values()), 1)
+        self.created_at = time.time()
+
+    def collapsed(self):
+        """Formato collapsed: 'raíz;...;hoja muestras' por línea"""
+        return "\n".join(f"{';'.join(stack)} {count}" for stack, count in self.stacks.most_common())
+
+    def speedscope(self):
+        """Perfil muestreado en el formato de https://www.speedscope.app"""
+        frames, index = [], {}
+        samples, weights = [], []
+        for stack, count in self.stacks.items():
+            sample = []
+            for name in stack:
+                if name not in index:
+                    index[name] = len(frames)
+                    frames.append({"name": name})
+                sample.append(index[name])
+            samples.append(sample)
+            weights.append(count * self.sample_ms)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": self.name,
+            "exporter": "portfolio-profiler",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": self.name,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights
+            }]
+        }
+
+    def render(self, fmt):
+        if fmt == "speedscope":
+            return json.dumps(self.speedscope())
+        return self.collapsed()
+
+def store_profile(profile):
+    """Guarda el perfil en memoria (últimos MAX_PROFILES) y en PROFILE_DIR si se puede"""
+    with _profiles_lock:
+        _profiles[profile.id] = profile
+        while len(_profiles) > MAX_PROFILES:
+            _profiles.popitem(last=False)
+    try:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        for fmt, extension in (("collapsed", "txt"), ("speedscope", "speedscope.json")):
+            with open(os.path.join(PROFILE_DIR, f"{profile.id}.{extension}"), "w", encoding="utf-8") as f:
+                f.write(profile.render(fmt))
+    except OSError as e:
+        print(f"⚠️ No se pudo guardar el perfil {profile.id} en disco: {e}")
+
+def load_profile(profile_id, fmt):
+    """Perfil renderizado por id (memoria o disco), o None"""
+    with _profiles_lock:
+        profile = _profiles.get(profile_id)
+    if profile is not None:
+        return profile.render(fmt)
+    extension = "speedscope.json" if fmt == "speedscope" else "txt"
+    path = os.path.join(PROFILE_DIR, f"{os.path.basename(profile_id)}.{extension}")
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            return f.read()
+    return None
+
+def profiled(handler):
+    """
+    Decorador para los handler de api/*.py: sin token se llama al handler tal cual.
+    Con token válido se muestrea esa petición; la respuesta lleva X-Profile-Id y,
+    con ?profile_return=collapsed|speedscope, el cuerpo es el propio perfil.
+    """
+    @functools.wraps(handler)
+    def wrapper(request):
+        if not is_authorized(request):
+            return handler(request)
+
+        # El id acaba en un nombre de fichero: solo se acepta el del cliente si es seguro
+        profile_id = get_header(request, "X-Request-Id") or ""
+        if not profile_id.replace("-", "").replace("_", "").isalnum() or len(profile_id) > 64:
+            profile_id = uuid.uuid4().hex[:12]
+        sampler = StackSampler(threading.get_ident())
+        sampler.start()
+        try:
+            result = handler(request)
+        finally:
+            sampler.stop()
+
+        name = f"{handler.__module__} {getattr(request, 'method', '')} {getattr(request, 'path', '')}".strip()
+        profile = Profile(profile_id, name, sampler.stacks, sampler.elapsed)
+        store_profile(profile)
+        print(f"🔬 Perfil {profile_id}: {sum(profile.stacks.values())} muestras en {profile.elapsed_ms:.0f}ms")
+
+        headers = {**(result.get("headers") or {}), "X-Profile-Id": profile_id}
+        fmt = get_query_param(request, "profile_return")
+        if fmt in PROFILE_FORMATS or is_truthy(fmt or "0"):
+            fmt = fmt if fmt in PROFILE_FORMATS else "collapsed"
+            return {
+                "statusCode": 200,
+                "headers": {**headers, "Content-Type": PROFILE_FORMATS[fmt]},
+                "body": profile.render(fmt)
+            }
+        return {**result, "headers": headers}
+
+    return wrapper
@@ -0,0 +1,343 @@
+# utils/refresh_scheduler.py
+import os
+import heapq
+import itertools
+import threading
+import time
+import uuid
+import logging
+from datetime import datetime, timezone
+
+try:
+    from supabase_client import db
+    from asset_refresh import should_refresh, refresh_investments
+    from timestamps import parse_timestamp
+    from request_helper import is_truthy
+except ImportError:
+    from utils.supabase_client import db
+    from utils.asset_refresh import should_refresh, refresh_investments
+    from utils.timestamps import parse_timestamp
+    from utils.request_helper import is_truthy
+
+logger = logging.getLogger(__name__)
+
+REFRESH_WORKERS = int(os.environ.get("REFRESH_WORKERS", 4))
+REFRESH_INTERVAL_SECONDS = float(os.environ.get("REFRESH_INTERVAL_SECONDS", 0))
+# Activos que procesa cada worker de una vez (precios y divisas en lote)
+REFRESH_BATCH_SIZE = int(os.environ.get("REFRESH_BATCH_SIZE", 10))
+MAX_FINISHED_JOBS = 50
+# Ejecuciones con presupuesto de tiempo (/api/update-assets?budget=...):
+# margen que se deja antes del límite para volcar escrituras, guardar el cursor y responder
+RESUME_SAFETY_SECONDS = float(os.environ.get("RESUME_SAFETY_SECONDS", 1.5))
+RESUME_CURSOR_NAME = "update-assets"
+# En serverless (Vercel define VERCEL) la función se congela o termina al responder: los hilos
+# en segundo plano no acaban sus jobs y el estado en memoria no se ve desde otra instancia.
+# Con REFRESH_INLINE (por defecto en Vercel) /api/update-assets usa siempre run_until (presupuesto y cursor).
+REFRESH_INLINE = is_truthy(os.environ.get("REFRESH_INLINE", "1" if os.environ.get("VERCEL") else "0"))
+
+def _staleness_seconds(inv):
+    """Segundos desde la última actualización de la fila (sin fecha = muy antigua)"""
+    updated_at = inv.get("updated_at")
+    if not updated_at:
+        return float("inf")
+    try:
+        ts = parse_timestamp(updated_at)
+    except ValueError:
+        return float("inf")
+    return (datetime.now(timezone.utc) - ts).total_seconds()
+
+class RefreshJob:
+    """Estado de una ejecución de actualización de precios"""
+    
+    def __init__(self, total, periodic=False):
+        self.id = uuid.uuid4().hex[:12]
+        self.status = "queued"
+        self.total = total
+        self.processed = 0
+        self.updated = 0
+        self.errors = []
+        # id -> nombre de los activos con precio guardado (o encolado con escritura diferida)
+        self.written = {}
+        self.periodic = periodic
+        self.created_at = datetime.now().isoformat()
+        self.started_at = None
+        self.finished_at = None
+    
+    @property
+    def done(self):
+        return self.status in ("completed", "failed")
+    
+    def finish(self):
+        """Cierra el job: failed si había activos y ninguno se pudo actualizar"""
+        self.status = "failed" if self.total and not self.updated and self.errors else "completed"
+        self.finished_at = datetime.now().isoformat()
+    
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "total": self.total,
+            "processed": self.processed,
+            "updated_count": self.updated,
+            "progress": (self.processed / self.total * 100) if self.total else 100.0,
+            "errors": self.errors if self.errors else None,
+            "periodic": self.periodic,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at
+        }
+
+class RefreshScheduler:
+    """
+    Actualiza precios en segundo plano.
+    Los activos se encolan en una cola de prioridad ordenada por antigüedad
+    y volatilidad observada; los workers la vacían y cada job lleva su progreso.
+    El estado de los jobs vive en memoria del proceso.
+    """
+    
+    def __init__(self, workers=REFRESH_WORKERS):
+        self._workers = workers
+        self._threads = []
+        self._queue = []
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._jobs = {}
+        # Volatilidad observada por ISIN: media móvil del cambio relativo de precio
+        self._volatility = {}
+        self._periodic_thread = None
+    
+    def _priority(self, inv):
+        """Más antiguo y más volátil primero (heapq es un min-heap)"""
+        staleness = min(_staleness_seconds(inv), 365 * 86400)
+        volatility = self._volatility.get(inv.get("isin"), 0.01)
+        return -(staleness * (1 + 100 * volatility))
+    
+    def _ensure_workers(self):
+        if self._threads:
+            return
+        for i in range(self._workers):
+            thread = threading.Thread(target=self._worker, name=f"refresh-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+    
+    def active_job(self):
+        """Job en curso o encolado, si lo hay"""
+        return next((job for job in self._jobs.values() if not job.done), None)
+    
+    def submit(self, investments=None, periodic=False):
+        """
+        Encola una actualización de todos los activos y devuelve el job sin esperar.
+        Si ya hay una en curso, devuelve ese mismo job en lugar de duplicar el trabajo.
+        """
+        with self._cond:
+            job = self.active_job()
+            if job is not None:
+                print(f"🔗 Actualización coalescida con el job {job.id}")
+                return job
+        
+        if investments is None:
+            investments = db.get_all_investments()
+        assets = [inv for inv in investments if should_refresh(inv)]
+        
+        job = RefreshJob(len(assets), periodic=periodic)
+        with self._cond:
+            active = self.active_job()
+            if active is not None:
+                return active
+            self._jobs[job.id] = job
+            self._prune_jobs()
+            if not assets:
+                job.status = "completed"
+                job.finished_at = datetime.now().isoformat()
+                return job
+            for inv in assets:
+                heapq.heappush(self._queue, (self._priority(inv), next(self._counter), job.id, inv))
+            self._ensure_workers()
+            self._cond.notify_all()
+        
+        print(f"🗓️  Job {job.id} encolado: {len(assets)} activos")
+        return job
+    
+    def get_job(self, job_id):
+        return self._jobs.get(job_id)
+    
+    def list_jobs(self):
+        return sorted(self._jobs.values(), key=lambda job: job.created_at, reverse=True)
+    
+    def wait(self, job_id, timeout=None):
+        """Bloquea hasta que el job termina (o vence el timeout)"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            job = self._jobs.get(job_id)
+            while job and not job.done:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+        return job
+    
+    def _prune_jobs(self):
+        finished = [job for job in self._jobs.values() if job.done]
+        finished.sort(key=lambda job: job.created_at)
+        for job in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job.id]
+    
+    def _worker(self):
+        while True:
+            batch = []
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                while self._queue and len(batch) < REFRESH_BATCH_SIZE:
+                    _, _, job_id, inv = heapq.heappop(self._queue)
+                    job = self._jobs.get(job_id)
+                    if job is None:
+                        continue
+                    if job.status == "queued":
+                        job.status = "running"
+                        job.started_at = datetime.now().isoformat()
+                    batch.append((job, inv))
+            if not batch:
+                continue
+            
+            try:
+                results = refresh_investments([inv for _, inv in batch])
+            except Exception as e:
+                logger.warning(f"⚠️  Error en lote de actualización: {e}")
+                results = [(inv, None, e) for _, inv in batch]
+            
+            finished = []
+            with self._cond:
+                for (job, inv), (_, result, exc) in zip(batch, results):
+                    asset_name = inv.get("asset_name", "Sin nombre")
+                    if result:
+                        job.updated += 1
+                        job.written[inv["id"]] = asset_name
+                        self._observe(inv, result.get("current_value"))
+                    elif exc is not None:
+                        job.errors.append(f"Error con {asset_name}: {str(exc)}")
+                    else:
+                        job.errors.append(f"Error al actualizar {asset_name}")
+                    job.processed += 1
+                    if job.processed >= job.total and not job.done and job not in finished:
+                        finished.append(job)
+                self._cond.notify_all()
+            
+            if finished:
+                # Con escritura diferida, el job no termina hasta que sus precios están guardados
+                failed = db.flush_writes()
+                with self._cond:
+                    for job in finished:
+                        self._confirm_writes(job, failed)
+                        job.finish()
+                        print(f"✅ Job {job.id} ({job.status}): {job.updated}/{job.total} activos actualizados")
+                    self._cond.notify_all()
+    
+    def _confirm_writes(self, job, failed):
+        """Descuenta de job.updated los activos cuya escritura diferida ha fallado"""
+        failed = {**db.write_failures(list(job.written)), **failed}
+        for investment_id in failed.keys() & job.written.keys():
+            job.updated -= 1
+            job.errors.append(f"Error al guardar {job.written.pop(investment_id)}: {failed[investment_id]}")
+    
+    def run_until(self, deadline, cursor=None, name=RESUME_CURSOR_NAME):
+        """
+        Actualiza en el hilo actual, por orden de id y a partir del cursor, hasta el deadline
+        (time.monotonic()). Antes de cada lote comprueba que cabe (duración del lote más lento
+        más RESUME_SAFETY_SECONDS); si no, se para, vuelca las escrituras y guarda el cursor
+        (id de la última inversión procesada) para que la siguiente llamada siga desde ahí.
+        El primer lote se procesa siempre, para que cada llamada avance aunque el presupuesto sea corto.
+        cursor None: el guardado en la base de datos. Devuelve (job, siguiente cursor o None si terminó).
+        """
+        if cursor is None:
+            cursor = db.get_refresh_cursor(name)
+        investments = db.get_all_investments() or []
+        assets = sorted(
+            (inv for inv in investments if should_refresh(inv) and (cursor is None or inv["id"] > cursor)),
+            key=lambda inv: inv["id"]
+        )
+        
+        job = RefreshJob(len(assets))
+        job.status = "running"
+        job.started_at = datetime.now().isoformat()
+        slowest = 0.0
+        last_id = cursor
+        
+        for start in range(0, len(assets), REFRESH_BATCH_SIZE):
+            if start and time.monotonic() + slowest + RESUME_SAFETY_SECONDS > deadline:
+                break
+            batch = assets[start:start + REFRESH_BATCH_SIZE]
+            started = time.monotonic()
+            try:
+                results = refresh_investments(batch)
+            except Exception as e:
+                logger.warning(f"⚠️  Error en lote de actualización: {e}")
+                results = [(inv, None, e) for inv in batch]
+            slowest = max(slowest, time.monotonic() - started)
+            
+            for inv, result, exc in results:
+                asset_name = inv.get("asset_name", "Sin nombre")
+                if result:
+                    job.updated += 1
+                    job.written[inv["id"]] = asset_name
+                    self._observe(inv, result.get("current_value"))
+                elif exc is not None:
+                    job.errors.append(f"Error con {asset_name}: {str(exc)}")
+                else:
+                    job.errors.append(f"Error al actualizar {asset_name}")
+                job.processed += 1
+            last_id = batch[-1]["id"]
+        
+        # El cursor no avanza hasta que los precios de los lotes procesados están guardados
+        self._confirm_writes(job, db.flush_writes())
+        next_cursor = last_id if job.processed < job.total else None
+        db.set_refresh_cursor(name, next_cursor)
+        
+        job.finish()
+        if next_cursor is None:
+            print(f"✅ Ejecución {job.id}: {job.updated}/{job.total} activos actualizados, recorrido completo")
+        else:
+            print(f"⏸️  Ejecución {job.id}: {job.processed}/{job.total} activos, se reanuda tras el id {next_cursor}")
+        return job, next_cursor
+    
+    def _observe(self, inv, new_value):
+        """Actualiza la volatilidad observada del activo con el último cambio de precio"""
+        try:
+            old_value = float(inv.get("current_value") or 0)
+            new_value = float(new_value or 0)
+        except (TypeError, ValueError):
+            return
+        if old_value <= 0 or new_value <= 0:
+            return
+        change = abs(new_value - old_value) / old_value
+        isin = inv.get("isin")
+        previous = self._volatility.get(isin, change)
+        self._volatility[isin] = 0.7 * previous + 0.3 * change
+    
+    def start_periodic(self, interval_seconds):
+        """
+        Lanza una actualización completa cada interval_seconds, si no hay otra en curso,
+        y reconcilia los totales por categoría
+        """
+        if self._periodic_thread or interval_seconds <= 0:
+            return
+        if REFRESH_INLINE:
+            print("⏱️  Actualización periódica desactivada en modo inline (serverless): usa un cron a /api/update-assets")
+            return
+        
+        def loop():
+            while True:
+                time.sleep(interval_seconds)
+                try:
+                    self.submit(periodic=True)
+                    db.reconcile_category_totals()
+                except Exception as e:
+                    logger.error(f"❌ Error en actualización periódica: {e}")
+        
+        self._periodic_thread = threading.Thread(target=loop, name="refresh-periodic", daemon=True)
+        self._periodic_thread.start()
+        print(f"⏱️  Actualización periódica cada {interval_seconds:.0f}s")
+
+# Singleton para acceso global
+scheduler = RefreshScheduler()
+scheduler.start_periodic(REFRESH_INTERVAL_SECONDS)
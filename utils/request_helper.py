@@ -0,0 +1,39 @@
+# utils/request_helper.py
+from urllib.parse import urlparse, parse_qs
+
+def get_query_param(request, name, default=None):
+    """
+    Obtiene un parámetro de la query string del request.
+    Soporta request.args (Flask), request.query / request.query_params (dict)
+    y request.path / request.url con query string.
+    """
+    for attr in ("args", "query", "query_params"):
+        params = getattr(request, attr, None)
+        if params is not None and hasattr(params, "get"):
+            value = params.get(name)
+            if value is not None:
+                return value[0] if isinstance(value, list) else value
+    
+    for attr in ("url", "path"):
+        url = getattr(request, attr, None)
+        if isinstance(url, str) and "?" in url:
+            values = parse_qs(urlparse(url).query).get(name)
+            if values:
+                return values[0]
+    
+    return default
+
+def get_header(request, name, default=None):
+    """Obtiene una cabecera del request sin distinguir mayúsculas"""
+    headers = getattr(request, "headers", None)
+    if not headers:
+        return default
+    if hasattr(headers, "items"):
+        for key, value in headers.items():
+            if key.lower() == name.lower():
+                return value
+    return default
+
+def is_truthy(value):
+    """Interpreta flags de query string (1/true/yes/on)"""
+    return str(value).strip().lower() in ("1", "true", "yes", "on")
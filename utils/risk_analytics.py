@@ -0,0 +1,162 @@
+# utils/risk_analytics.py
+import os
+import threading
+import logging
+from datetime import date, timedelta
+import numpy as np
+
+try:
+    from market_data import yf
+except ImportError:
+    from utils.market_data import yf
+
+logger = logging.getLogger(__name__)
+
+TRADING_DAYS = 252
+ANALYTICS_BENCHMARK = os.environ.get("ANALYTICS_BENCHMARK", "^STOXX50E")
+MAX_CACHE_ENTRIES = 32
+
+# Rentabilidades por día de cotización: (día, tickers, periodo, benchmark) -> (columnas, rentabilidades)
+# Los pesos no forman parte de la clave: las métricas se recalculan en cada llamada
+_cache = {}
+_cache_lock = threading.Lock()
+
+def trading_day(today=None):
+    """Último día laborable (los fines de semana no hay cierres nuevos)"""
+    today = today or date.today()
+    while today.weekday() >= 5:
+        today -= timedelta(days=1)
+    return today
+
+def download_closes(tickers, period):
+    """
+    Cierres diarios de todos los tickers en una sola descarga.
+    Devuelve (lista de tickers con datos, matriz T x N de precios alineados por fecha).
+    """
+    data = yf.download(list(tickers), period=period, interval="1d", progress=False)["Close"]
+    if getattr(data, "ndim", 2) == 1:
+        data = data.to_frame(name=tickers[0])
+    data = data.dropna(how="all")
+    # Alinear: un hueco (festivo local) repite el último cierre conocido
+    data = data.ffill()
+    columns = [ticker for ticker in tickers if ticker in data.columns and data[ticker].notna().any()]
+    return columns, data[columns].to_numpy(dtype=float)
+
+def returns_matrix(prices):
+    """Rentabilidades simples diarias; NaN donde falta alguno de los dos cierres"""
+    return prices[1:] / prices[:-1] - 1.0
+
+def max_drawdown(returns):
+    """Máxima caída desde máximos por columna (los huecos cuentan como rentabilidad 0)"""
+    wealth = np.cumprod(1.0 + np.nan_to_num(returns), axis=0)
+    peaks = np.maximum.accumulate(wealth, axis=0)
+    return (wealth / peaks - 1.0).min(axis=0)
+
+def risk_metrics(returns, benchmark_column):
+    """
+    Volatilidad anualizada, beta frente al benchmark y matriz de correlaciones,
+    todo con operaciones matriciales sobre la matriz de rentabilidades (T x N).
+    Las parejas se calculan sobre los días en que ambos activos tienen dato.
+    """
+    mask = ~np.isnan(returns)
+    counts = mask.sum(axis=0)
+    means = np.where(counts > 0, np.nansum(returns, axis=0) / np.maximum(counts, 1), 0.0)
+    centered = np.where(mask, returns - means, 0.0)
+    
+    # Covarianzas y varianzas sobre días comunes de cada pareja
+    overlap = mask.T.astype(float) @ mask.astype(float)
+    cross = centered.T @ centered
+    partial_var = (centered ** 2).T @ mask.astype(float)
+    
+    with np.errstate(divide="ignore", invalid="ignore"):
+        volatility = np.sqrt(np.diag(cross) / (counts - 1)) * np.sqrt(TRADING_DAYS)
+        correlation = cross / np.sqrt(partial_var * partial_var.T)
+        correlation[overlap < 2] = np.nan
+        beta = cross[:, benchmark_column] / partial_var[benchmark_column, :]
+    
+    return volatility, beta, correlation
+
+def _clean(values):
+    """Array NumPy a lista con None en lugar de NaN/inf"""
+    values = np.asarray(values, dtype=float)
+    return np.where(np.isfinite(values), values, None).tolist()
+
+def _num(value):
+    """Escalar NumPy a float, o None si es NaN/inf"""
+    return float(value) if np.isfinite(value) else None
+
+def compute_analytics(holdings, period="1y", benchmark=None):
+    """
+    Métricas de riesgo por activo y de la cartera.
+    holdings: [{"isin", "asset_name", "total_money"}]; los pesos salen de total_money.
+    Solo se cachea la descarga (rentabilidades por día de cotización, tickers, periodo y benchmark);
+    pesos y métricas se recalculan siempre, así que reflejan el último total_money.
+    """
+    benchmark = benchmark or ANALYTICS_BENCHMARK
+    tickers = sorted({h["isin"] for h in holdings if h.get("isin")})
+    key = (trading_day().isoformat(), tuple(tickers), period, benchmark)
+    
+    with _cache_lock:
+        cached = _cache.get(key)
+    if cached is not None:
+        print(f"⚡ Rentabilidades desde caché ({key[0]})")
+        columns, returns = cached
+    else:
+        columns, prices = download_closes(list(dict.fromkeys(tickers + [benchmark])), period)
+        if benchmark not in columns or len(columns) < 2 or prices.shape[0] < 3:
+            raise ValueError("Histórico insuficiente para calcular métricas")
+        returns = returns_matrix(prices)
+        with _cache_lock:
+            if len(_cache) >= MAX_CACHE_ENTRIES:
+                _cache.pop(next(iter(_cache)))
+            _cache[key] = (columns, returns)
+    
+    bench_idx = columns.index(benchmark)
+    asset_idx = [i for i, ticker in enumerate(columns) if ticker != benchmark]
+    asset_tickers = [columns[i] for i in asset_idx]
+    
+    # Pesos por valor actual (los activos sin histórico se quedan fuera)
+    money = {}
+    names = {}
+    for h in holdings:
+        money[h["isin"]] = money.get(h["isin"], 0.0) + float(h.get("total_money") or 0)
+        names[h["isin"]] = h.get("asset_name")
+    weights = np.array([money.get(ticker, 0.0) for ticker in asset_tickers])
+    weights = weights / weights.sum() if weights.sum() > 0 else np.full(len(weights), 1.0 / len(weights))
+    
+    # Serie de la cartera como columna extra: mismas fórmulas para todo
+    portfolio_returns = np.nan_to_num(returns[:, asset_idx]) @ weights
+    full = np.column_stack([returns, portfolio_returns])
+    volatility, beta, correlation = risk_metrics(full, bench_idx)
+    drawdown = max_drawdown(full)
+    
+    port = full.shape[1] - 1
+    assets = [
+        {
+            "isin": ticker,
+            "name": names.get(ticker),
+            "weight": float(weight),
+            "volatility": _num(volatility[i]),
+            "max_drawdown": _num(drawdown[i]),
+            "beta": _num(beta[i])
+        }
+        for ticker, weight, i in zip(asset_tickers, weights, asset_idx)
+    ]
+    
+    return {
+        "as_of": key[0],
+        "period": period,
+        "benchmark": benchmark,
+        "observations": int(returns.shape[0]),
+        "portfolio": {
+            "volatility": _num(volatility[port]),
+            "max_drawdown": _num(drawdown[port]),
+            "beta": _num(beta[port])
+        },
+        "assets": assets,
+        "missing": [ticker for ticker in tickers if ticker not in asset_tickers],
+        "correlation": {
+            "tickers": asset_tickers,
+            "matrix": _clean(correlation[np.ix_(asset_idx, asset_idx)])
+        }
+    }
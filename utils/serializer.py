@@ -0,0 +1,80 @@
+# utils/serializer.py
+import json
+import uuid
+import logging
+from datetime import date, datetime
+from decimal import Decimal
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+class RawJSON:
+    """
+    Fragmento JSON ya codificado (p.ej. fig.to_json() de Plotly).
+    Se inserta tal cual en la respuesta, sin volver a parsearlo ni codificarlo.
+    """
+    __slots__ = ("text",)
+
+    def __init__(self, text):
+        self.text = text.decode("utf-8") if isinstance(text, bytes) else text
+
+def _default(obj):
+    """Convierte los tipos que ni orjson ni json saben serializar"""
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if np is not None:
+        if isinstance(obj, np.ndarray):
+            return obj.tolist()
+        if isinstance(obj, np.generic):
+            return obj.item()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    # Registros tipados (utils/investment.py)
+    if hasattr(obj, "to_dict"):
+        return obj.to_dict()
+    return str(obj)
+
+def dumps(obj):
+    """
+    Serializa la respuesta de una API a str.
+    Usa orjson si está disponible (datetimes y NumPy nativos) y json estándar si no.
+    Los RawJSON se incrustan sin re-parsear.
+    """
+    fragments = {}
+
+    def default(value):
+        if isinstance(value, RawJSON):
+            marker = f"__raw_{uuid.uuid4().hex}__"
+            fragments[marker] = value.text
+            return marker
+        return _default(value)
+
+    if orjson is not None:
+        try:
+            text = orjson.dumps(
+                obj,
+                default=default,
+                option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+            ).decode("utf-8")
+        except TypeError as e:
+            # p.ej. enteros fuera de 64 bits: se delega en json estándar
+            logger.debug(f"⚠️ orjson falló, usando json: {e}")
+            text = json.dumps(obj, default=default, ensure_ascii=False)
+    else:
+        text = json.dumps(obj, default=default, ensure_ascii=False)
+
+    for marker, fragment in fragments.items():
+        text = text.replace(f'"{marker}"', fragment, 1)
+
+    return text
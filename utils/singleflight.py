@@ -0,0 +1,53 @@
+# utils/singleflight.py
+import threading
+
+class _Call:
+    __slots__ = ("event", "result", "error", "waiters")
+    
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+class SingleFlight:
+    """
+    Coalescencia de llamadas concurrentes idénticas.
+    Mientras una llamada con una clave está en curso, las demás con la misma
+    clave esperan y reciben su mismo resultado (o su misma excepción).
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+    
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                leader = True
+        
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        
+        try:
+            call.result = fn(*args, **kwargs)
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+        
+        if call.waiters:
+            print(f"🔗 {call.waiters} llamadas coalescidas en '{key}'")
+        return call.result
@@ -0,0 +1,234 @@
+# utils/sparklines.py
+import io
+import os
+import math
+import threading
+import numpy as np
+import matplotlib
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection, PolyCollection
+from matplotlib.ticker import MaxNLocator
+import seaborn as sns
+
+try:
+    from request_helper import get_query_param
+except ImportError:
+    from utils.request_helper import get_query_param
+
+# Celdas del sprite sheet (miniaturas de graphs.html)
+SPRITE_COLUMNS = 4
+CELL_WIDTH_PX = 300
+CELL_HEIGHT_PX = 200
+SPRITE_DPI = 100
+# Margen interior de cada celda (fracción) para que las líneas no invadan la vecina
+CELL_PADDING = 0.03
+
+RASTER_MIME_TYPES = {
+    "png": "image/png",
+    "webp": "image/webp",
+}
+IMAGE_MIME_TYPES = {**RASTER_MIME_TYPES, "svg": "image/svg+xml"}
+
+# Gráfica individual: MISMO tamaño por defecto que create_graph (6x4 pulgadas a 100 dpi)
+IMAGE_WIDTH_PX = 600
+IMAGE_HEIGHT_PX = 400
+IMAGE_DPI = 100
+DEFAULT_IMAGE_OPTIONS = {"format": "png", "width": IMAGE_WIDTH_PX, "height": IMAGE_HEIGHT_PX, "dpi": IMAGE_DPI}
+# Límites de los parámetros width/height (píxeles) y dpi
+SIZE_LIMITS = (50, 2000)
+DPI_LIMITS = (50, 300)
+# Píxeles máximos del sprite completo (ancho x alto): acota la memoria de la figura
+MAX_SPRITE_PIXELS = int(os.environ.get("MAX_SPRITE_PIXELS", 16_000_000))
+
+# Figuras con Figure + FigureCanvasAgg (sin el estado global de pyplot, que no es seguro entre hilos)
+_style_lock = threading.Lock()
+_style_ready = False
+
+def _ensure_style():
+    """sns.set una sola vez por proceso en lugar de una vez por gráfica"""
+    global _style_ready
+    with _style_lock:
+        if not _style_ready:
+            sns.set(style="whitegrid")
+            _style_ready = True
+
+def _new_figure(width, height, dpi):
+    fig = Figure(figsize=(width / dpi, height / dpi), dpi=dpi)
+    FigureCanvasAgg(fig)
+    return fig
+
+def style_axes(ax):
+    """MISMO estilo que create_graph (api/grapsh.py)"""
+    ax.set_facecolor('#B0B0B0')
+    ax.set_title('')
+    ax.set_xlabel('')
+    ax.set_ylabel('')
+    ax.tick_params(axis='x', colors='none')
+    ax.tick_params(axis='y', colors='none')
+    ax.xaxis.set_major_locator(MaxNLocator(10))
+    ax.yaxis.set_major_locator(MaxNLocator(10))
+    ax.grid(color='#FFFFFF', linestyle='-', linewidth=0.5)
+
+def _bounded_int(request, name, default, limits):
+    value = get_query_param(request, name)
+    if value in (None, ""):
+        return default
+    try:
+        number = int(float(value))
+    except (ValueError, OverflowError):
+        raise ValueError(f"Parámetro {name} inválido: {value}")
+    low, high = limits
+    if not low <= number <= high:
+        raise ValueError(f"Parámetro {name} fuera de rango ({low}-{high}): {number}")
+    return number
+
+def parse_image_options(request, width=IMAGE_WIDTH_PX, height=IMAGE_HEIGHT_PX, dpi=IMAGE_DPI):
+    """
+    Opciones de imagen de la query string: format (png|webp|svg), width y height en píxeles y dpi.
+    Devuelve None si no se pide ninguna (se mantiene la salida original) o ValueError si no son válidas.
+    """
+    names = ("format", "width", "height", "dpi")
+    if all(get_query_param(request, name) in (None, "") for name in names):
+        return None
+    fmt = (get_query_param(request, "format") or "png").lower()
+    if fmt not in IMAGE_MIME_TYPES:
+        raise ValueError(f"Formato inválido: {fmt}. Usa uno de {', '.join(IMAGE_MIME_TYPES)}")
+    return {
+        "format": fmt,
+        "width": _bounded_int(request, "width", width, SIZE_LIMITS),
+        "height": _bounded_int(request, "height", height, SIZE_LIMITS),
+        "dpi": _bounded_int(request, "dpi", dpi, DPI_LIMITS)
+    }
+
+def render_svg(closes, width, height, stroke=2.5):
+    """
+    Sparkline como un único path SVG, sin matplotlib: unos cientos de bytes por gráfica.
+    Los huecos (NaN) se omiten.
+    """
+    values = [float(value) for value in closes if value == value]
+    if len(values) < 2:
+        values = values * 2 or [0.0, 0.0]
+    low, high = min(values), max(values)
+    span = (high - low) or 1.0
+    step = width / (len(values) - 1)
+    usable = height - 2 * stroke
+    points = " ".join(
+        f"{i * step:.1f},{stroke + (high - value) / span * usable:.1f}"
+        for i, value in enumerate(values)
+    )
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'viewBox="0 0 {width} {height}" preserveAspectRatio="none">'
+        f'<path d="M{points}" fill="none" stroke="#000" stroke-width="{stroke}" '
+        f'stroke-linejoin="round" vector-effect="non-scaling-stroke"/></svg>'
+    )
+
+def render_sparkline(closes, fmt="png", width=IMAGE_WIDTH_PX, height=IMAGE_HEIGHT_PX, dpi=IMAGE_DPI):
+    """
+    Una gráfica con tamaño exacto en píxeles (sin bbox_inches='tight', que obliga a dibujar dos veces).
+    Devuelve los bytes de la imagen.
+    """
+    if fmt == "svg":
+        return render_svg(closes, width, height).encode("utf-8")
+    
+    _ensure_style()
+    fig = _new_figure(width, height, dpi)
+    ax = fig.add_axes([0, 0, 1, 1])
+    ax.plot(closes, color='#000000', linewidth=2.5, linestyle='-')
+    style_axes(ax)
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format=fmt, dpi=dpi, transparent=True)
+    return buffer.getvalue()
+
+def sprite_layout(count, columns=SPRITE_COLUMNS, cell_width=CELL_WIDTH_PX, cell_height=CELL_HEIGHT_PX):
+    """
+    (columnas, filas, ancho, alto) del sprite para count gráficas.
+    ValueError si supera MAX_SPRITE_PIXELS (antes de descargar ni dibujar nada).
+    """
+    columns = max(1, min(columns, count))
+    rows = max(1, math.ceil(count / columns))
+    width, height = columns * cell_width, rows * cell_height
+    if width * height > MAX_SPRITE_PIXELS:
+        raise ValueError(
+            f"Sprite demasiado grande ({width}x{height} px, máximo {MAX_SPRITE_PIXELS} px): "
+            f"reduce width/height"
+        )
+    return columns, rows, width, height
+
+def _cell_segments(closes, x0, y0, w, h, locator):
+    """
+    Línea y rejilla de una celda en píxeles del sprite (y hacia abajo), con los mismos
+    márgenes (5%) y líneas de rejilla (MaxNLocator(10)) que tendría un axes con style_axes.
+    """
+    values = np.asarray(closes, dtype=float)
+    finite = values[np.isfinite(values)]
+    count = max(len(values), 2)
+    low, high = (finite.min(), finite.max()) if finite.size else (0.0, 1.0)
+    if high == low:
+        low, high = low - 1.0, high + 1.0
+    x_lo, x_hi = -0.05 * (count - 1), 1.05 * (count - 1)
+    y_lo, y_hi = low - 0.05 * (high - low), high + 0.05 * (high - low)
+    
+    def to_x(v):
+        return x0 + (v - x_lo) / (x_hi - x_lo) * w
+    
+    def to_y(v):
+        return y0 + (y_hi - v) / (y_hi - y_lo) * h
+    
+    # NaN (huecos) corta la línea igual que en ax.plot
+    line = np.column_stack([to_x(np.arange(len(values))), to_y(values)])
+    grid = [
+        [(to_x(tick), y0), (to_x(tick), y0 + h)]
+        for tick in locator.tick_values(x_lo, x_hi) if x_lo <= tick <= x_hi
+    ] + [
+        [(x0, to_y(tick)), (x0 + w, to_y(tick))]
+        for tick in locator.tick_values(y_lo, y_hi) if y_lo <= tick <= y_hi
+    ]
+    return line, grid
+
+def render_sprite(series, fmt="png", columns=SPRITE_COLUMNS,
+                  cell_width=CELL_WIDTH_PX, cell_height=CELL_HEIGHT_PX, dpi=SPRITE_DPI):
+    """
+    Dibuja todas las series (arrays de cierres) en una sola figura en rejilla.
+    Todo va en un único axes sin decoración y tres colecciones (rejilla, líneas y bordes):
+    dibujar un axes con ticks por celda costaba lo mismo que renderizar cada gráfica por separado.
+    Devuelve (bytes de la imagen, layout) con layout = {width, height, columns, rows, cells}
+    y cells = [{x, y, w, h}] en píxeles, en el mismo orden que series.
+    """
+    _ensure_style()
+    columns, rows, width, height = sprite_layout(len(series), columns, cell_width, cell_height)
+    
+    fig = _new_figure(width, height, dpi)
+    ax = fig.add_axes([0, 0, 1, 1])
+    ax.set_axis_off()
+    ax.set_xlim(0, width)
+    ax.set_ylim(height, 0)
+    
+    locator = MaxNLocator(10)
+    pad_x, pad_y = CELL_PADDING * cell_width, CELL_PADDING * cell_height
+    w, h = cell_width - 2 * pad_x, cell_height - 2 * pad_y
+    cells, frames, grid, lines = [], [], [], []
+    for index, closes in enumerate(series):
+        row, col = divmod(index, columns)
+        x0, y0 = col * cell_width + pad_x, row * cell_height + pad_y
+        line, cell_grid = _cell_segments(closes, x0, y0, w, h, locator)
+        frames.append([(x0, y0), (x0 + w, y0), (x0 + w, y0 + h), (x0, y0 + h)])
+        grid.extend(cell_grid)
+        lines.append(line)
+        cells.append({"x": col * cell_width, "y": row * cell_height, "w": cell_width, "h": cell_height})
+    
+    # MISMO resultado que style_axes con transparent=True (el fondo gris queda transparente):
+    # rejilla blanca, línea negra y bordes del estilo de seaborn por encima
+    ax.add_collection(LineCollection(grid, colors='#FFFFFF', linewidths=0.5, zorder=1))
+    ax.add_collection(LineCollection(lines, colors='#000000', linewidths=2.5, zorder=2))
+    ax.add_collection(PolyCollection(
+        frames, facecolors='none', zorder=2.5,
+        edgecolors=matplotlib.rcParams['axes.edgecolor'], linewidths=matplotlib.rcParams['axes.linewidth']
+    ))
+    
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format=fmt, dpi=dpi, transparent=True)
+    
+    layout = {"width": width, "height": height, "columns": columns, "rows": rows, "cells": cells}
+    return buffer.getvalue(), layout
@@ -1,8 +1,24 @@
 # utils/supabase_client.py
 import os
+import time
+import httpx
 from supabase import create_client, Client
 from dotenv import load_dotenv
 import logging
+from datetime import datetime, timezone
+
+try:
+    from singleflight import SingleFlight
+    from live_updates import hub
+    from category_aggregates import CategoryAggregates
+    from investment import to_records
+    from write_behind import WriteBehindQueue
+except ImportError:
+    from utils.singleflight import SingleFlight
+    from utils.live_updates import hub
+    from utils.category_aggregates import CategoryAggregates
+    from utils.investment import to_records
+    from utils.write_behind import WriteBehindQueue
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -10,6 +26,23 @@ logger = logging.getLogger(__name__)
 
 load_dotenv()
 
+# Columnas añadidas por migraciones de sql/ que pueden no existir todavía
+OPTIONAL_COLUMNS = ("currency", "purchase_fx_rate")
+
+def _env_float(name, default):
+    """Lee un float de las variables de entorno con valor por defecto"""
+    try:
+        return float(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return float(default)
+
+def _env_bool(name, default=False):
+    """Lee un booleano de las variables de entorno (1/true/yes/on)"""
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
 class SupabaseManager:
     _instance = None
     
@@ -31,24 +64,316 @@ class SupabaseManager:
             raise ValueError("Variables de entorno no configuradas")
         
         self.client = create_client(self.url, self.key)
+        self._configure_transport()
+        self._flight = SingleFlight()
+        self._missing_columns = set()
+        self._aggregates = CategoryAggregates()
+        self._aggregates_max_age = _env_float("CATEGORY_RECONCILE_SECONDS", 300)
+        # Momento (monotonic) en que falló portfolio_category_totals: no se reintenta hasta pasado max_age
+        self._category_rpc_failed_at = None
+        # Cursores de reanudación si la tabla refresh_cursors no existe (solo esta instancia)
+        self._cursors = {}
+        self._write_behind = None
+        if _env_bool("SUPABASE_WRITE_BEHIND"):
+            self._write_behind = WriteBehindQueue(
+                self._apply_updates,
+                max_pending=int(_env_float("SUPABASE_WRITE_BATCH", 50)),
+                max_delay=_env_float("SUPABASE_WRITE_DELAY", 0.5)
+            )
         logger.info("✅ Cliente Supabase inicializado")
         print(f"✅ Conectado a Supabase: {self.url[:30]}...")
+        
+        if _env_bool("SUPABASE_WARMUP"):
+            self.warm_up()
+    
+    def _configure_transport(self):
+        """
+        Sustituye la sesión HTTP de PostgREST por un cliente httpx con pool
+        de conexiones keep-alive configurable, para que todas las llamadas de
+        una misma instancia reutilicen las conexiones TLS ya abiertas.
+        """
+        pool_size = int(_env_float("SUPABASE_POOL_SIZE", 10))
+        limits = httpx.Limits(
+            max_connections=pool_size,
+            max_keepalive_connections=pool_size,
+            keepalive_expiry=_env_float("SUPABASE_KEEPALIVE_EXPIRY", 60)
+        )
+        read_timeout = _env_float("SUPABASE_READ_TIMEOUT", 30)
+        timeout = httpx.Timeout(
+            read_timeout,
+            connect=_env_float("SUPABASE_CONNECT_TIMEOUT", 5)
+        )
+        http2 = _env_bool("SUPABASE_HTTP2", True)
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logger.warning("⚠️ Paquete 'h2' no instalado, usando HTTP/1.1")
+                http2 = False
+        
+        try:
+            postgrest = self.client.postgrest
+            old_session = postgrest.session
+            session_cls = type(old_session) if isinstance(old_session, httpx.Client) else httpx.Client
+            postgrest.session = session_cls(
+                base_url=old_session.base_url,
+                headers=old_session.headers,
+                timeout=timeout,
+                limits=limits,
+                http2=http2,
+                follow_redirects=True
+            )
+            old_session.close()
+            logger.info(
+                f"🔌 Transporte HTTP: pool={pool_size}, http2={http2}, "
+                f"keepalive={limits.keepalive_expiry}s"
+            )
+        except Exception as e:
+            # Si la versión de postgrest no expone la sesión, se mantiene la original
+            logger.warning(f"⚠️ No se pudo configurar el transporte HTTP: {e}")
+    
+    def warm_up(self):
+        """Abre la conexión con una consulta mínima para no pagar el handshake en la primera petición real"""
+        try:
+            self.client.table("investments").select("id").limit(1).execute()
+            logger.info("🔥 Conexión con Supabase precalentada")
+            return True
+        except Exception as e:
+            logger.warning(f"⚠️ Warm-up de Supabase falló: {e}")
+            return False
     
     def get_all_investments(self):
-        """Obtiene todas las inversiones ordenadas por ID"""
+        """
+        Obtiene todas las inversiones ordenadas por ID, como registros Investment.
+        Las lecturas concurrentes comparten una sola consulta en curso.
+        """
+        return self._flight.do("investments", self._fetch_all_investments)
+    
+    def _fetch_all_investments(self):
         try:
             response = self.client.table("investments").select("*").order("id").execute()
             print(f"📊 {len(response.data)} inversiones obtenidas de Supabase")
-            return response.data
+            return to_records(response.data)
         except Exception as e:
             print(f"❌ Error al obtener inversiones: {e}")
             return []
     
-    def update_investment(self, investment_id, data):
-        """Actualiza una inversión existente"""
+    def get_investments_since(self, since):
+        """Inversiones (Investment) insertadas o modificadas desde el timestamp since (updated_at indexado)"""
+        return self._flight.do(f"since:{since}", self._fetch_investments_since, since)
+    
+    def _fetch_investments_since(self, since):
         try:
-            response = self.client.table("investments").update(data).eq("id", investment_id).execute()
+            response = (
+                self.client.table("investments").select("*")
+                .gte("updated_at", since).order("updated_at").execute()
+            )
+            print(f"📊 {len(response.data)} inversiones modificadas desde {since}")
+            return to_records(response.data)
+        except Exception as e:
+            print(f"❌ Error al obtener cambios desde {since}: {e}")
+            return None
+    
+    def query_investments(self, columns=None, updated_from=None, updated_before=None):
+        """
+        Inversiones con solo las columnas pedidas y, opcionalmente, filtradas por
+        updated_from <= updated_at < updated_before. La selección y el filtro se hacen en Supabase.
+        Las columnas opcionales que aún no existen (sql/) se omiten, como en las escrituras.
+        """
+        def run(columns):
+            query = self.client.table("investments").select(",".join(columns))
+            if updated_from:
+                query = query.gte("updated_at", updated_from)
+            if updated_before:
+                query = query.lt("updated_at", updated_before)
+            return query.order("id").execute()
+        
+        try:
+            columns = [col for col in (columns or ["*"]) if col not in self._missing_columns]
+            try:
+                response = run(columns)
+            except Exception as e:
+                available = self._without_missing_columns(dict.fromkeys(columns), e)
+                if not available:
+                    raise
+                response = run(list(available))
+            print(f"📊 {len(response.data)} inversiones exportadas de Supabase")
+            return response.data
+        except Exception as e:
+            print(f"❌ Error al consultar inversiones: {e}")
+            return None
+    
+    def get_deleted_since(self, since):
+        """
+        Lápidas de inversiones borradas desde since (ver sql/delta_sync.sql).
+        Devuelve None si la tabla de lápidas no está disponible.
+        """
+        try:
+            response = (
+                self.client.table("investment_tombstones").select("id, deleted_at")
+                .gte("deleted_at", since).execute()
+            )
+            return response.data
+        except Exception as e:
+            print(f"⚠️ Lápidas no disponibles: {e}")
+            return None
+    
+    def get_category_totals(self):
+        """
+        Obtiene sumas y conteos por investment_type.
+        La base de datos los mantiene materializados con triggers (sql/category_aggregates.sql),
+        así que la lectura no recorre la tabla de inversiones.
+        Si la función no existe, se usan los totales en memoria de esta instancia,
+        ajustados en cada escritura y reconciliados al leer si tienen más de
+        CATEGORY_RECONCILE_SECONDS (haya o no actualización periódica); la función
+        no se vuelve a probar hasta que pasa ese mismo intervalo.
+        """
+        return self._flight.do("category_totals", self._fetch_category_totals)
+    
+    def _fetch_category_totals(self):
+        failed_at = self._category_rpc_failed_at
+        if failed_at is None or time.monotonic() - failed_at > self._aggregates_max_age:
+            try:
+                response = self.client.rpc("portfolio_category_totals", {}).execute()
+                self._category_rpc_failed_at = None
+                print(f"📊 {len(response.data)} grupos de inversiones agregados en Supabase")
+                return response.data
+            except Exception as e:
+                self._category_rpc_failed_at = time.monotonic()
+                print(f"⚠️ RPC portfolio_category_totals no disponible ({e}), usando totales locales")
+        
+        # Los ajustes incrementales derivan con ediciones concurrentes: reconciliar por antigüedad
+        if self._aggregates.is_stale(self._aggregates_max_age):
+            self._aggregates.reconcile(self.get_all_investments())
+        return self._aggregates.snapshot()
+    
+    def reconcile_category_totals(self):
+        """
+        Reconciliación completa de los totales por categoría (en Supabase y en memoria).
+        Corrige cualquier deriva de los ajustes incrementales.
+        """
+        try:
+            self.client.rpc("reconcile_category_totals", {}).execute()
+            print("🧮 Totales por categoría reconciliados en Supabase")
+        except Exception as e:
+            print(f"⚠️ RPC reconcile_category_totals no disponible: {e}")
+        self._aggregates.invalidate()
+    
+    def get_refresh_cursor(self, name):
+        """
+        Cursor de reanudación guardado (id de la última inversión procesada) o None.
+        Tabla refresh_cursors (sql/refresh_cursor.sql); sin ella, el de esta instancia.
+        """
+        try:
+            response = self.client.table("refresh_cursors").select("cursor").eq("name", name).execute()
+            return response.data[0]["cursor"] if response.data else None
+        except Exception as e:
+            print(f"⚠️ Tabla refresh_cursors no disponible ({e}), usando cursor en memoria")
+            return self._cursors.get(name)
+    
+    def set_refresh_cursor(self, name, cursor):
+        """Guarda el cursor de reanudación (None: la próxima ejecución empieza de cero)"""
+        self._cursors[name] = cursor
+        try:
+            self.client.table("refresh_cursors").upsert({
+                "name": name,
+                "cursor": cursor,
+                "updated_at": datetime.now(timezone.utc).isoformat()
+            }).execute()
+        except Exception as e:
+            print(f"⚠️ No se pudo guardar el cursor {name} en Supabase: {e}")
+    
+    def _without_missing_columns(self, data, error):
+        """
+        Si el error se debe a una columna opcional que aún no existe en la tabla,
+        devuelve los datos sin ella (y la recuerda); si no, None.
+        """
+        missing = [col for col in OPTIONAL_COLUMNS if col in data and col in str(error)]
+        if not missing:
+            return None
+        self._missing_columns.update(missing)
+        print(f"⚠️ Columnas no disponibles en Supabase (aplica sql/): {', '.join(missing)}")
+        return {key: value for key, value in data.items() if key not in missing}
+    
+    def _strip_missing_columns(self, data):
+        return {key: value for key, value in data.items() if key not in self._missing_columns}
+    
+    def update_investment(self, investment_id, data, previous=None):
+        """
+        Actualiza una inversión existente.
+        previous: la fila antes del cambio, para ajustar los totales por categoría en O(1).
+        Con SUPABASE_WRITE_BEHIND la actualización se encola y se devuelve la fila prevista;
+        se escribe al volcar la cola (flush_writes).
+        """
+        if self._write_behind is not None:
+            return self._write_behind.enqueue(investment_id, data, previous)
+        return self._update_now(investment_id, data, previous)
+    
+    def flush_writes(self):
+        """
+        Escribe las actualizaciones diferidas pendientes (no hace nada sin cola).
+        Devuelve {id: error} de las que no se pudieron escribir.
+        """
+        if self._write_behind is None:
+            return {}
+        return self._write_behind.flush()
+    
+    def write_failures(self, ids):
+        """{id: error} de las actualizaciones diferidas de esos ids que están fallando"""
+        if self._write_behind is None:
+            return {}
+        return self._write_behind.failures(ids)
+    
+    def _apply_updates(self, batch):
+        """
+        Vuelca un lote de la cola en una sola llamada (RPC apply_investment_updates,
+        ver sql/write_behind.sql); si la función no existe, fila a fila.
+        Devuelve {id: error} de las filas que no se escribieron.
+        """
+        updates = [
+            {"id": investment_id, "data": self._strip_missing_columns(data)}
+            for investment_id, data, _ in batch
+        ]
+        try:
+            response = self.client.rpc("apply_investment_updates", {"updates": updates}).execute()
+        except Exception as e:
+            print(f"⚠️ RPC apply_investment_updates no disponible ({e}), escribiendo fila a fila")
+            return {
+                investment_id: "Error al actualizar en la base de datos"
+                for investment_id, data, previous in batch
+                if not self._update_now(investment_id, data, previous)
+            }
+        
+        rows = {row.get("id"): row for row in response.data or []}
+        failed = {}
+        for investment_id, _, previous in batch:
+            row = rows.get(investment_id)
+            if row is None:
+                failed[investment_id] = "Inversión no encontrada al escribir"
+            elif previous is not None:
+                self._aggregates.apply(previous, row)
+            else:
+                self._aggregates.invalidate()
+        print(f"✅ {len(rows)} inversiones actualizadas en bloque ({len(batch)} pendientes)")
+        hub.publish(list(rows.values()))
+        return failed
+    
+    def _update_now(self, investment_id, data, previous=None):
+        data = self._strip_missing_columns(data)
+        try:
+            try:
+                response = self.client.table("investments").update(data).eq("id", investment_id).execute()
+            except Exception as e:
+                data = self._without_missing_columns(data, e)
+                if data is None:
+                    raise
+                response = self.client.table("investments").update(data).eq("id", investment_id).execute()
             print(f"✅ Inversión {investment_id} actualizada en Supabase")
+            if previous is not None and response.data:
+                self._aggregates.apply(previous, response.data[0])
+            else:
+                self._aggregates.invalidate()
+            hub.publish(response.data)
             return response.data
         except Exception as e:
             print(f"❌ Error al actualizar inversión {investment_id}: {e}")
@@ -56,14 +381,70 @@ class SupabaseManager:
     
     def add_investment(self, data):
         """Añade una nueva inversión"""
+        data = self._strip_missing_columns(data)
         try:
-            response = self.client.table("investments").insert(data).execute()
+            try:
+                response = self.client.table("investments").insert(data).execute()
+            except Exception as e:
+                data = self._without_missing_columns(data, e)
+                if data is None:
+                    raise
+                response = self.client.table("investments").insert(data).execute()
             print(f"✅ Nueva inversión añadida: {data.get('asset_name', 'Sin nombre')}")
+            for row in response.data or []:
+                self._aggregates.apply(None, row)
+            hub.publish(response.data)
             return response.data
         except Exception as e:
             print(f"❌ Error al añadir inversión: {e}")
             return None
+    
+    def add_investments(self, rows, chunk_size=100):
+        """
+        Inserta muchas inversiones con INSERTs de varias filas (chunk_size por petición).
+        Si un bloque falla, se reintenta fila a fila para saber cuáles fallan.
+        Devuelve [(fila, fila insertada o None, error o None)] en el mismo orden;
+        (fila, None, None) si el bloque no devolvió todas sus filas (inserción sin confirmar).
+        """
+        results = []
+        for start in range(0, len(rows), chunk_size):
+            chunk = [self._strip_missing_columns(row) for row in rows[start:start + chunk_size]]
+            try:
+                try:
+                    response = self.client.table("investments").insert(chunk).execute()
+                except Exception as e:
+                    stripped = [self._without_missing_columns(row, e) for row in chunk]
+                    if any(row is None for row in stripped):
+                        raise
+                    chunk = stripped
+                    response = self.client.table("investments").insert(chunk).execute()
+                inserted = response.data or []
+                print(f"✅ {len(inserted)} inversiones añadidas en bloque")
+                for row in inserted:
+                    self._aggregates.apply(None, row)
+                hub.publish(inserted)
+                if len(inserted) == len(chunk):
+                    results.extend((row, saved, None) for row, saved in zip(chunk, inserted))
+                else:
+                    results.extend((row, None, None) for row in chunk)
+            except Exception as e:
+                print(f"⚠️ Falló el bloque de {len(chunk)} filas ({e}), insertando una a una")
+                for row in chunk:
+                    saved = self.add_investment(row)
+                    if saved:
+                        results.append((row, saved[0], None))
+                    else:
+                        results.append((row, None, "Error al insertar en la base de datos"))
+        return results
 
 # ==== ¡IMPORTANTE! Añade estas líneas al final ====
 # Singleton para acceso global
-db = SupabaseManager()
\ No newline at end of file
+# PORTFOLIO_BACKEND=local: almacenamiento en memoria para desarrollo y pruebas de carga offline
+if os.environ.get("PORTFOLIO_BACKEND", "supabase").strip().lower() == "local":
+    try:
+        from local_store import LocalStore
+    except ImportError:
+        from utils.local_store import LocalStore
+    db = LocalStore()
+else:
+    db = SupabaseManager()
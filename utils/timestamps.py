@@ -0,0 +1,36 @@
+# utils/timestamps.py
+import re
+from datetime import datetime, timedelta, timezone
+
+# Fecha sola (2024-12-31)
+_DATE_ONLY = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+# Fracción de segundo de cualquier longitud (Postgres omite los ceros finales: .12345)
+_FRACTION = re.compile(r"\.(\d+)(?=[+-]\d{2}:?\d{2}$|$)")
+
+def parse_timestamp(value):
+    """
+    Fecha u hora ISO 8601 -> datetime con zona (UTC si no la trae); ValueError si no es válida.
+    En Python 3.9 datetime.fromisoformat solo acepta fracciones de 3 o 6 dígitos y no acepta 'Z',
+    así que se normalizan antes (los timestamps de Supabase pueden traer 1-6 dígitos).
+    """
+    text = str(value).strip()
+    if text.endswith(("Z", "z")):
+        text = text[:-1] + "+00:00"
+    text = _FRACTION.sub(lambda m: "." + m.group(1)[:6].ljust(6, "0"), text, count=1)
+    parsed = datetime.fromisoformat(text)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+def is_date_only(value):
+    return bool(_DATE_ONLY.match(str(value).strip()))
+
+def exclusive_end(value):
+    """
+    Límite superior exclusivo para un filtro 'hasta' inclusivo:
+    una fecha sola cubre el día entero (< día siguiente); una hora, hasta ese instante incluido.
+    """
+    parsed = parse_timestamp(value)
+    if is_date_only(value):
+        return parsed + timedelta(days=1)
+    return parsed + timedelta(microseconds=1)
@@ -0,0 +1,136 @@
+# utils/write_behind.py
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Intentos de escritura de una fila antes de darla por fallida
+MAX_WRITE_ATTEMPTS = 3
+
+class WriteBehindQueue:
+    """
+    Cola de escritura diferida para actualizaciones de inversiones.
+    Las actualizaciones pendientes de un mismo id se fusionan (gana el último valor de cada campo)
+    y se escriben juntas con flush_fn cuando hay max_pending filas o pasan max_delay segundos,
+    o cuando se llama a flush() explícitamente (antes de responder).
+    flush_fn recibe [(id, datos fusionados, fila antes del primer cambio pendiente)]
+    y devuelve {id: error} con las filas que no se pudieron escribir (si lanza, fallan todas).
+    Las fallidas vuelven a la cola hasta MAX_WRITE_ATTEMPTS intentos; después se descartan
+    y quedan registradas en failures() hasta que una escritura posterior de ese id funcione.
+    """
+    
+    def __init__(self, flush_fn, max_pending=50, max_delay=0.5):
+        self.flush_fn = flush_fn
+        self.max_pending = max_pending
+        self.max_delay = max_delay
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._pending = {}
+        self._attempts = {}
+        self._failed = {}
+        self._oldest = None
+        self._thread = None
+        self.enqueued = 0
+        self.written = 0
+    
+    def enqueue(self, investment_id, data, previous=None):
+        """
+        Encola una actualización y devuelve la fila resultante prevista ([fila]),
+        con la misma forma que la respuesta de Supabase.
+        """
+        with self._cond:
+            if investment_id in self._pending:
+                merged, first_previous = self._pending[investment_id]
+                merged.update(data)
+            else:
+                merged, first_previous = dict(data), (dict(previous) if previous is not None else None)
+                self._pending[investment_id] = (merged, first_previous)
+                if self._oldest is None:
+                    self._oldest = time.monotonic()
+            self.enqueued += 1
+            full = len(self._pending) >= self.max_pending
+            preview = {**(first_previous or {}), **merged, "id": investment_id}
+            self._ensure_thread()
+            self._cond.notify_all()
+        
+        if full:
+            self.flush()
+        return [preview]
+    
+    def flush(self):
+        """
+        Escribe ya todo lo pendiente.
+        Devuelve {id: error} de las filas que fallaron en este volcado (reencoladas o descartadas).
+        """
+        with self._flush_lock:
+            with self._cond:
+                batch = [(key, data, previous) for key, (data, previous) in self._pending.items()]
+                self._pending = {}
+                self._oldest = None
+            if not batch:
+                return {}
+            try:
+                failed = self.flush_fn(batch) or {}
+            except Exception as e:
+                logger.error(f"❌ Error al volcar {len(batch)} actualizaciones diferidas: {e}")
+                failed = {key: str(e) for key, _, _ in batch}
+            
+            with self._cond:
+                for key, data, previous in batch:
+                    if key not in failed:
+                        self.written += 1
+                        self._attempts.pop(key, None)
+                        self._failed.pop(key, None)
+                        continue
+                    attempts = self._attempts.get(key, 0) + 1
+                    if attempts >= MAX_WRITE_ATTEMPTS:
+                        logger.error(f"❌ Actualización de {key} descartada tras {attempts} intentos: {failed[key]}")
+                        self._attempts.pop(key, None)
+                        self._failed[key] = failed[key]
+                        continue
+                    # Vuelve a la cola; lo encolado después tiene prioridad campo a campo
+                    self._attempts[key] = attempts
+                    self._failed[key] = failed[key]
+                    if key in self._pending:
+                        newer, _ = self._pending[key]
+                        self._pending[key] = ({**data, **newer}, previous)
+                    else:
+                        self._pending[key] = (data, previous)
+                    if self._oldest is None:
+                        self._oldest = time.monotonic()
+                if failed:
+                    self._cond.notify_all()
+            return failed
+    
+    def failures(self, ids=None):
+        """{id: último error} de las filas cuya escritura está fallando (todas o solo ids)"""
+        with self._cond:
+            if ids is None:
+                return dict(self._failed)
+            return {key: self._failed[key] for key in ids if key in self._failed}
+    
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+            self._thread.start()
+    
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._oldest is None:
+                    self._cond.wait()
+                remaining = self._oldest + self.max_delay - time.monotonic()
+                if remaining > 0:
+                    self._cond.wait(remaining)
+                    continue
+            self.flush()
+    
+    def stats(self):
+        with self._cond:
+            return {
+                "pending": len(self._pending),
+                "enqueued": self.enqueued,
+                "written": self.written,
+                "failed": len(self._failed)
+            }
@@ -1,57 +1,242 @@
 # utils/yfinance_helper.py (versión completa)
-import yfinance as yf
+import os
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from datetime import datetime
 import logging
 
+try:
+    from singleflight import SingleFlight
+    from circuit_breaker import CircuitBreaker
+    from market_data import yf
+except ImportError:
+    from utils.singleflight import SingleFlight
+    from utils.circuit_breaker import CircuitBreaker
+    from utils.market_data import yf
+
 logger = logging.getLogger(__name__)
 
+# Peticiones de precio en curso por ticker
+_price_flight = SingleFlight()
+
+# Segundos que se espera a Yahoo antes de servir el último precio conocido
+PRICE_SOFT_TIMEOUT = float(os.environ.get("PRICE_SOFT_TIMEOUT", 4))
+PRICE_WORKERS = int(os.environ.get("PRICE_WORKERS", 8))
+_price_executor = ThreadPoolExecutor(
+    max_workers=PRICE_WORKERS,
+    thread_name_prefix="price"
+)
+
+# Último precio bueno por ticker: isin -> (precio, timestamp ISO)
+_last_good = {}
+_last_good_lock = threading.Lock()
+
+PriceQuote = namedtuple("PriceQuote", ["value", "stale", "as_of"])
+
+def remember_price(isin, price, as_of=None, overwrite=True):
+    """
+    Guarda un precio válido (en la divisa de cotización) como último conocido.
+    overwrite=False solo lo guarda si no hay ninguno (p.ej. el current_value de la fila).
+    """
+    try:
+        price = float(price or 0)
+    except (TypeError, ValueError):
+        return
+    if price <= 0:
+        return
+    with _last_good_lock:
+        if overwrite or isin not in _last_good:
+            _last_good[isin] = (price, str(as_of) if as_of else datetime.now().isoformat())
+
+def get_last_good(isin):
+    """Último precio conocido como PriceQuote marcado stale, o None"""
+    with _last_good_lock:
+        entry = _last_good.get(isin)
+    return PriceQuote(entry[0], True, entry[1]) if entry else None
+
+def _fetch_and_remember(isin):
+    price = _price_flight.do(isin, _fetch_current_value, isin)
+    remember_price(isin, price)
+    return price
+
+def revalidate(isin):
+    """Lanza la descarga del precio en segundo plano (coalescida por ticker)"""
+    return _price_executor.submit(_fetch_and_remember, isin)
+
+def _resolve_quote(isin, future, last_good, timeout):
+    """Espera la descarga hasta timeout; si falla o tarda, sirve el último precio conocido"""
+    try:
+        price = future.result(timeout=timeout)
+    except FutureTimeoutError:
+        if last_good is None:
+            logger.warning(f"⏳ Precio lento para {isin} y sin último conocido, se sigue descargando en segundo plano")
+            return PriceQuote(0.0, True, None)
+        logger.warning(f"⏳ Precio lento para {isin}, sirviendo último conocido ({last_good.as_of})")
+        return last_good
+    except Exception as e:
+        logger.error(f"❌ Error al obtener precio de {isin}: {e}")
+        price = 0.0
+    
+    if price > 0:
+        return PriceQuote(price, False, datetime.now().isoformat())
+    
+    if last_good:
+        logger.warning(f"⚠️ Sin precio nuevo para {isin}, sirviendo último conocido ({last_good.as_of})")
+        return last_good
+    return PriceQuote(0.0, True, None)
+
+def get_price_quote(isin: str, soft_timeout: float = None) -> PriceQuote:
+    """
+    Precio actual con stale-while-revalidate.
+    Si la descarga falla, o tarda más de soft_timeout y hay un precio conocido,
+    devuelve ese precio marcado stale=True mientras la revalidación sigue en segundo plano.
+    Sin precio conocido y sin descarga válida devuelve PriceQuote(0.0, True, None).
+    """
+    return get_price_quotes([isin], soft_timeout)[0]
+
+def get_price_quotes(isins, soft_timeout: float = None):
+    """
+    Igual que get_price_quote para un lote: todas las descargas se lanzan a la vez
+    y comparten el mismo plazo soft_timeout, haya o no precio conocido
+    (sin él, un Yahoo lento nunca bloquea más de soft_timeout).
+    """
+    if soft_timeout is None:
+        soft_timeout = PRICE_SOFT_TIMEOUT
+    deadline = time.monotonic() + soft_timeout
+    pending = {isin: (get_last_good(isin), revalidate(isin)) for isin in dict.fromkeys(isins)}
+    
+    quotes = {}
+    for isin, (last_good, future) in pending.items():
+        timeout = max(0.0, deadline - time.monotonic())
+        quotes[isin] = _resolve_quote(isin, future, last_good, timeout)
+    return [quotes[isin] for isin in isins]
+
 def get_current_value(isin: str) -> float:
     """
     Obtiene el precio actual de un activo desde Yahoo Finance.
-    Mantiene exactamente la misma lógica que tu función original en app.py
+    Las peticiones concurrentes del mismo ticker comparten una sola descarga,
+    y si Yahoo falla se devuelve el último precio conocido.
+    """
+    return get_price_quote(isin).value
+
+def _price_from_history(ticker):
+    """Último cierre del historial intradía (1 minuto)"""
+    hist = ticker.history(period="1d", interval="1m")
+    if hist is not None and not hist.empty:
+        last_price = hist['Close'].iloc[-1]
+        if last_price is not None:
+            return float(last_price)
+    return None
+
+def _price_from_fast_info(ticker):
+    """last_price de fast_info (dict u objeto según versión de yfinance)"""
+    if hasattr(ticker, 'fast_info'):
+        fi = ticker.fast_info
+        if isinstance(fi, dict):
+            if 'last_price' in fi and fi['last_price'] is not None:
+                return float(fi['last_price'])
+        else:
+            if hasattr(fi, 'last_price') and fi.last_price is not None:
+                return float(fi.last_price)
+    return None
+
+def _price_from_info(ticker):
+    """regularMarketPrice de ticker.info"""
+    info = ticker.info
+    if isinstance(info, dict) and 'regularMarketPrice' in info and info['regularMarketPrice'] is not None:
+        return float(info['regularMarketPrice'])
+    return None
+
+# Fuentes de precio en el orden original: 1. historial, 2. fast_info, 3. info
+PRICE_TIERS = [
+    ("history", _price_from_history),
+    ("fast_info", _price_from_fast_info),
+    ("info", _price_from_info),
+]
+
+# Última fuente que funcionó por ticker y su latencia media (segundos)
+_tier_stats = {}
+_tier_lock = threading.Lock()
+
+# Deja de llamar a Yahoo cuando los errores se disparan
+# Una fuente que tarda más de YAHOO_SLOW_CALL_SECONDS cuenta como timeout del proveedor
+YAHOO_SLOW_CALL_SECONDS = float(os.environ.get("YAHOO_SLOW_CALL_SECONDS", 10))
+yahoo_breaker = CircuitBreaker(
+    "yahoo",
+    failure_threshold=int(os.environ.get("YAHOO_BREAKER_THRESHOLD", 5)),
+    base_backoff=float(os.environ.get("YAHOO_BREAKER_BACKOFF", 5)),
+    max_backoff=float(os.environ.get("YAHOO_BREAKER_MAX_BACKOFF", 300))
+)
+
+def _ordered_tiers(isin):
+    """Fuentes a probar, empezando por la que funcionó la última vez para este ticker"""
+    with _tier_lock:
+        stats = _tier_stats.get(isin)
+    if not stats:
+        return PRICE_TIERS
+    return sorted(PRICE_TIERS, key=lambda tier: tier[0] != stats["tier"])
+
+def _remember_tier(isin, tier_name, latency):
+    with _tier_lock:
+        stats = _tier_stats.get(isin)
+        if stats and stats["tier"] == tier_name:
+            stats["latency"] = 0.7 * stats["latency"] + 0.3 * latency
+        else:
+            _tier_stats[isin] = {"tier": tier_name, "latency": latency}
+
+def get_source_stats():
+    """Fuente preferida y latencia por ticker, más el estado del circuit breaker"""
+    with _tier_lock:
+        tickers = {isin: dict(stats) for isin, stats in _tier_stats.items()}
+    return {"tickers": tickers, "breaker": yahoo_breaker.to_dict()}
+
+def _fetch_current_value(isin: str) -> float:
     """
+    Prueba las fuentes de precio empezando por la última que funcionó.
+    Si el circuit breaker está abierto no llama a Yahoo.
+    Solo las excepciones y las llamadas lentas cuentan como fallo del proveedor:
+    un ticker desconocido o deslistado (todas las fuentes vacías) no abre el circuito.
+    """
+    if not yahoo_breaker.allow():
+        logger.warning(f"⚠️ Yahoo Finance en pausa (circuito abierto), sin precio para {isin}")
+        return 0.0
+    
+    provider_errors = 0
     try:
         ticker = yf.Ticker(isin)
         
-        # 1. Intentar historial intradía
-        try:
-            hist = ticker.history(period="1d", interval="1m")
-            if hist is not None and not hist.empty:
-                last_price = hist['Close'].iloc[-1]
-                if last_price is not None:
-                    logger.debug(f"✅ Precio desde historial: {isin} = {last_price}")
-                    return float(last_price)
-        except Exception as e_hist:
-            logger.debug(f"⚠️ Historial falló para {isin}: {e_hist}")
-        
-        # 2. Intentar fast_info
-        try:
-            if hasattr(ticker, 'fast_info'):
-                fi = ticker.fast_info
-                if isinstance(fi, dict):
-                    if 'last_price' in fi and fi['last_price'] is not None:
-                        logger.debug(f"✅ Precio desde fast_info (dict): {isin} = {fi['last_price']}")
-                        return float(fi['last_price'])
-                else:
-                    if hasattr(fi, 'last_price') and fi.last_price is not None:
-                        logger.debug(f"✅ Precio desde fast_info (obj): {isin} = {fi.last_price}")
-                        return float(fi.last_price)
-        except Exception as e_fast:
-            logger.debug(f"⚠️ fast_info falló para {isin}: {e_fast}")
-        
-        # 3. Intentar ticker.info
-        try:
-            info = ticker.info
-            if isinstance(info, dict) and 'regularMarketPrice' in info and info['regularMarketPrice'] is not None:
-                logger.debug(f"✅ Precio desde info: {isin} = {info['regularMarketPrice']}")
-                return float(info['regularMarketPrice'])
-        except Exception as e_info:
-            logger.debug(f"⚠️ ticker.info falló para {isin}: {e_info}")
+        for tier_name, tier_fn in _ordered_tiers(isin):
+            start = time.monotonic()
+            try:
+                price = tier_fn(ticker)
+            except Exception as e_tier:
+                provider_errors += 1
+                logger.debug(f"⚠️ {tier_name} falló para {isin}: {e_tier}")
+                continue
+            
+            if price is None and time.monotonic() - start > YAHOO_SLOW_CALL_SECONDS:
+                provider_errors += 1
+                logger.debug(f"⏳ {tier_name} tardó más de {YAHOO_SLOW_CALL_SECONDS:.0f}s para {isin}")
+            
+            if price is not None:
+                _remember_tier(isin, tier_name, time.monotonic() - start)
+                yahoo_breaker.record_success()
+                logger.debug(f"✅ Precio desde {tier_name}: {isin} = {price}")
+                return price
         
-        # Si todo falla
-        logger.warning(f"⚠️ No se pudo obtener precio para {isin}, devolviendo 0")
+        # Ninguna fuente dio precio: fallo del proveedor solo si alguna lanzó o tardó demasiado;
+        # si todas respondieron vacías es el ticker (desconocido o deslistado), no Yahoo
+        if provider_errors:
+            yahoo_breaker.record_failure()
+        else:
+            yahoo_breaker.record_neutral()
+        logger.warning(f"⚠️ No se pudo obtener precio para {isin} ({provider_errors} fuentes con error), devolviendo 0")
         return 0.0
         
     except Exception as e:
+        yahoo_breaker.record_failure()
         logger.error(f"❌ Error crítico al obtener precio de {isin}: {e}")
         return 0.0
 